@@ -0,0 +1,14 @@
+# -------------------- Recipe Cost --------------------
+
+# Recipe costing as an importable package.
+#     units      - unit tables, UNIT_REGISTRY, convert_to_base
+#     costing    - cost_ingredient
+#     console    - interactive prompts and display_summary
+#     cli        - python -m recipe_cost entry point
+# The batch, vector, parallel and catalog modules are imported by name
+# (recipe_cost.batch_costing ...) so importing the package stays cheap.
+
+from .costing import cost_ingredient
+from .units import UNIT_REGISTRY, convert_to_base, get_unit_category
+
+__all__ = ["UNIT_REGISTRY", "convert_to_base", "cost_ingredient", "get_unit_category"]
@@ -0,0 +1,124 @@
+import math
+import re
+import sys
+from fractions import Fraction
+from functools import lru_cache
+
+from .instrumentation import PROFILER
+
+# -------------------- Amount Parser --------------------
+
+# Safe replacement for float(eval(response)) when reading amounts.
+# Accepts whole numbers (3), decimals (2.5, .5), simple fractions (1/2)
+# and mixed numbers (1 1/2). Nothing else is evaluated, and numbers too big
+# for a float (or inf and nan) are rejected like any other bad input.
+# Real recipe data repeats the same few values (1, 2, 1/2, 250...) so
+# parsed strings are memoized.
+
+DECIMAL_PATTERN = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)")
+FRACTION_PATTERN = re.compile(r"([+-]?)(?:(\d+)\s+)?(\d+)\s*/\s*(\d+)")
+
+CACHE_SIZE = 4096
+
+def split_fraction(text):
+
+    # Returns (numerator, denominator) for a fraction or mixed number,
+    # or None if text is not one. Mixed numbers are folded into one fraction.
+
+    match = FRACTION_PATTERN.fullmatch(text)
+    if match is None:
+        return None
+    sign, whole, numerator, denominator = match.groups()
+    numerator, denominator = int(numerator), int(denominator)
+    if denominator == 0:
+        raise ValueError(f"Can't divide by zero in {text!r}")
+    if whole:
+        numerator += int(whole) * denominator
+    if sign == "-":
+        numerator = -numerator
+    return numerator, denominator
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_float(text):
+    text = text.strip()
+    if DECIMAL_PATTERN.fullmatch(text):
+        return float(text)
+    parts = split_fraction(text)
+    if parts is None:
+        raise ValueError(f"Invalid number: {text!r}")
+    numerator, denominator = parts
+    return numerator / denominator
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_fraction(text):
+    text = text.strip()
+    if DECIMAL_PATTERN.fullmatch(text):
+        return Fraction(text)
+    parts = split_fraction(text)
+    if parts is None:
+        raise ValueError(f"Invalid number: {text!r}")
+    return Fraction(*parts)
+
+# Cache hit rates show up in profile summaries
+PROFILER.add_source("parse_amount_cache", lambda: parse_float.cache_info()._asdict())
+PROFILER.add_source("parse_amount_exact_cache", lambda: parse_fraction.cache_info()._asdict())
+
+def parse_amount(value, exact=False):
+
+    # Parses an amount typed by a user or read from a recipe book.
+    # Returns a float, or an exact Fraction when exact=True.
+    # Numbers are passed through; anything that is not a finite number raises ValueError.
+
+    try:
+        if isinstance(value, str):
+            number = parse_fraction(value) if exact else parse_float(value)
+        elif isinstance(value, (int, float, Fraction)) and not isinstance(value, bool):
+            number = Fraction(value) if exact else float(value)
+        else:
+            raise ValueError(f"Invalid number: {value!r}")
+    except OverflowError:
+        # float(10**400) and 10**400 / 3 overflow rather than giving inf
+        raise ValueError(f"Number is too large: {value!r}")
+    if not exact and not math.isfinite(number):
+        raise ValueError(f"Number is too large: {value!r}")
+    return number
+
+# -------------------- Benchmark --------------------
+
+def benchmark(repeat=5, number=20000):
+
+    # Compares float(eval()) with parse_amount() on typical recipe amounts.
+    # "cold" clears the cache before every run to show the uncached cost.
+
+    import timeit
+
+    samples = ["1", "2", "250", "0.5", "1.25", "1/2", "3/4", "500", "1000", "2.5"]
+
+    def run_eval():
+        for text in samples:
+            float(eval(text))
+
+    def run_parser():
+        for text in samples:
+            parse_amount(text)
+
+    def run_parser_cold():
+        parse_float.cache_clear()
+        for text in samples:
+            parse_amount(text)
+
+    def run_exact():
+        for text in samples:
+            parse_amount(text, exact=True)
+
+    print(f"{len(samples)} values x {number:,} runs, best of {repeat}")
+    baseline = None
+    for label, func in (("float(eval())", run_eval), ("parse_amount cold", run_parser_cold),
+                        ("parse_amount cached", run_parser), ("parse_amount exact", run_exact)):
+        best = min(timeit.repeat(func, repeat=repeat, number=number))
+        per_value = best / (number * len(samples)) * 1e9
+        baseline = baseline or best
+        print(f"{label:<22} {per_value:8.0f} ns/value  {baseline / best:6.1f}x")
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,405 @@
+import csv
+import json
+import math
+import sys
+from itertools import chain, groupby
+
+from .amount_parser import parse_amount
+from .conversion_graph import CONVERSIONS
+from .fixed_point import (MONEY_SCALE, base_amount_fixed, cost_used_fixed, exact, format_money,
+                          per_serving_fixed, to_money)
+from .ingredient_catalog import DENSITIES, IngredientCatalog, normalize_name
+from .instrumentation import PROFILER
+from .units import UNIT_REGISTRY
+
+# -------------------- Batch Costing Engine --------------------
+
+# Non-interactive version of calculate_cost_with_units().
+# Recipe books are read as a stream of ingredient rows, one row per ingredient:
+#   recipe, servings, ingredient, used_unit, amount_used,
+#   purchased_unit, amount_purchased, cost_purchased
+# Rows for the same recipe must be next to each other so only one recipe
+# is held in memory at a time.
+# The purchase columns can be left blank when an ingredient catalog is used.
+
+BOOK_FIELDS = ("recipe", "servings", "ingredient", "used_unit", "amount_used",
+               "purchased_unit", "amount_purchased", "cost_purchased")
+
+RESULT_FIELDS = ("recipe", "servings", "total_cost", "cost_per_serving", "ingredients", "errors")
+
+# -------------------- Readers --------------------
+
+def read_csv_book(path):
+
+    # Yields (line number, row, error) for every ingredient row in a CSV book.
+    # The first line must be a header using the BOOK_FIELDS names.
+
+    with open(path, newline="", encoding="utf-8") as book:
+        reader = csv.DictReader(book)
+        for row in reader:
+            yield reader.line_num, row, None
+
+def read_jsonl_book(path):
+
+    # Yields (line number, row, error) for a JSON Lines book.
+    # A line is either one ingredient row, or a whole recipe with an
+    # "ingredients" list whose items hold the ingredient fields.
+
+    with open(path, encoding="utf-8") as book:
+        for line_num, line in enumerate(book, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as error:
+                yield line_num, None, f"invalid JSON: {error}"
+                continue
+            if not isinstance(record, dict):
+                yield line_num, None, "expected a JSON object"
+            elif "ingredients" in record and not isinstance(record["ingredients"], list):
+                yield line_num, None, "ingredients must be a list"
+            elif "ingredients" in record:
+                for item in record["ingredients"]:
+                    row = {"recipe": record.get("recipe"), "servings": record.get("servings")}
+                    if not isinstance(item, dict):
+                        # Keep the recipe name so the error stays with its recipe
+                        yield line_num, row, "ingredient must be a JSON object"
+                        continue
+                    row.update(item)
+                    yield line_num, row, None
+            else:
+                yield line_num, record, None
+
+def read_recipe_book(path):
+
+    # Picks a reader based on the file extension.
+    # When profiling, the time spent reading each row goes to the "read" timer.
+
+    if str(path).lower().endswith(".csv"):
+        reader = read_csv_book(path)
+    else:
+        reader = read_jsonl_book(path)
+    if PROFILER.enabled:
+        return PROFILER.timed_iter("read", reader)
+    return reader
+
+# -------------------- Costing --------------------
+
+def parse_positive(value, field):
+
+    # Converts a field to a float that is greater than zero.
+    # Uses the same parser as get_amount_input(), so 1/2 and 1 1/2 work here too.
+
+    try:
+        number = parse_amount(value)
+    except ValueError:
+        raise ValueError(f"{field} is not a number: {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"{field} is too large: {value!r}")
+    if not number > 0:
+        raise ValueError(f"{field} must be greater than zero")
+    return number
+
+def parse_servings(value):
+
+    # Servings must be a whole number (1 or more), same as positive_int().
+
+    text = str(value).strip()
+    if not text.isdigit() or int(text) < 1:
+        raise ValueError(f"servings must be a whole number (1 or more): {value!r}")
+    return int(text)
+
+def resolve_units(row):
+
+    # Returns (used unit ID, purchased unit ID) for a row.
+    # Both units must be known and in the same category, or in categories
+    # joined by density (weight and volume) for an ingredient with a density.
+
+    used = row.get("used_unit")
+    purchased = row.get("purchased_unit")
+    used_unit = UNIT_REGISTRY.lookup(used)
+    purchased_unit = UNIT_REGISTRY.lookup(purchased)
+
+    if used_unit is None:
+        raise ValueError(f"unknown used unit: {used!r}")
+    if purchased_unit is None:
+        raise ValueError(f"unknown purchased unit: {purchased!r}")
+    if not UNIT_REGISTRY.same_category(used_unit, purchased_unit):
+        if not CONVERSIONS.linked(used_unit, purchased_unit):
+            raise ValueError(f"cannot buy in {purchased} and use in {used}")
+        if DENSITIES.get(row.get("ingredient")) is None:
+            raise ValueError(f"cannot buy in {purchased} and use in {used} without a density "
+                             f"for {row.get('ingredient')!r}")
+    return used_unit, purchased_unit
+
+def conversion_factor(row, used_unit, purchased_unit):
+
+    # Multiplier from the used base amount to the purchased base amount:
+    # 1 in one category, the ingredient's density (or 1 / density) across.
+
+    if UNIT_REGISTRY.same_category(used_unit, purchased_unit):
+        return 1
+    return CONVERSIONS.base_factor(used_unit, purchased_unit, DENSITIES.get(row.get("ingredient")))
+
+def needs_catalog_price(row):
+
+    # Rows without purchase details are priced from the ingredient catalog.
+
+    return not row.get("purchased_unit")
+
+def cost_row(row, catalog=None, prices=None):
+
+    # Validates one ingredient row and returns the cost of the amount used.
+    # Rows without purchase details use prices, the catalog entries
+    # fetched for this recipe by cost_recipe().
+    # Raises ValueError with a readable message for a bad row.
+
+    if catalog is not None and needs_catalog_price(row):
+        entry = prices.get(normalize_name(row.get("ingredient")))
+        if entry is None:
+            raise ValueError(f"no catalog price for {row.get('ingredient')!r}")
+        amount_used = parse_positive(row.get("amount_used"), "amount_used")
+        if PROFILER.enabled:
+            PROFILER.count("conversions")
+        return catalog.cost_used(entry, amount_used, row.get("used_unit"))
+
+    used_unit, purchased_unit = resolve_units(row)
+
+    amount_used = parse_positive(row.get("amount_used"), "amount_used")
+    amount_purchased = parse_positive(row.get("amount_purchased"), "amount_purchased")
+    cost_purchased = parse_positive(row.get("cost_purchased"), "cost_purchased")
+    if PROFILER.enabled:
+        PROFILER.count("conversions", 2)
+
+    # Same sum as cost_ingredient(), using the unit IDs directly
+    factors = UNIT_REGISTRY.factors
+    used_base = amount_used * factors[used_unit]
+    if UNIT_REGISTRY.categories[used_unit] != UNIT_REGISTRY.categories[purchased_unit]:
+        used_base *= conversion_factor(row, used_unit, purchased_unit)
+    return used_base / (amount_purchased * factors[purchased_unit]) * cost_purchased
+
+def cost_row_fixed(row, catalog=None, prices=None):
+
+    # Fixed-point version of cost_row(): the cost in whole micro-dollars.
+    # Amounts and prices are read exactly from the row text (see fixed_point.py).
+
+    if catalog is not None and needs_catalog_price(row):
+        entry = prices.get(normalize_name(row.get("ingredient")))
+        if entry is None:
+            raise ValueError(f"no catalog price for {row.get('ingredient')!r}")
+        entry = catalog.pick(entry, parse_positive(row.get("amount_used"), "amount_used"), row.get("used_unit"))
+        row = dict(row, purchased_unit=entry["purchased_unit"], amount_purchased=entry["amount_purchased"],
+                   cost_purchased=entry["cost_purchased"])
+        used_unit, purchased_unit = resolve_units(row)
+    else:
+        used_unit, purchased_unit = resolve_units(row)
+
+    # Check the amounts the same way as the float path, then read them exactly
+    for field in ("amount_used", "amount_purchased", "cost_purchased"):
+        parse_positive(row.get(field), field)
+
+    if PROFILER.enabled:
+        PROFILER.count("conversions", 2)
+    return cost_used_fixed(*fixed_amounts(row, used_unit, purchased_unit))
+
+def fixed_amounts(row, used_unit, purchased_unit):
+
+    # (used base, purchased base, cost purchased) of a checked row as
+    # fixed-point integers, read exactly from the row text.
+    # Shared with vector_costing so both fixed paths round the same way.
+
+    # Across weight and volume the density is applied exactly, as a Fraction
+    factors = UNIT_REGISTRY.factors
+    used_factor = factors[used_unit]
+    power = CONVERSIONS.exponent(used_unit, purchased_unit)
+    if power:
+        used_factor = exact(used_factor) * exact(DENSITIES.get(row.get("ingredient"))) ** power
+    used_base = base_amount_fixed(row["amount_used"], used_factor)
+    purchased_base = base_amount_fixed(row["amount_purchased"], factors[purchased_unit])
+    if purchased_base == 0:
+        raise ValueError("amount_purchased is too small")
+    return used_base, purchased_base, to_money(row["cost_purchased"])
+
+def recipe_key(entry):
+    line_num, row, error = entry
+    return row.get("recipe") if row else None
+
+def cost_recipe(recipe_name, entries, catalog=None, fixed=False):
+
+    # Costs all the rows of one recipe.
+    # With a catalog, prices for the whole recipe are looked up in one batch.
+    # With fixed=True money is exact whole micro-dollars instead of floats.
+    # Bad rows are skipped and recorded in the result's error list.
+
+    prices = None
+    if catalog is not None:
+        entries = list(entries)
+        prices = catalog.get_many(row.get("ingredient") for _, row, error in entries
+                                  if error is None and needs_catalog_price(row))
+
+    servings = None
+    total_cost = 0
+    ingredients = 0
+    errors = []
+
+    for line_num, row, error in entries:
+        if error is None:
+            try:
+                if not recipe_name:
+                    raise ValueError("recipe name can't be blank")
+                row_servings = parse_servings(row.get("servings"))
+                if servings is not None and row_servings != servings:
+                    raise ValueError(f"servings {row_servings} does not match {servings}")
+                cost_used = (cost_row_fixed if fixed else cost_row)(row, catalog, prices)
+            except ValueError as row_error:
+                error = str(row_error)
+            else:
+                servings = row_servings
+                total_cost += cost_used
+                ingredients += 1
+                continue
+        errors.append({"line": line_num, "error": error})
+
+    if PROFILER.enabled:
+        PROFILER.count("rows_costed", ingredients)
+        PROFILER.count("rows_bad", len(errors))
+
+    if not servings:
+        cost_per_serving = 0
+    elif fixed:
+        cost_per_serving = per_serving_fixed(total_cost, servings)
+    else:
+        cost_per_serving = total_cost / servings
+
+    result = {
+        "recipe": recipe_name,
+        "servings": servings,
+        "total_cost": total_cost,
+        "cost_per_serving": cost_per_serving,
+        "ingredients": ingredients,
+        "errors": errors,
+    }
+    if fixed:
+        result["money_scale"] = MONEY_SCALE
+    return result
+
+def cost_recipe_book(entries, catalog=None, fixed=False):
+
+    # Generator pipeline: (line, row, error) entries in, one result per recipe out.
+
+    # When profiling, each recipe is timed under "cost_recipe" (reading its
+    # rows happens inside that time too, and is also timed under "read").
+
+    for recipe_name, recipe_entries in groupby(entries, key=recipe_key):
+        if PROFILER.enabled:
+            with PROFILER.stage("cost_recipe"):
+                result = cost_recipe(recipe_name, recipe_entries, catalog, fixed)
+            yield result
+        else:
+            yield cost_recipe(recipe_name, recipe_entries, catalog, fixed)
+
+# -------------------- Writers --------------------
+
+def format_result_money(result, field):
+
+    # Two decimal places, from either float dollars or fixed micro-dollars.
+
+    if "money_scale" in result:
+        return format_money(result[field])
+    return f"{result[field]:.2f}"
+
+def write_results_csv(results, out):
+
+    # Writes one CSV line per recipe. Errors are reported as a count.
+
+    writer = csv.writer(out)
+    writer.writerow(RESULT_FIELDS)
+    for result in results:
+        writer.writerow([
+            result["recipe"], result["servings"], format_result_money(result, "total_cost"),
+            format_result_money(result, "cost_per_serving"), result["ingredients"], len(result["errors"]),
+        ])
+        yield result
+
+def write_results_jsonl(results, out):
+
+    # Writes one JSON object per recipe, including the error details.
+    # Fixed-point results keep their integer micro-dollars and money_scale.
+
+    for result in results:
+        out.write(json.dumps(result) + "\n")
+        yield result
+
+def report_errors(results, out):
+
+    # Passes results through, printing any bad rows to out.
+
+    for result in results:
+        for error in result["errors"]:
+            print(f"❌ {result['recipe'] or 'Unknown recipe'} (line {error['line']}): {error['error']}", file=out)
+        yield result
+
+def write_costed_book(entries, writer, catalog, cache, fixed):
+
+    # Costs entries (through cache when one is given), writes the results to
+    # stdout and reports bad rows to stderr. Returns (recipes, bad rows).
+
+    if cache is not None:
+        from .result_cache import cost_recipe_book_cached
+
+        results = cost_recipe_book_cached(entries, cache, catalog, fixed)
+    else:
+        results = cost_recipe_book(entries, catalog, fixed)
+
+    recipes = 0
+    bad_rows = 0
+    for result in writer(report_errors(results, sys.stderr), sys.stdout):
+        recipes += 1
+        bad_rows += len(result["errors"])
+    return recipes, bad_rows
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cost recipe books without prompts.")
+    parser.add_argument("books", nargs="+", help="CSV or JSONL recipe books")
+    parser.add_argument("--catalog", help="ingredient catalog for rows without purchase details")
+    parser.add_argument("--cache", metavar="DIR", help="reuse results of unchanged recipes saved in this folder")
+    parser.add_argument("--densities", metavar="PATH", help="CSV of ingredient,grams_per_ml to add")
+    parser.add_argument("--fixed", action="store_true", help="exact fixed-point money instead of floats")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv", help="output format")
+    parser.add_argument("--profile", metavar="PATH", help="write a JSON profile summary here")
+    parser.add_argument("--trace", metavar="PATH", help="write a Chrome trace file here")
+    args = parser.parse_args(argv)
+
+    if args.profile or args.trace:
+        PROFILER.enable()
+    if args.densities:
+        DENSITIES.load_csv(args.densities)
+
+    writer = write_results_csv if args.format == "csv" else write_results_jsonl
+    entries = chain.from_iterable(read_recipe_book(path) for path in args.books)
+    cache = None
+    if args.cache:
+        from .result_cache import ResultCache
+
+        cache = ResultCache(args.cache)
+    if args.catalog:
+        # Results stream out while the catalog is read, so it closes after the last one
+        with IngredientCatalog(args.catalog) as catalog:
+            recipes, bad_rows = write_costed_book(entries, writer, catalog, cache, args.fixed)
+    else:
+        recipes, bad_rows = write_costed_book(entries, writer, None, cache, args.fixed)
+
+    print(f"Costed {recipes} recipes, {bad_rows} bad rows.", file=sys.stderr)
+    if cache is not None:
+        print(f"Cache: {cache.hits} hits, {cache.misses} misses, {cache.evicted} evicted, {cache.damaged} damaged.",
+              file=sys.stderr)
+    if args.profile:
+        PROFILER.export_json(args.profile)
+    if args.trace:
+        PROFILER.export_chrome_trace(args.trace)
+    return 1 if bad_rows else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+import csv
+import gc
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from .amount_parser import parse_amount
+from .batch_costing import BOOK_FIELDS, cost_recipe_book, cost_row
+from .cli import COLD_START_BUDGET_MS
+from .console import display_summary
+from .ingredient_records import IngredientRecord
+from .units import convert_to_base, get_unit_category
+from .vector_costing import synthetic_book
+
+# -------------------- Benchmark Suite --------------------
+
+# Times the hot paths on repeatable synthetic recipe books and writes the
+# results as JSON. A saved run can be used as a baseline so slowdowns show
+# up before they reach production:
+#     python -m recipe_cost bench --size medium --save baseline.json
+#     python -m recipe_cost bench --size medium --compare baseline.json
+# cold_start runs a whole small batch in a fresh interpreter and fails the
+# run when it takes longer than COLD_START_BUDGET_MS (see cli.py).
+
+# Ingredient rows in each book size
+BOOK_SIZES = {"small": 1_000, "medium": 100_000, "huge": 1_000_000}
+
+# display_summary() tables are capped at this many rows
+RENDER_ROWS = {"small": 1_000, "medium": 20_000, "huge": 100_000}
+
+# Shortest time one sample may take, so tiny books give steady numbers
+MIN_SAMPLE_TIME = 0.2
+
+# A benchmark is a regression when it is this much slower than the baseline
+THRESHOLD = 0.10
+
+# Rows in the book costed by the cold_start benchmark
+COLD_START_ROWS = 20
+
+# Amounts as people type them, so the books exercise parse_amount
+AMOUNT_TEXTS = ["1", "2", "250", "500", "0.5", "1.25", "1/2", "3/4", "1 1/2", "1000", "2.5", "15"]
+
+# -------------------- Benchmarks --------------------
+
+# Each benchmark takes a book size and returns (operations, function to time)
+
+def bench_convert_to_base(size):
+    pairs = [(float(index % 500 + 1), row["used_unit"])
+             for index, (_, row, _) in enumerate(synthetic_book(BOOK_SIZES[size], amount_texts=AMOUNT_TEXTS))]
+
+    def run():
+        for amount, unit in pairs:
+            convert_to_base(amount, unit)
+    return len(pairs), run
+
+def bench_get_unit_category(size):
+    units = [row["used_unit"] for _, row, _ in synthetic_book(BOOK_SIZES[size], amount_texts=AMOUNT_TEXTS)]
+
+    def run():
+        for unit in units:
+            get_unit_category(unit)
+    return len(units), run
+
+def bench_cost_row(size):
+    rows = [row for _, row, _ in synthetic_book(BOOK_SIZES[size], amount_texts=AMOUNT_TEXTS)]
+
+    def run():
+        for row in rows:
+            cost_row(row)
+    return len(rows), run
+
+def bench_cost_recipe_book(size):
+    entries = list(synthetic_book(BOOK_SIZES[size], amount_texts=AMOUNT_TEXTS))
+
+    def run():
+        for _ in cost_recipe_book(iter(entries)):
+            pass
+    return len(entries), run
+
+def bench_display_summary(size):
+    rows = RENDER_ROWS[size]
+    ingredients = [IngredientRecord(f"ingredient {index}", index % 500 + 0.5, "g", index % 500 + 0.5, index * 0.01)
+                   for index in range(rows)]
+    total_cost = sum(item.total_cost for item in ingredients)
+
+    def run():
+        display_summary("Benchmark", 4, total_cost, ingredients, out=io.StringIO())
+    return rows, run
+
+def bench_parse_amount(size):
+    texts = [row["amount_used"] for _, row, _ in synthetic_book(BOOK_SIZES[size], amount_texts=AMOUNT_TEXTS)]
+
+    def run():
+        for text in texts:
+            parse_amount(text)
+    return len(texts), run
+
+def bench_cold_start(size):
+    # A fresh interpreter each time, so the size only matters for the others.
+    # The temporary folder lives as long as run() does.
+    folder = tempfile.TemporaryDirectory()
+    with open(os.path.join(folder.name, "book.csv"), "w", newline="", encoding="utf-8") as book:
+        writer = csv.DictWriter(book, fieldnames=BOOK_FIELDS)
+        writer.writeheader()
+        writer.writerows(row for _, row, _ in synthetic_book(COLD_START_ROWS, amount_texts=AMOUNT_TEXTS))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": root}
+
+    def run():
+        command = [sys.executable, "-m", "recipe_cost", "cost", os.path.join(folder.name, "book.csv")]
+        subprocess.run(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return 1, run
+
+BENCHMARKS = {
+    "convert_to_base": bench_convert_to_base,
+    "get_unit_category": bench_get_unit_category,
+    "cost_row": bench_cost_row,
+    "cost_recipe_book": bench_cost_recipe_book,
+    "display_summary": bench_display_summary,
+    "parse_amount": bench_parse_amount,
+    "cold_start": bench_cold_start,
+}
+
+# -------------------- Running --------------------
+
+def time_loops(run, loops):
+
+    # Seconds per call of run(), over loops calls, with the garbage collector
+    # off like timeit so a collection doesn't land inside one sample.
+
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        return (time.perf_counter() - start) / loops
+    finally:
+        gc.enable()
+
+def time_benchmark(setup, size, repeat):
+
+    # Runs one benchmark repeat times and keeps the best and median times.
+    # Small books are looped until each sample takes at least MIN_SAMPLE_TIME.
+
+    operations, run = setup(size)
+    loops = 1
+    while time_loops(run, loops) * loops < MIN_SAMPLE_TIME:
+        loops *= 2
+    times = [time_loops(run, loops) for _ in range(repeat)]
+    best = min(times)
+    return {
+        "size": size,
+        "operations": operations,
+        "loops": loops,
+        "best_s": best,
+        "median_s": statistics.median(times),
+        "ns_per_op": best / operations * 1e9,
+    }
+
+def run_suite(size="small", names=None, repeat=5):
+
+    # Runs the chosen benchmarks and returns the JSON-ready report.
+
+    results = {}
+    for name in names or BENCHMARKS:
+        results[name] = time_benchmark(BENCHMARKS[name], size, repeat)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "size": size,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+def compare(report, baseline, threshold=THRESHOLD):
+
+    # Compares ns_per_op with a baseline report.
+    # Returns a list of (name, baseline ns, current ns, change) for every
+    # benchmark in both, and the names that got slower than the threshold.
+
+    rows = []
+    regressions = []
+    for name, result in report["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or old["size"] != result["size"]:
+            continue
+        change = result["ns_per_op"] / old["ns_per_op"] - 1
+        rows.append((name, old["ns_per_op"], result["ns_per_op"], change))
+        if change > threshold:
+            regressions.append(name)
+    return rows, regressions
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the recipe costing hot paths.")
+    parser.add_argument("--size", choices=BOOK_SIZES, default="small", help="synthetic book size")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, help="run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per benchmark (best is kept)")
+    parser.add_argument("--save", metavar="PATH", help="write the JSON report here")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare with a saved JSON report")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, e.g. 0.10 for 10%%")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.size, args.only, args.repeat)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as out:
+            json.dump(report, out, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    status = 0
+    cold_start = report["results"].get("cold_start")
+    if cold_start and cold_start["best_s"] * 1000 > COLD_START_BUDGET_MS:
+        print(f"❌ cold start took {cold_start['best_s'] * 1000:.0f} ms, "
+              f"budget is {COLD_START_BUDGET_MS} ms", file=sys.stderr)
+        status = 1
+
+    if not args.compare:
+        return status
+
+    with open(args.compare, encoding="utf-8") as saved:
+        baseline = json.load(saved)
+    rows, regressions = compare(report, baseline, args.threshold)
+    for name, old, new, change in rows:
+        flag = "  ❌ slower" if name in regressions else ""
+        print(f"{name:<20} {old:10.1f} -> {new:10.1f} ns/op  {change:+7.1%}{flag}", file=sys.stderr)
+    return 1 if regressions else status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+import sys
+from importlib import import_module
+
+# -------------------- Command Line --------------------
+
+# One entry point for the package:
+#     python -m recipe_cost                          interactive calculator
+#     python -m recipe_cost cost book.csv            batch costing
+#     python -m recipe_cost parallel book.csv        batch costing on several processes
+#     python -m recipe_cost graph book.csv           books that use sub-recipes
+#     python -m recipe_cost scenarios book.csv --scenarios what_if.json
+#                                                    price scenario sweeps
+#     python -m recipe_cost serve --port 8765        HTTP/JSON costing service
+#     python -m recipe_cost history --as-of 2025-03-01 book.csv
+#                                                    cost with past prices
+#     python -m recipe_cost offers --add offers.csv book.csv
+#                                                    cheapest supplier offer per row
+#     python -m recipe_cost packs needs.csv          cheapest whole packs to buy
+#     python -m recipe_cost demand --recipes book.csv orders.csv
+#                                                    purchase list for a production plan
+#     python -m recipe_cost export book.csv --out results.rcc
+#                                                    columnar binary results
+#     python -m recipe_cost names --catalog shop.db book.csv
+#                                                    match ingredient names to the catalog
+#     python -m recipe_cost bench --size small       benchmark suite
+# Each command's module is imported only when that command runs, so the
+# interactive calculator never loads numpy, sqlite3 or the batch readers
+# before its first prompt.
+
+COMMANDS = {
+    "cost": "batch_costing",
+    "parallel": "parallel_costing",
+    "graph": "sub_recipes",
+    "scenarios": "price_scenarios",
+    "serve": "service",
+    "history": "price_history",
+    "offers": "supplier_offers",
+    "packs": "pack_optimizer",
+    "demand": "production_demand",
+    "export": "result_store",
+    "names": "name_matcher",
+    "bench": "benchmark_suite",
+}
+
+# Start-up budget for a small batch run (process start to exit).
+# benchmark_suite.py --only cold_start checks it.
+COLD_START_BUDGET_MS = 150
+
+# -------------------- Functions --------------------
+
+def interactive():
+
+    # Runs the interactive calculator (the original main routine).
+
+    from .console import (calculate_cost_with_units, display_summary, instructions, make_statement,
+                          positive_int, string_check)
+    from .ingredient_catalog import IngredientCatalog
+
+    # Display heading
+    make_statement("Recipe Cost Calculator", "💲")
+
+    # Ask user if they want instructions
+    if string_check("Do you want to see the instructions? ") == "yes":
+        instructions()
+
+    # Get recipe name (cannot be blank)
+    while True:
+        recipe_name = input("🍳 Enter the recipe name: ").strip()
+        print()
+        if recipe_name:
+            break
+        print("❌ Recipe name cannot be blank.\n")
+
+    # Get servings (must be whole number)
+    servings = positive_int("🍽️ How many servings does this recipe make?")
+    print()
+
+    # Run main ingredient loop, using saved prices from the ingredient catalog
+    with IngredientCatalog() as catalog:
+        total_cost, ingredients = calculate_cost_with_units(catalog)
+
+    # Show final results
+    display_summary(recipe_name, servings, total_cost, ingredients)
+    return 0
+
+def main(argv=None):
+
+    # Picks the command from the first argument and hands it the rest.
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv:
+        return interactive()
+
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"❌ Unknown command {command!r}. Use one of: {', '.join(COMMANDS)}", file=sys.stderr)
+        return 2
+    module = import_module(f".{COMMANDS[command]}", __package__)
+    return module.main(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import sys
+
+from .amount_parser import parse_amount
+from .conversion_graph import CONVERSIONS
+from .costing import cost_ingredient
+from .ingredient_catalog import DENSITIES
+from .ingredient_records import IngredientRecord
+from .instrumentation import PROFILER
+from .table_renderer import render_table
+from .units import UNIT_REGISTRY, convert_to_base, get_unit_category
+
+# -------------------- Console Input and Summary --------------------
+
+# Prompts for the interactive calculator and the final summary table.
+
+def make_statement(statement, decoration):
+    # """Prints a statement with decoration for headings"""
+    print(f"{decoration * 3} {statement} {decoration * 3}\n")
+
+def string_check(question, valid_answers=('yes', 'no'), num_letters=1):
+    # Confirms a user input is a valid choice (yes/no by default)
+    while True:
+        response = input(question + " ").lower().strip()
+        print()
+        for item in valid_answers:
+            if response == item or response == item[:num_letters]:
+                return item
+        print(f"Please choose an option from {valid_answers}\n")
+
+def instructions():
+    # """Shows instructions for the recipe cost calculator"""
+    make_statement("Instructions", "ℹ️")
+    print('''
+This program calculates the total cost of a recipe.
+
+For each ingredient, enter:
+- Name
+- Unit (e.g., g, ml, kg, unit)
+- Amount used in the recipe
+- Amount purchased and its cost (e.g., 1 kg for $4.00)
+
+Valid units:
+- Weight: g, kg
+- Volume: ml, l
+- Spoons: tbsp, tsp
+- Counted items: unit, piece
+
+Spoons can be bought in ml or l. Common ingredients (flour, sugar, milk,
+butter...) can also be bought by weight and used by volume, or the other
+way round.
+
+Enter 'xxx' to stop adding ingredients.
+''')
+
+def get_unit_input(prompt, valid_set=None):
+
+    # Prompts user for a unit.
+    # If valid_set is provided, only allows units in that category.
+
+    while True:
+        unit = input(prompt + " ").strip().lower()
+        print()
+        if unit in UNIT_REGISTRY:
+            if valid_set and unit not in valid_set:
+                # User picked valid unit, but wrong category → reject
+                print(f"❌ Invalid unit for this context. Must be one of: {', '.join(sorted(valid_set))}\n")
+                continue
+            return unit
+        print("❌ Unknown unit. Try g, ml, kg, l, tbsp, tsp, or unit.\n")
+
+def get_amount_input(prompt):
+
+    # Prompts user for a numeric input.
+    # Supports fractions like 1/2 and mixed numbers like 1 1/2 via parse_amount().
+
+    while True:
+        response = input(prompt + " ").strip()
+        print()
+        try:
+            value = parse_amount(response)
+            if value > 0:
+                return value
+            print("❌ Amount must be greater than zero.\n")
+        except ValueError:
+            print("❌ Invalid number. Use numbers or fractions like 1/2.\n")
+
+def positive_int(prompt):
+
+    # Gets a positive whole number input (for servings).
+    while True:
+        response = input(prompt + " ").strip()
+        print()
+        if response.isdigit() and int(response) >= 1:
+            return int(response)
+        print("❌ Enter a whole number (1 or more).\n")
+
+def calculate_cost_with_units(catalog=None):
+#
+# Main loop:
+# - Get ingredient name
+# - Use the saved price from the catalog if there is one, otherwise:
+# - Get unit for used amount
+# - Get unit for purchased amount (must match category, or weight <-> volume
+#   for an ingredient with a known density)
+# - Get amounts and cost
+# - Convert to base units and calculate cost for portion used
+# Stores all data in ingredient_list as IngredientRecord rows.
+    total_cost = 0
+    ingredient_list = []
+    ingredient_num = 1
+    matcher = None
+
+    while True:
+        # Ingredient name
+        while True:
+            ingredient = input(f"📝 Ingredient #{ingredient_num} name: ").strip()
+            print()
+            if ingredient.lower() == 'xxx' and ingredient_num == 1:
+                print("❌ Oops - you have not entered anything. You need at least one ingredient.\n")
+            elif ingredient.lower() == 'xxx':
+                return total_cost, ingredient_list
+            elif ingredient == "":
+                print("❌ Ingredient name can't be blank. Please enter something.\n")
+            else:
+                break
+
+        # Offer the saved price so purchase details are only entered once
+        entry = catalog.get(ingredient) if catalog else None
+
+        # Not saved under that name: suggest the closest catalog name instead
+        if catalog and entry is None:
+            if matcher is None:
+                from .name_matcher import NameMatcher
+                matcher = NameMatcher.from_catalog(catalog)
+            match = matcher.resolve(ingredient)
+            if match and string_check(f"🔎 Did you mean {match}?") == "yes":
+                ingredient = match
+                entry = catalog.get(ingredient)
+
+        # Weight and volume can be mixed when the density is known
+        density = DENSITIES.get(ingredient)
+        if entry and string_check(
+                f"💾 Use saved price for {ingredient} (${entry['cost_purchased']:.2f} for "
+                f"{entry['amount_purchased']:g} {entry['purchased_unit']})?") == "yes":
+            allowed_units = UNIT_REGISTRY.category_units[UNIT_REGISTRY.category_ids[entry['category']]]
+            if density is not None:
+                allowed_units = allowed_units | CONVERSIONS.linked_units(entry['purchased_unit'])
+            used_unit = get_unit_input(f"📐 Enter the unit for {ingredient} used (must match type):",
+                                       valid_set=allowed_units)
+            amount_used = get_amount_input(f"📏 Amount of {ingredient} used (in {used_unit}):")
+            cost_used = catalog.cost_used(entry, amount_used, used_unit)
+        else:
+            # Get used unit
+            used_unit = get_unit_input(f"📐 Enter the unit for {ingredient} used (e.g., g, kg, ml, tbsp, unit):")
+
+            # Limit purchased unit to same category
+            allowed_units = get_unit_category(used_unit)
+            if density is not None:
+                allowed_units = allowed_units | CONVERSIONS.linked_units(used_unit)
+
+            # Get purchased unit
+            purchased_unit = get_unit_input(
+                f"📐 Enter the unit for {ingredient} purchased (must match type):",
+                valid_set=allowed_units
+            )
+
+            # Amounts and cost
+            amount_used = get_amount_input(f"📏 Amount of {ingredient} used (in {used_unit}):")
+            amount_purchased = get_amount_input(f"📦 Amount of {ingredient} purchased (in {purchased_unit}):")
+            cost_purchased = get_amount_input(f"💵 Cost of purchased amount ($):")
+
+            # Convert both to base units and calculate cost for amount used
+            cost_used = cost_ingredient(amount_used, used_unit, amount_purchased, purchased_unit, cost_purchased,
+                                        density)
+
+            # Remember the price for next time
+            if catalog:
+                catalog.set_price(ingredient, amount_purchased, purchased_unit, cost_purchased)
+
+        # Save info for summary table (formatted later by display_summary)
+        total_cost += cost_used
+        ingredient_list.append(IngredientRecord(
+            name=ingredient,
+            amount_used=amount_used,
+            unit=used_unit,
+            base_amount=convert_to_base(amount_used, used_unit)[0],
+            total_cost=cost_used
+        ))
+
+        ingredient_num += 1
+
+def display_summary(recipe_name, servings, total_cost, ingredients, out=None, tablefmt="fancy_grid"):
+
+    # Displays the final results:
+    # - Recipe name, servings, total cost, cost per serving
+    # - Table with ingredient name, amount used, total cost, cost per serving
+    # The table is streamed to out (the screen by default) one row at a time.
+    # tablefmt can be fancy_grid, plain, csv or paged (see table_renderer.py).
+
+    out = out or sys.stdout
+    cost_per_serving = total_cost / servings if servings else 0
+
+    print("\n" + "=" * 60, file=out)
+    print(f"🍰 Recipe: {recipe_name}", file=out)
+    print(f"👥 Servings: {servings}", file=out)
+    print(f"💰 Total Cost: ${total_cost:.2f}", file=out)
+    print(f"🧾 Cost per Serving: ${cost_per_serving:.2f}", file=out)
+    print("=" * 60, file=out)
+
+    # Format each row as it is written (the records are not changed)
+    table_data = (
+        [item.name, item.amount_text(), f"${item.total_cost:.2f}", f"${item.cost_per_serving(servings):.2f}"]
+        for item in ingredients
+    )
+
+    with PROFILER.stage("render"):
+        render_table(
+            table_data,
+            headers=["Ingredient", "Amount Used", "Total Cost", "Cost/Serving"],
+            out=out,
+            tablefmt=tablefmt
+        )
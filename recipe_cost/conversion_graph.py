@@ -0,0 +1,110 @@
+from .units import UNIT_REGISTRY
+
+# -------------------- Conversion Graph --------------------
+
+# Which used units can be costed against which purchased units.
+# Units in one category convert by their factors (g <-> kg, tsp <-> l).
+# Categories are joined by links that need the ingredient's density, in
+# grams per milliliter:
+#     volume -> weight   base amount (ml) x density = grams
+#     weight -> volume   base amount (g) / density = milliliters
+# For every (used, purchased) pair of unit IDs the graph works out once
+# whether they connect and which power of the density (0, 1 or -1) the
+# conversion needs, so costing a row is one table read and at most one
+# multiply. Tables are rebuilt when units are added to the registry.
+
+# (from category, to category): base amount in from x density = base amount in to
+DENSITY_LINKS = (("volume", "weight"),)
+
+class ConversionGraph:
+
+    def __init__(self, registry, links=DENSITY_LINKS):
+        self.registry = registry
+        self.links = links
+        self.size = None
+        self.category_exponents = []    # from category ID -> to category ID -> power of density, or None
+        self.exponents = []             # used unit ID -> purchased unit ID -> power of density, or None
+        self.ratios = []                # used unit ID -> purchased unit ID -> purchased units per used unit
+
+    def refresh(self):
+
+        # Rebuilds the all-pairs tables if units were registered since.
+
+        registry = self.registry
+        if self.size == len(registry.names):
+            return
+        names = registry.category_names
+        powers = {}
+        for source, target in self.links:
+            powers[source, target] = 1
+            powers[target, source] = -1
+        self.category_exponents = [
+            [0 if source == target else powers.get((names[source], names[target])) for target in range(len(names))]
+            for source in range(len(names))
+        ]
+        self.exponents = [
+            [self.category_exponents[used][purchased] for purchased in registry.categories]
+            for used in registry.categories
+        ]
+        self.ratios = [[used / purchased for purchased in registry.factors] for used in registry.factors]
+        self.size = len(registry.names)
+
+    def exponent(self, used_unit, purchased_unit):
+
+        # Power of the density that converts between two unit IDs:
+        # 0 in one category, 1 or -1 across a link, None if they don't connect.
+
+        self.refresh()
+        return self.exponents[used_unit][purchased_unit]
+
+    def linked(self, used_unit, purchased_unit):
+        return self.exponent(used_unit, purchased_unit) is not None
+
+    def category_factor(self, source, target, density=None):
+
+        # Multiplier from a base amount in category ID source to one in target.
+        # Raises ValueError if they don't connect or the density is missing.
+
+        self.refresh()
+        power = self.category_exponents[source][target]
+        if power is None:
+            raise ValueError(f"{self.registry.category_names[source]} can't be converted "
+                             f"to {self.registry.category_names[target]}")
+        if power == 0:
+            return 1
+        if density is None:
+            raise ValueError(f"needs a density to convert {self.registry.category_names[source]} "
+                             f"to {self.registry.category_names[target]}")
+        return density if power == 1 else 1 / density
+
+    def base_factor(self, used_unit, purchased_unit, density=None):
+
+        # Multiplier from the used base amount to the purchased base amount.
+
+        registry = self.registry
+        return self.category_factor(registry.categories[used_unit], registry.categories[purchased_unit], density)
+
+    def factor(self, used_unit, purchased_unit, density=None):
+
+        # Purchased units in one used unit, e.g. g -> kg is 0.001, and
+        # tbsp -> g for flour (0.53 g/ml) is 15 x 0.53 = 7.95.
+
+        self.refresh()
+        return self.ratios[used_unit][purchased_unit] * self.base_factor(used_unit, purchased_unit, density)
+
+    def linked_units(self, unit):
+
+        # The unit names in other categories that unit connects to by density.
+
+        unit_id = self.registry.lookup(unit)
+        if unit_id is None:
+            return set()
+        self.refresh()
+        source = self.registry.categories[unit_id]
+        return set().union(*(
+            self.registry.category_units[target]
+            for target, power in enumerate(self.category_exponents[source])
+            if power
+        ))
+
+CONVERSIONS = ConversionGraph(UNIT_REGISTRY)
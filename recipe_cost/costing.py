@@ -0,0 +1,19 @@
+from .conversion_graph import CONVERSIONS
+from .units import UNIT_REGISTRY, convert_to_base
+
+# -------------------- Core Costing --------------------
+
+# Shared by the interactive calculator and the batch tools.
+
+def cost_ingredient(amount_used, used_unit, amount_purchased, purchased_unit, cost_purchased, density=None):
+
+    # Works out the cost of the amount used from one purchase.
+    # Both amounts are converted to base units for a fair comparison.
+    # density (grams per ml) lets weight and volume be mixed.
+
+    converted_used, _ = convert_to_base(amount_used, used_unit)
+    converted_purchased, _ = convert_to_base(amount_purchased, purchased_unit)
+    if density is not None:
+        converted_used *= CONVERSIONS.base_factor(UNIT_REGISTRY.lookup(used_unit), UNIT_REGISTRY.lookup(purchased_unit),
+                                                  density)
+    return (converted_used / converted_purchased) * cost_purchased
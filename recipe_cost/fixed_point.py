@@ -0,0 +1,104 @@
+from decimal import Decimal
+from fractions import Fraction
+from functools import lru_cache
+
+from .amount_parser import DECIMAL_PATTERN, parse_amount
+
+# -------------------- Fixed-point Money --------------------
+
+# Exact costing with scaled integers instead of binary floats.
+#   money:   whole micro-dollars (MONEY_SCALE per dollar)
+#   amounts: thousandths of a base unit (AMOUNT_SCALE per g, ml or item)
+# Micro-dollars keep the product of an amount and a price inside 64 bits
+# (1000 kg at $1000 is about 1e18), so the same numbers work in NumPy arrays.
+#
+# Rounding always rounds half to even, and only happens at these points:
+#   1. reading an amount or price
+#   2. the cost of the amount used of each ingredient
+#   3. cost per serving
+#   4. showing money to two decimal places
+# Totals are exact integer sums.
+
+MONEY_SCALE = 1_000_000
+AMOUNT_SCALE = 1_000
+CENT = MONEY_SCALE // 100
+
+def div_round(numerator, denominator):
+
+    # Integer division rounded half to even (denominator must be positive).
+
+    quotient, remainder = divmod(numerator, denominator)
+    twice = 2 * remainder
+    if twice > denominator or (twice == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+def exact(value):
+
+    # Exact Fraction for an amount: text is parsed, floats use their
+    # shortest decimal form (0.1 means one tenth, not the binary value).
+
+    if isinstance(value, float):
+        return Fraction(repr(value))
+    if isinstance(value, Fraction):
+        return value
+    if isinstance(value, Decimal):
+        return Fraction(value)
+    return parse_amount(value, exact=True)
+
+@lru_cache(maxsize=4096)
+def text_to_fixed(text, scale):
+
+    # Cached to_fixed() for text. Plain decimals are scaled with integer
+    # arithmetic; fractions and mixed numbers go through Fraction.
+
+    text = text.strip()
+    if DECIMAL_PATTERN.fullmatch(text):
+        whole, _, decimals = text.lstrip("+-").partition(".")
+        numerator = int((whole or "0") + decimals) * scale
+        if text.startswith("-"):
+            numerator = -numerator
+        return div_round(numerator, 10 ** len(decimals))
+    fraction = parse_amount(text, exact=True) * scale
+    return div_round(fraction.numerator, fraction.denominator)
+
+def to_fixed(value, scale):
+
+    # Scales a number to an integer, rounding half to even.
+
+    if isinstance(value, str):
+        return text_to_fixed(value, scale)
+    fraction = exact(value) * scale
+    return div_round(fraction.numerator, fraction.denominator)
+
+def to_money(value):
+    return to_fixed(value, MONEY_SCALE)
+
+def base_amount_fixed(amount, factor):
+
+    # Amount in thousandths of a base unit, e.g. 1.5 kg (factor 1000) -> 1500000.
+
+    if isinstance(factor, int):
+        return to_fixed(amount, AMOUNT_SCALE * factor)
+    return to_fixed(exact(amount) * exact(factor), AMOUNT_SCALE)
+
+def cost_used_fixed(used_base, purchased_base, cost_purchased):
+
+    # Cost of the amount used in micro-dollars, from fixed base amounts and price.
+
+    return div_round(used_base * cost_purchased, purchased_base)
+
+def per_serving_fixed(total_cost, servings):
+    return div_round(total_cost, servings)
+
+def to_float(fixed):
+    return fixed / MONEY_SCALE
+
+def format_money(fixed):
+
+    # Micro-dollars as dollars and cents text, e.g. 1234567 -> "1.23".
+
+    cents = div_round(fixed, CENT)
+    sign = "-" if cents < 0 else ""
+    dollars, cents = divmod(abs(cents), 100)
+    return f"{sign}{dollars}.{cents:02d}"
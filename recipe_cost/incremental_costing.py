@@ -0,0 +1,167 @@
+import gc
+import sys
+import time
+from collections import defaultdict
+
+from .conversion_graph import CONVERSIONS
+from .ingredient_catalog import DENSITIES, normalize_name
+from .ingredient_records import IngredientRecord
+from .units import UNIT_REGISTRY
+
+# -------------------- Incremental Re-costing --------------------
+
+# Keeps costed recipes in memory with a reverse index from each ingredient
+# to the recipe rows that use it. When a price changes only those rows are
+# re-costed, and their recipe totals are adjusted by the difference instead
+# of re-running every recipe.
+#
+# Recipes are stored as the (total_cost, ingredient_list) pair that
+# calculate_cost_with_units() returns. Each IngredientRecord keeps its
+# base_amount (amount used in base units) so it can be re-priced.
+# A row used by volume and bought by weight (or the other way round) also
+# needs the unit it is bought in: its amount is converted once, with the
+# ingredient's density, into the base unit its price is per.
+#
+# Prices are cost per base unit, the same as IngredientCatalog entries:
+#     entry = catalog.set_price("flour", 1, "kg", 4.50)
+#     changed = index.update_prices({entry["name"]: entry["cost_per_base"]})
+
+class CostIndex:
+
+    def __init__(self):
+        self.recipes = {}                 # recipe ID -> {"servings", "total_cost", "cost_per_serving", "ingredients"}
+        self.users = defaultdict(list)    # ingredient name -> [(recipe ID, row number), ...]
+
+    def add_recipe(self, recipe_id, servings, total_cost, ingredients, purchased_units=None):
+
+        # Adds (or replaces) a costed recipe and indexes its ingredient rows.
+        # Rows are copied so the caller's records are never changed.
+        # purchased_units gives, row by row, the unit each ingredient is bought
+        # in (None or left out: the same category as it is used in).
+
+        ingredients = list(ingredients)
+        purchased_units = list(purchased_units or [None] * len(ingredients))
+        if len(purchased_units) != len(ingredients):
+            raise ValueError(f"{recipe_id} has {len(ingredients)} rows but {len(purchased_units)} purchased units")
+
+        rows = []
+        purchased_base = []
+        for item, purchased_unit in zip(ingredients, purchased_units):
+            if item.base_amount is None:
+                raise ValueError(f"{item.name} in {recipe_id} has no base_amount to re-cost with")
+            purchased_base.append(item.base_amount * self.purchase_factor(item, purchased_unit))
+            rows.append(item.copy())
+
+        if recipe_id in self.recipes:
+            self.remove_recipe(recipe_id)
+        for row_num, item in enumerate(rows):
+            self.users[normalize_name(item.name)].append((recipe_id, row_num))
+
+        self.recipes[recipe_id] = {
+            "servings": servings,
+            "total_cost": total_cost,
+            "cost_per_serving": total_cost / servings,
+            "ingredients": rows,
+            "purchased_base": purchased_base,   # row -> amount used in the purchased category's base unit
+        }
+
+    def purchase_factor(self, item, purchased_unit):
+
+        # Multiplier from a row's used base amount to the base unit its price
+        # is per: 1 in one category, the density (or 1 / density) across.
+
+        if purchased_unit is None:
+            return 1
+        used_id = UNIT_REGISTRY.lookup(item.unit)
+        if used_id is None:
+            raise ValueError(f"unknown used unit for {item.name}: {item.unit!r}")
+        purchased_id = UNIT_REGISTRY.lookup(purchased_unit)
+        if purchased_id is None:
+            raise ValueError(f"unknown purchased unit for {item.name}: {purchased_unit!r}")
+        return CONVERSIONS.base_factor(used_id, purchased_id, DENSITIES.get(item.name))
+
+    def remove_recipe(self, recipe_id):
+
+        # Drops a recipe and its rows from the reverse index.
+
+        recipe = self.recipes.pop(recipe_id)
+        for row in recipe["ingredients"]:
+            key = normalize_name(row.name)
+            self.users[key] = [use for use in self.users[key] if use[0] != recipe_id]
+            if not self.users[key]:
+                del self.users[key]
+
+    def recipes_using(self, name):
+
+        # Set of recipe IDs that use an ingredient.
+
+        return {recipe_id for recipe_id, _ in self.users.get(normalize_name(name), ())}
+
+    def update_prices(self, prices):
+
+        # Applies new prices ({ingredient name: cost per base unit}).
+        # Only rows that use those ingredients are touched; each recipe total
+        # moves by the change in its rows' cost.
+        # Returns {recipe ID: (total_cost, cost_per_serving)} for changed recipes.
+
+        changed = set()
+        for name, cost_per_base in prices.items():
+            for recipe_id, row_num in self.users.get(normalize_name(name), ()):
+                recipe = self.recipes[recipe_id]
+                row = recipe["ingredients"][row_num]
+                new_cost = recipe["purchased_base"][row_num] * cost_per_base
+                recipe["total_cost"] += new_cost - row.total_cost
+                row.total_cost = new_cost
+                changed.add(recipe_id)
+
+        results = {}
+        for recipe_id in changed:
+            recipe = self.recipes[recipe_id]
+            recipe["cost_per_serving"] = recipe["total_cost"] / recipe["servings"]
+            results[recipe_id] = (recipe["total_cost"], recipe["cost_per_serving"])
+        return results
+
+    def recompute(self, recipe_id):
+
+        # Re-adds a recipe's row costs from scratch.
+        # Many small deltas can drift by a rounding error; this resets it.
+
+        recipe = self.recipes[recipe_id]
+        recipe["total_cost"] = sum(row.total_cost for row in recipe["ingredients"])
+        recipe["cost_per_serving"] = recipe["total_cost"] / recipe["servings"]
+        return recipe["total_cost"], recipe["cost_per_serving"]
+
+# -------------------- Benchmark --------------------
+
+def benchmark(n_recipes=100_000, rows_per_recipe=10, n_ingredients=2000, n_updates=50):
+
+    # Times a price-list upload of n_updates ingredients against
+    # re-adding the totals of every recipe with recompute().
+
+    index = CostIndex()
+    for recipe_num in range(n_recipes):
+        ingredients = []
+        for row_num in range(rows_per_recipe):
+            name = f"ingredient {(recipe_num * 7 + row_num * 13) % n_ingredients}"
+            ingredients.append(IngredientRecord(name, 100.0, "g", 100.0, 0.5))
+        index.add_recipe(recipe_num, 4, 0.5 * rows_per_recipe, ingredients)
+
+    prices = {f"ingredient {num}": 0.006 for num in range(0, n_ingredients, n_ingredients // n_updates)}
+
+    # Collect the garbage from building the index now, not during the timing
+    gc.collect()
+    start = time.perf_counter()
+    changed = index.update_prices(prices)
+    update_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for recipe_id in index.recipes:
+        index.recompute(recipe_id)
+    full_time = time.perf_counter() - start
+
+    print(f"Recipes: {n_recipes:,}  Price updates: {len(prices)}  Recipes changed: {len(changed):,}")
+    print(f"update_prices:      {update_time * 1000:8.1f} ms")
+    print(f"recompute all:      {full_time * 1000:8.1f} ms")
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,334 @@
+import csv
+from collections import OrderedDict
+
+from .conversion_graph import CONVERSIONS
+from .instrumentation import PROFILER
+from .units import RENAMED_CATEGORIES, UNIT_REGISTRY, convert_to_base
+
+# -------------------- Ingredient Catalog --------------------
+
+# Remembers what each ingredient costs so purchase details are entered once.
+# Prices are stored in a local SQLite file as cost per base unit
+# (per g, per ml or per item), so costing an ingredient is one lookup and
+# one multiply. Recently used entries are kept in memory (LRU) in front of
+# the database.
+
+CATALOG_PATH = "ingredient_catalog.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingredients (
+    name TEXT PRIMARY KEY,
+    display_name TEXT NOT NULL,
+    category TEXT NOT NULL,
+    cost_per_base REAL NOT NULL,
+    purchased_unit TEXT NOT NULL,
+    amount_purchased REAL NOT NULL,
+    cost_purchased REAL NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+)
+"""
+
+# version goes up by one every time an ingredient's price is set, so
+# results worked out from a price can tell when it has changed
+ENTRY_FIELDS = ("name", "display_name", "category", "cost_per_base",
+                "purchased_unit", "amount_purchased", "cost_purchased", "version")
+
+# Supplier offers: many pack sizes and prices per ingredient.
+# pack_base is the pack size in base units (g, ml or items).
+OFFER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS offers (
+    name TEXT NOT NULL,
+    display_name TEXT NOT NULL,
+    supplier TEXT NOT NULL,
+    category TEXT NOT NULL,
+    pack_base REAL NOT NULL,
+    cost_per_base REAL NOT NULL,
+    purchased_unit TEXT NOT NULL,
+    amount_purchased REAL NOT NULL,
+    cost_purchased REAL NOT NULL,
+    PRIMARY KEY (name, supplier, purchased_unit, amount_purchased)
+)
+"""
+
+OFFER_INDEX = "CREATE INDEX IF NOT EXISTS offers_by_pack ON offers (name, category, pack_base)"
+
+OFFER_FIELDS = ("name", "display_name", "supplier", "category", "pack_base", "cost_per_base",
+                "purchased_unit", "amount_purchased", "cost_purchased")
+
+# SQLite limits how many ? placeholders one query can use
+LOOKUP_BATCH = 500
+
+# Typical densities in grams per milliliter, so these can be bought by
+# weight and used by volume (or the other way round). Approximate: add
+# your own with DENSITIES.set() or a CSV file (DensityTable.load_csv()).
+DEFAULT_DENSITIES = {
+    'water': 1.0, 'milk': 1.03, 'cream': 1.01, 'butter': 0.91, 'oil': 0.92, 'olive oil': 0.91,
+    'honey': 1.42, 'golden syrup': 1.44, 'flour': 0.53, 'sugar': 0.85, 'brown sugar': 0.83,
+    'icing sugar': 0.56, 'salt': 1.2, 'rice': 0.85, 'rolled oats': 0.41, 'cocoa powder': 0.42,
+    'baking powder': 0.9, 'yoghurt': 1.03,
+}
+
+def normalize_name(name):
+
+    # Catalog key for an ingredient name: lower case, single spaces.
+
+    return " ".join(str(name).lower().split())
+
+def unit_category(unit_id):
+    return UNIT_REGISTRY.category_names[UNIT_REGISTRY.categories[unit_id]]
+
+class DensityTable:
+
+    # Grams per milliliter for each ingredient, keyed by catalog name.
+
+    def __init__(self, densities=()):
+        self.densities = {}
+        for name, density in dict(densities).items():
+            self.set(name, density)
+
+    def set(self, name, grams_per_ml):
+        if not grams_per_ml > 0:
+            raise ValueError(f"density for {name!r} must be greater than zero")
+        self.densities[normalize_name(name)] = grams_per_ml
+
+    def get(self, name):
+        return self.densities.get(normalize_name(name)) if name else None
+
+    def load_csv(self, path):
+
+        # Adds ingredient,grams_per_ml rows. Returns how many were read.
+
+        count = 0
+        with open(path, newline="", encoding="utf-8") as source:
+            for line_num, row in enumerate(csv.DictReader(source), 2):
+                try:
+                    self.set(row["ingredient"], float(row["grams_per_ml"]))
+                except (KeyError, TypeError, ValueError) as error:
+                    raise ValueError(f"{path} line {line_num}: {error}")
+                count += 1
+        return count
+
+DENSITIES = DensityTable(DEFAULT_DENSITIES)
+
+class IngredientCatalog:
+
+    def __init__(self, path=CATALOG_PATH, cache_size=1024):
+        # Imported on first use so batch runs without --catalog skip it
+        import sqlite3
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(SCHEMA)
+        if "version" not in {row[1] for row in self.connection.execute("PRAGMA table_info(ingredients)")}:
+            self.connection.execute("ALTER TABLE ingredients ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+        self.connection.execute(OFFER_SCHEMA)
+        self.connection.execute(OFFER_INDEX)
+        for old, new in RENAMED_CATEGORIES.items():
+            self.connection.execute("UPDATE ingredients SET category = ? WHERE category = ?", (new, old))
+            self.connection.execute("UPDATE offers SET category = ? WHERE category = ?", (new, old))
+        self.connection.commit()
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # -------------------- Cache --------------------
+
+    def remember(self, key, entry):
+
+        # Stores an entry (or None for "not in catalog") in the LRU cache.
+
+        self.cache[key] = entry
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    # -------------------- Prices --------------------
+
+    def set_price(self, name, amount_purchased, purchased_unit, cost_purchased):
+
+        # Saves (or replaces) the purchase details for an ingredient,
+        # one version after its last price. Returns the stored entry.
+
+        unit_id = UNIT_REGISTRY.lookup(purchased_unit)
+        if unit_id is None:
+            raise ValueError(f"Unknown unit {purchased_unit!r}")
+        if not amount_purchased > 0 or not cost_purchased > 0:
+            raise ValueError("Amount and cost must be greater than zero")
+
+        entry = {
+            "name": normalize_name(name),
+            "display_name": str(name).strip(),
+            "category": unit_category(unit_id),
+            "cost_per_base": cost_purchased / UNIT_REGISTRY.to_base(amount_purchased, unit_id),
+            "purchased_unit": UNIT_REGISTRY.names[unit_id],
+            "amount_purchased": amount_purchased,
+            "cost_purchased": cost_purchased,
+        }
+        previous = self.connection.execute("SELECT version FROM ingredients WHERE name = ?",
+                                           (entry["name"],)).fetchone()
+        entry["version"] = previous[0] + 1 if previous else 1
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO ingredients ({', '.join(ENTRY_FIELDS)}) VALUES ({', '.join('?' * len(ENTRY_FIELDS))})",
+            [entry[field] for field in ENTRY_FIELDS],
+        )
+        self.connection.commit()
+        self.remember(entry["name"], entry)
+        return entry
+
+    def get(self, name):
+
+        # Returns the entry for one ingredient, or None if it is not in the catalog.
+
+        return self.get_many([name]).get(normalize_name(name))
+
+    def get_many(self, names):
+
+        # Looks up several ingredients at once.
+        # Cache misses are fetched together with one query per LOOKUP_BATCH names.
+        # Returns {normalized name: entry or None}.
+
+        found = {}
+        missing = []
+        for key in {normalize_name(name) for name in names}:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                found[key] = self.cache[key]
+            else:
+                missing.append(key)
+
+        if PROFILER.enabled:
+            PROFILER.count("catalog_cache_hits", len(found))
+            PROFILER.count("catalog_cache_misses", len(missing))
+            PROFILER.count("catalog_queries", -(-len(missing) // LOOKUP_BATCH))
+
+        for start in range(0, len(missing), LOOKUP_BATCH):
+            batch = missing[start:start + LOOKUP_BATCH]
+            rows = self.connection.execute(
+                f"SELECT {', '.join(ENTRY_FIELDS)} FROM ingredients WHERE name IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            for row in rows:
+                found[row[0]] = dict(zip(ENTRY_FIELDS, row))
+            for key in batch:
+                found.setdefault(key, None)
+                self.remember(key, found[key])
+        return found
+
+    def snapshot(self):
+
+        # Copies every entry into an in-memory PriceTable.
+        # Used to hand the prices to worker processes in one go.
+
+        rows = self.connection.execute(f"SELECT {', '.join(ENTRY_FIELDS)} FROM ingredients")
+        return PriceTable({row[0]: dict(zip(ENTRY_FIELDS, row)) for row in rows})
+
+    def names(self):
+
+        # Display names of every ingredient with a saved price or an offer.
+
+        rows = self.connection.execute("SELECT display_name FROM ingredients UNION SELECT display_name FROM offers")
+        return [row[0] for row in rows]
+
+    # -------------------- Offers --------------------
+
+    def add_offers(self, offers):
+
+        # Saves (or replaces) (name, supplier, amount_purchased, purchased_unit,
+        # cost_purchased) offers in one transaction. Returns how many were saved.
+
+        rows = []
+        for name, supplier, amount_purchased, purchased_unit, cost_purchased in offers:
+            unit_id = UNIT_REGISTRY.lookup(purchased_unit)
+            if unit_id is None:
+                raise ValueError(f"Unknown unit {purchased_unit!r}")
+            if not amount_purchased > 0 or not cost_purchased > 0:
+                raise ValueError("Amount and cost must be greater than zero")
+            pack_base, _ = convert_to_base(amount_purchased, purchased_unit)
+            rows.append((normalize_name(name), str(name).strip(), str(supplier).strip(), unit_category(unit_id),
+                         pack_base, cost_purchased / pack_base, UNIT_REGISTRY.names[unit_id],
+                         amount_purchased, cost_purchased))
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO offers ({', '.join(OFFER_FIELDS)}) VALUES ({', '.join('?' * len(OFFER_FIELDS))})",
+            rows,
+        )
+        self.connection.commit()
+        return len(rows)
+
+    def add_offer(self, name, supplier, amount_purchased, purchased_unit, cost_purchased):
+        return self.add_offers([(name, supplier, amount_purchased, purchased_unit, cost_purchased)])
+
+    def offers(self, name=None):
+
+        # Offer dicts for one ingredient, or for every ingredient.
+        # Saved prices (set_price) are included as offers from supplier "".
+
+        query = (f"SELECT {', '.join(OFFER_FIELDS)} FROM offers"
+                 f" UNION ALL SELECT name, display_name, '', category, cost_purchased / cost_per_base, cost_per_base,"
+                 f" purchased_unit, amount_purchased, cost_purchased FROM ingredients")
+        if name is None:
+            rows = self.connection.execute(query)
+        else:
+            rows = self.connection.execute(f"SELECT * FROM ({query}) WHERE name = ?", (normalize_name(name),))
+        return [dict(zip(OFFER_FIELDS, row)) for row in rows]
+
+    # -------------------- Costing --------------------
+
+    def cost_used(self, entry, amount_used, used_unit):
+        return cost_used(entry, amount_used, used_unit)
+
+    def pick(self, entry, amount_used, used_unit):
+        return entry
+
+    def cost_of(self, name, amount_used, used_unit):
+
+        # Cost of amount_used of a named ingredient. Raises ValueError if it has no price.
+
+        entry = self.get(name)
+        if entry is None:
+            raise ValueError(f"no catalog price for {name!r}")
+        return self.cost_used(entry, amount_used, used_unit)
+
+class PriceTable:
+
+    # Read-only, in-memory copy of a catalog with the same lookup methods.
+    # Plain data, so it can be pickled and sent to other processes.
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get(self, name):
+        return self.entries.get(normalize_name(name))
+
+    def get_many(self, names):
+        return {key: self.entries.get(key) for key in {normalize_name(name) for name in names}}
+
+    def cost_used(self, entry, amount_used, used_unit):
+        return cost_used(entry, amount_used, used_unit)
+
+    def pick(self, entry, amount_used, used_unit):
+        return entry
+
+def cost_used(entry, amount_used, used_unit):
+
+    # Cost of amount_used of a catalog entry: one conversion and one multiply.
+    # Used by volume and priced by weight (or the other way round) also
+    # works when the ingredient's density is known.
+
+    unit_id = UNIT_REGISTRY.lookup(used_unit)
+    if unit_id is None:
+        raise ValueError(f"unknown used unit: {used_unit!r}")
+    if unit_category(unit_id) != entry["category"]:
+        try:
+            factor = CONVERSIONS.category_factor(UNIT_REGISTRY.categories[unit_id],
+                                                 UNIT_REGISTRY.category_ids[entry["category"]],
+                                                 DENSITIES.get(entry["name"]))
+        except (KeyError, ValueError):
+            raise ValueError(f"{entry['display_name']} is priced by {entry['category']}, not {used_unit}")
+        return UNIT_REGISTRY.to_base(amount_used, unit_id) * factor * entry["cost_per_base"]
+    return UNIT_REGISTRY.to_base(amount_used, unit_id) * entry["cost_per_base"]
@@ -0,0 +1,86 @@
+from array import array
+
+# -------------------- Ingredient Records --------------------
+
+# Compact storage for costed ingredient rows.
+# Amounts stay numeric and per-serving costs are worked out when asked for,
+# so nothing is formatted or filled in until the table is shown.
+#
+# IngredientRecord   - one row, a __slots__ class (no per-row dict)
+# IngredientColumns  - many rows as parallel arrays with integer unit IDs,
+#                      for books with millions of rows
+
+class IngredientRecord:
+
+    __slots__ = ("name", "amount_used", "unit", "base_amount", "total_cost")
+
+    def __init__(self, name, amount_used, unit, base_amount, total_cost):
+        self.name = name
+        self.amount_used = amount_used      # in unit, as entered
+        self.unit = unit
+        self.base_amount = base_amount      # amount_used in base units (g, ml, items)
+        self.total_cost = total_cost        # cost of the amount used
+
+    def cost_per_serving(self, servings):
+        return self.total_cost / servings
+
+    def amount_text(self):
+        return f"{self.amount_used:.2f} {self.unit}"
+
+    def copy(self):
+        return IngredientRecord(self.name, self.amount_used, self.unit, self.base_amount, self.total_cost)
+
+    def __eq__(self, other):
+        if not isinstance(other, IngredientRecord):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return (f"IngredientRecord({self.name!r}, {self.amount_used!r}, {self.unit!r}, "
+                f"{self.base_amount!r}, {self.total_cost!r})")
+
+class IngredientColumns:
+
+    # Struct-of-arrays: one typed array per field instead of one object per row.
+    # Units are stored as IDs from registry (a UnitRegistry).
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.names = []
+        self.amount_used = array("d")
+        self.unit_id = array("i")
+        self.base_amount = array("d")
+        self.total_cost = array("d")
+
+    def append(self, name, amount_used, unit, total_cost):
+
+        # Adds a row. The base amount is worked out from the unit's factor.
+
+        unit_id = self.registry.lookup(unit)
+        if unit_id is None:
+            raise ValueError(f"Unknown unit {unit!r}")
+        self.names.append(name)
+        self.amount_used.append(amount_used)
+        self.unit_id.append(unit_id)
+        self.base_amount.append(self.registry.to_base(amount_used, unit_id))
+        self.total_cost.append(total_cost)
+
+    def append_record(self, record):
+        self.append(record.name, record.amount_used, record.unit, record.total_cost)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, row):
+        return IngredientRecord(self.names[row], self.amount_used[row], self.registry.names[self.unit_id[row]],
+                                self.base_amount[row], self.total_cost[row])
+
+    def __iter__(self):
+        for row in range(len(self.names)):
+            yield self[row]
+
+    def total(self):
+        return sum(self.total_cost)
+
+    def costs_per_serving(self, servings):
+        return array("d", (cost / servings for cost in self.total_cost))
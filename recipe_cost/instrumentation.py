@@ -0,0 +1,163 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# -------------------- Instrumentation --------------------
+
+# Opt-in counters and timers for the costing pipeline.
+# Off by default. Call sites check PROFILER.enabled first, so a disabled
+# profiler costs one attribute read:
+#     if PROFILER.enabled:
+#         PROFILER.count("rows_read")
+#     with PROFILER.stage("render"):
+#         ...
+# Turn it on with PROFILER.enable(), the --profile/--trace options of the
+# command line tools, or RECIPE_PROFILE=1 in the environment.
+# Results export as a JSON summary or a Chrome trace file
+# (open in chrome://tracing or https://ui.perfetto.dev).
+
+# Trace events kept per run; timers and counters keep counting after this
+MAX_EVENTS = 100_000
+
+class NullStage:
+
+    # Returned by stage() when profiling is off: does nothing.
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_STAGE = NullStage()
+
+class Stage:
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+class Profiler:
+
+    def __init__(self):
+        self.enabled = False
+        self.sources = {}
+        self.reset()
+
+    def reset(self):
+        self.counters = defaultdict(int)
+        self.timers = {}        # name -> [calls, total seconds, longest seconds]
+        self.events = []        # (name, start, end, thread ID) for the trace
+        self.origin = time.perf_counter()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    # -------------------- Recording --------------------
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def stage(self, name):
+
+        # Context manager that times a stage (a no-op when disabled).
+
+        return Stage(self, name) if self.enabled else NULL_STAGE
+
+    def record(self, name, start, end, trace=True):
+
+        # Adds one timed call to a stage's totals (and to the trace).
+
+        elapsed = end - start
+        timer = self.timers.get(name)
+        if timer is None:
+            self.timers[name] = [1, elapsed, elapsed]
+        else:
+            timer[0] += 1
+            timer[1] += elapsed
+            if elapsed > timer[2]:
+                timer[2] = elapsed
+        if trace:
+            if len(self.events) < MAX_EVENTS:
+                self.events.append((name, start, end, threading.get_ident()))
+            else:
+                self.counters["trace_events_dropped"] += 1
+
+    def timed_iter(self, name, iterable):
+
+        # Passes items through, adding the time spent producing each one to
+        # the name timer. Used for readers, where one trace event per row
+        # would be too many, so only the totals are kept.
+
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.record(name, start, time.perf_counter(), trace=False)
+            yield item
+
+    def add_source(self, name, read):
+
+        # Registers a function whose dict of numbers is added to the summary,
+        # e.g. cache statistics that are kept somewhere else anyway.
+
+        self.sources[name] = read
+
+    # -------------------- Export --------------------
+
+    def summary(self):
+        return {
+            "counters": dict(self.counters),
+            "timers": {
+                name: {
+                    "calls": calls,
+                    "total_s": total,
+                    "mean_us": total / calls * 1e6,
+                    "max_us": longest * 1e6,
+                }
+                for name, (calls, total, longest) in self.timers.items()
+            },
+            "sources": {name: read() for name, read in self.sources.items()},
+        }
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as out:
+            json.dump(self.summary(), out, indent=2)
+
+    def export_chrome_trace(self, path):
+
+        # Writes the Trace Event Format: one complete ("X") event per timed
+        # stage call, then the final counter values as counter ("C") events.
+
+        pid = os.getpid()
+        events = [
+            {"name": name, "ph": "X", "pid": pid, "tid": thread,
+             "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6}
+            for name, start, end, thread in self.events
+        ]
+        end_ts = (time.perf_counter() - self.origin) * 1e6
+        events.extend({"name": name, "ph": "C", "pid": pid, "ts": end_ts, "args": {name: value}}
+                      for name, value in self.counters.items())
+        with open(path, "w", encoding="utf-8") as out:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, out)
+
+PROFILER = Profiler()
+
+if os.environ.get("RECIPE_PROFILE"):
+    PROFILER.enable()
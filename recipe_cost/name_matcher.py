@@ -0,0 +1,270 @@
+import csv
+import re
+import sys
+import time
+from collections import OrderedDict
+from itertools import chain
+
+import numpy as np
+
+from .batch_costing import read_recipe_book
+from .ingredient_catalog import IngredientCatalog, normalize_name
+
+# -------------------- Ingredient Name Matching --------------------
+
+# Maps free-text ingredient names onto the catalog's names, so "Flour",
+# "flour (plain)" and "plain flour" all find the same catalog entry.
+#
+# Names are broken into words (case, punctuation and word order don't
+# matter) and each word into trigrams, padded at the ends the same way
+# PostgreSQL's pg_trgm does:  "flour" -> "  f", " fl", "flo", "lou", "our", "ur "
+# An inverted index holds, for every trigram, the IDs of the names that
+# contain it. A query counts shared trigrams for every candidate with one
+# np.bincount over the posting lists it touches, and ranks them by
+#     similarity = 2 x shared / (query trigrams + name trigrams)
+# (1.0 for the same words in any order). Results are cached per raw string,
+# so an imported book resolves each distinct spelling once.
+#
+#     python -m recipe_cost names --catalog shop.db book.csv
+#     python -m recipe_cost names --catalog shop.db --rewrite book.csv > fixed.csv
+
+# Lowest similarity resolve() accepts as the same ingredient
+MATCH_THRESHOLD = 0.6
+
+# Raw strings whose matches are kept
+CACHE_SIZE = 65_536
+
+WORD = re.compile(r"[^\W_]+")
+
+def name_words(name):
+
+    # Sorted, distinct lower-case words of a name ("Flour (plain)" -> plain, flour).
+
+    return sorted(set(WORD.findall(str(name).lower())))
+
+def trigrams(name):
+    grams = set()
+    for word in name_words(name):
+        padded = f"  {word} "
+        grams.update(padded[start:start + 3] for start in range(len(padded) - 2))
+    return grams
+
+class NameMatcher:
+
+    def __init__(self, names, cache_size=CACHE_SIZE):
+        self.names = []
+        self.ids = {}                 # sorted words -> name ID
+        postings = {}
+        sizes = []
+        for name in names:
+            key = " ".join(name_words(name))
+            if not key or key in self.ids:
+                continue
+            self.ids[key] = len(self.names)
+            grams = trigrams(name)
+            for gram in grams:
+                postings.setdefault(gram, []).append(len(self.names))
+            self.names.append(str(name).strip())
+            sizes.append(len(grams))
+
+        self.postings = {gram: np.array(ids, dtype=np.intp) for gram, ids in postings.items()}
+        self.sizes = np.array(sizes, dtype=np.float64)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+
+    @classmethod
+    def from_catalog(cls, catalog, cache_size=CACHE_SIZE):
+        return cls(catalog.names(), cache_size)
+
+    def __len__(self):
+        return len(self.names)
+
+    # -------------------- Matching --------------------
+
+    def match(self, raw, limit=5):
+
+        # Ranked [(name, similarity)] for a raw string, best first.
+
+        cached = self.cache.get(raw)
+        if cached is not None and len(cached) >= limit:
+            self.cache.move_to_end(raw)
+            return cached[:limit]
+
+        exact = self.ids.get(" ".join(name_words(raw)))
+        grams = trigrams(raw)
+        lists = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not lists:
+            ranked = []
+        else:
+            shared = np.bincount(np.concatenate(lists))
+            candidates = np.flatnonzero(shared)
+            scores = 2 * shared[candidates] / (len(grams) + self.sizes[candidates])
+            if len(candidates) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+                candidates, scores = candidates[top], scores[top]
+            order = np.lexsort((candidates, -scores))
+            ranked = [(self.names[candidate], score)
+                      for candidate, score in zip(candidates[order].tolist(), scores[order].tolist())]
+        if exact is not None:
+            ranked = [(self.names[exact], 1.0)] + [match for match in ranked if match[0] != self.names[exact]]
+            ranked = ranked[:limit]
+
+        self.cache[raw] = ranked
+        self.cache.move_to_end(raw)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return ranked
+
+    def resolve(self, raw, threshold=MATCH_THRESHOLD):
+
+        # The catalog name a raw string means, or None if nothing is close enough.
+
+        ranked = self.match(raw, 1)
+        if ranked and ranked[0][1] >= threshold:
+            return ranked[0][0]
+        return None
+
+    def resolve_many(self, raws, threshold=MATCH_THRESHOLD):
+
+        # {raw string: catalog name or None} for every distinct raw string.
+
+        return {raw: self.resolve(raw, threshold) for raw in set(raws)}
+
+def resolve_book(entries, matcher, threshold=MATCH_THRESHOLD):
+
+    # Passes (line, row, error) entries through with each ingredient name
+    # replaced by the catalog name it resolves to. Names that don't resolve
+    # are left as they are, and so are JSONL values that aren't strings.
+    # The rows are copied, not changed.
+
+    for line_num, row, error in entries:
+        if row is not None and row.get("ingredient") and isinstance(row["ingredient"], str):
+            name = matcher.resolve(row["ingredient"], threshold)
+            if name is not None and name != row["ingredient"]:
+                row = dict(row, ingredient=name)
+        yield line_num, row, error
+
+def book_fields(paths):
+
+    # Column names of the books in order of first appearance: a CSV book's
+    # header, or every key its JSONL rows use. Rewriting with these keeps
+    # columns such as sub_recipe and yield_amount that BOOK_FIELDS lacks.
+
+    fields = {}
+    for path in paths:
+        if str(path).lower().endswith(".csv"):
+            with open(path, newline="", encoding="utf-8") as source:
+                fields.update(dict.fromkeys(next(csv.reader(source), [])))
+        else:
+            for _, row, error in read_recipe_book(path):
+                if error is None:
+                    fields.update(dict.fromkeys(row))
+    return list(fields)
+
+# -------------------- Benchmark --------------------
+
+def synthetic_names(n_names, seed=1):
+
+    # Repeatable ingredient-like names: one to three words from a made-up vocabulary.
+
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    vocabulary = ["".join(rng.choice(letters, rng.integers(3, 9))) for _ in range(5000)]
+    names = set()
+    while len(names) < n_names:
+        words = rng.choice(len(vocabulary), rng.integers(1, 4), replace=False).tolist()
+        names.add(" ".join(vocabulary[word] for word in words))
+    return sorted(names)
+
+def misspell(name, rng):
+
+    # Shuffles the words of a name, then swaps two letters or drops one.
+
+    words = name.split()
+    rng.shuffle(words)
+    text = list(" ".join(words))
+    position = int(rng.integers(0, len(text) - 1))
+    if rng.random() < 0.5:
+        text[position], text[position + 1] = text[position + 1], text[position]
+    else:
+        del text[position]
+    return "".join(text).title()
+
+def benchmark(n_names=100_000, n_queries=2_000, seed=1):
+
+    # Builds an index over n_names names, then times single queries (cache
+    # cold) and the bulk resolution of a book that repeats them.
+
+    names = synthetic_names(n_names, seed)
+    start = time.perf_counter()
+    matcher = NameMatcher(names)
+    build_time = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    targets = [names[index] for index in rng.integers(0, len(names), n_queries).tolist()]
+    queries = [misspell(name, rng) for name in targets]
+    start = time.perf_counter()
+    found = [next(iter(matcher.match(query)), (None, 0))[0] for query in queries]
+    query_time = time.perf_counter() - start
+
+    book = [queries[index] for index in rng.integers(0, n_queries, 100_000).tolist()]
+    matcher.cache.clear()
+    start = time.perf_counter()
+    matcher.resolve_many(book, threshold=0)
+    bulk_time = time.perf_counter() - start
+
+    hit_rate = sum(found_name == target for found_name, target in zip(found, targets)) / n_queries
+    print(f"Names: {len(matcher):,}  Trigrams: {len(matcher.postings):,}  Queries: {n_queries:,}")
+    print(f"Build index:       {build_time:8.3f} s")
+    print(f"Single queries:    {query_time / n_queries * 1e3:8.3f} ms each  (right name first {hit_rate:.1%})")
+    print(f"Bulk resolve:      {bulk_time:8.3f} s  ({len(book):,} rows, cached per raw string)")
+    return hit_rate > 0.9
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Match free-text ingredient names to the catalog.")
+    parser.add_argument("books", nargs="*", help="CSV or JSONL recipe books")
+    parser.add_argument("--catalog", default="ingredient_catalog.db", help="ingredient catalog to match against")
+    parser.add_argument("--threshold", type=float, default=MATCH_THRESHOLD, help="lowest similarity to accept")
+    parser.add_argument("--rewrite", action="store_true", help="write the books back out with matched names")
+    parser.add_argument("--benchmark", action="store_true", help="run the matching benchmark instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return 0 if benchmark() else 1
+    if not args.books:
+        parser.error("give at least one recipe book, or --benchmark")
+
+    with IngredientCatalog(args.catalog) as catalog:
+        matcher = NameMatcher.from_catalog(catalog)
+    entries = chain.from_iterable(read_recipe_book(path) for path in args.books)
+
+    if args.rewrite:
+        # extrasaction="ignore" only drops the None key DictReader gives a line's surplus values
+        writer = csv.DictWriter(sys.stdout, fieldnames=book_fields(args.books), extrasaction="ignore")
+        writer.writeheader()
+        for line_num, row, error in resolve_book(entries, matcher, args.threshold):
+            if error is not None:
+                print(f"❌ line {line_num}: {error}", file=sys.stderr)
+            else:
+                writer.writerow(row)
+        return 0
+
+    raws = {row["ingredient"] for _, row, error in entries
+            if error is None and row.get("ingredient") and isinstance(row["ingredient"], str)}
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["ingredient", "match", "similarity"])
+    unmatched = 0
+    for raw in sorted(raws, key=normalize_name):
+        ranked = matcher.match(raw, 1)
+        if ranked and ranked[0][1] >= args.threshold:
+            writer.writerow([raw, ranked[0][0], f"{ranked[0][1]:.2f}"])
+        else:
+            writer.writerow([raw, "", f"{ranked[0][1]:.2f}" if ranked else ""])
+            unmatched += 1
+    print(f"{len(raws)} ingredient names, {unmatched} without a catalog match.", file=sys.stderr)
+    return 1 if unmatched else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+import csv
+import sys
+import time
+from functools import lru_cache
+from math import ceil, gcd
+
+import numpy as np
+
+from .batch_costing import parse_positive
+from .conversion_graph import CONVERSIONS
+from .ingredient_catalog import DENSITIES, IngredientCatalog
+from .supplier_offers import OfferIndex
+from .units import UNIT_REGISTRY
+
+# -------------------- Pack Optimizer --------------------
+
+# Costing charges a share of the purchase: amount used / amount bought x cost.
+# Buying for a production run means buying whole packs, so this works out the
+# cheapest mix of packs (from every supplier offer) that covers what is needed,
+# and reports the waste and what the purchase really costs.
+#
+# Per ingredient it is an unbounded "cover at least this much" knapsack,
+# solved by dynamic programming over whole quantities:
+#     cheapest(q) = min over packs of pack cost + cheapest(q - pack size)
+# with cheapest(q <= 0) = 0. Quantities are counted in thousandths of a base
+# unit (QUANTUM per g, ml or item). Pack sizes are rounded down and needs
+# up, so a 1 lb pack (453.592 g) is never counted as more than it holds and
+# a plan always covers the need. Sizes are divided by their greatest common
+# divisor, so packs of 500 g, 1 kg and 5 kg make a table of 2 steps per kg.
+# The table for a set of packs is memoized and only grows as bigger needs
+# come in, so ingredients sold in the same packs at the same prices share it.
+#
+# The table is capped at MAX_STEPS entries. Sizes with a small common
+# divisor (946 ml and 3785 ml) would otherwise need one entry per ml. Past
+# the cap, the best-value pack is bought until what is left fits in the
+# table, and only that remainder is solved exactly.
+#
+#     python -m recipe_cost packs --catalog shop.db needs.csv
+
+NEED_FIELDS = ["ingredient", "amount", "unit"]
+
+PLAN_FIELDS = ["ingredient", "needed", "bought", "waste", "packs", "purchase_cost", "proportional_cost"]
+
+# Solved pack sets kept for reuse
+SOLVER_CACHE_SIZE = 4096
+
+# Whole quantities per base unit: pack sizes and needs are counted in thousandths
+QUANTUM = 1000
+
+# Largest table one pack set may build, in steps
+MAX_STEPS = 20_000
+
+class PackSolver:
+
+    def __init__(self, sizes, costs, max_steps=MAX_STEPS):
+
+        # sizes in whole quanta (all greater than zero), one cost per pack.
+
+        self.step = 0
+        for size in sizes:
+            self.step = gcd(self.step, size)
+        self.sizes = [size // self.step for size in sizes]
+        self.costs = list(costs)
+        self.max_steps = max_steps
+        self.cheapest = [0.0]       # steps -> cheapest cost covering at least that many
+        self.choice = [None]        # steps -> pack index bought last
+
+        # Bought in bulk past max_steps: lowest cost per unit, biggest on a tie
+        self.bulk = min(range(len(self.sizes)), key=lambda pack: (self.costs[pack] / self.sizes[pack],
+                                                                  -self.sizes[pack]))
+
+    def extend(self, steps):
+
+        # Fills the table up to steps (the memoized part: done once per size).
+
+        cheapest = self.cheapest
+        choice = self.choice
+        packs = list(enumerate(zip(self.sizes, self.costs)))
+        for quantity in range(len(cheapest), steps + 1):
+            best_cost = None
+            best_pack = None
+            for pack, (size, cost) in packs:
+                total = cost + cheapest[quantity - size if quantity > size else 0]
+                if best_cost is None or total < best_cost:
+                    best_cost = total
+                    best_pack = pack
+            cheapest.append(best_cost)
+            choice.append(best_pack)
+
+    def solve(self, need):
+
+        # Returns (count of each pack, cost) covering need whole quanta.
+
+        steps = max(0, -(-need // self.step))
+        counts = [0] * len(self.sizes)
+        cost = 0
+        if steps > self.max_steps:
+            bulk_packs = -(-(steps - self.max_steps) // self.sizes[self.bulk])
+            counts[self.bulk] = bulk_packs
+            cost = bulk_packs * self.costs[self.bulk]
+            steps = max(0, steps - bulk_packs * self.sizes[self.bulk])
+        if steps >= len(self.cheapest):
+            self.extend(steps)
+        quantity = steps
+        while quantity > 0:
+            pack = self.choice[quantity]
+            counts[pack] += 1
+            quantity -= self.sizes[pack]
+        return counts, cost + self.cheapest[steps]
+
+def pack_quanta(offer):
+
+    # Pack size in whole quanta, rounded down (the 1e-6 absorbs float noise,
+    # so 453.592 g is 453592 and not 453591).
+
+    return int(offer["pack_base"] * QUANTUM + 1e-6)
+
+class PackOptimizer:
+
+    def __init__(self, index, cache_size=SOLVER_CACHE_SIZE):
+        self.index = index
+        self.cache_size = cache_size
+        self.solvers = {}           # (sizes, costs) -> PackSolver
+
+    def solver(self, offers):
+        key = (tuple(pack_quanta(offer) for offer in offers), tuple(offer["cost_purchased"] for offer in offers))
+        solver = self.solvers.get(key)
+        if solver is None:
+            if len(self.solvers) >= self.cache_size:
+                self.solvers.pop(next(iter(self.solvers)))
+            solver = self.solvers[key] = PackSolver(*key)
+        return solver
+
+    def plan(self, name, amount, unit):
+
+        # Cheapest whole-pack purchase of amount unit of an ingredient.
+        # Tries every category it is sold in that the unit converts to.
+        # Raises ValueError if it has no usable offers.
+
+        entry = self.index.get(name)
+        if entry is None:
+            raise ValueError(f"no offers for {name!r}")
+        unit_id = UNIT_REGISTRY.lookup(unit)
+        if unit_id is None:
+            raise ValueError(f"unknown unit: {unit!r}")
+        source = UNIT_REGISTRY.categories[unit_id]
+        density = DENSITIES.get(entry["name"])
+
+        best = None
+        for target, offers in entry["offers"].items():
+            try:
+                need = UNIT_REGISTRY.to_base(amount, unit_id) * CONVERSIONS.category_factor(source, target, density)
+            except ValueError:
+                continue
+
+            # Packs too small to count in quanta can't be planned with
+            offers = [offer for offer in offers if pack_quanta(offer)]
+            if not offers:
+                continue
+            counts, cost = self.solver(offers).solve(ceil(need * QUANTUM - 1e-6))
+            if best is None or cost < best["purchase_cost"]:
+                bought = sum(count * offer["pack_base"] for count, offer in zip(counts, offers))
+                best = {
+                    "ingredient": entry["display_name"],
+                    "category": UNIT_REGISTRY.category_names[target],
+                    "needed": need,
+                    "bought": bought,
+                    "waste": bought - need,
+                    "packs": [(count, offer) for count, offer in zip(counts, offers) if count],
+                    "purchase_cost": cost,
+                    "proportional_cost": need * min(offer["cost_per_base"] for offer in offers),
+                }
+        if best is None:
+            categories = " or ".join(sorted(UNIT_REGISTRY.category_names[target] for target in entry["offers"]))
+            raise ValueError(f"{entry['display_name']} is sold by {categories}, not {unit}")
+        return best
+
+    def plan_many(self, needs):
+
+        # Yields (plan, error) for every (name, amount, unit) need.
+
+        for name, amount, unit in needs:
+            try:
+                yield self.plan(name, amount, unit), None
+            except ValueError as error:
+                yield {"ingredient": str(name).strip()}, str(error)
+
+# -------------------- Files --------------------
+
+def base_unit_name(category):
+
+    # The unit whose factor is 1 in a category (g, ml, unit).
+
+    for unit_id, factor in enumerate(UNIT_REGISTRY.factors):
+        if factor == 1 and UNIT_REGISTRY.category_names[UNIT_REGISTRY.categories[unit_id]] == category:
+            return UNIT_REGISTRY.names[unit_id]
+    return ""
+
+def describe_packs(packs):
+    return " + ".join(f"{count} x {offer['amount_purchased']:g} {offer['purchased_unit']}"
+                      + (f" ({offer['supplier']})" if offer["supplier"] else "")
+                      for count, offer in packs)
+
+def read_needs_csv(path):
+
+    # Reads NEED_FIELDS rows as (name, amount, unit).
+
+    with open(path, newline="", encoding="utf-8") as source:
+        for line_num, row in enumerate(csv.DictReader(source), 2):
+            try:
+                yield row["ingredient"], parse_positive(row["amount"], "amount"), row["unit"]
+            except (KeyError, ValueError) as error:
+                raise ValueError(f"{path} line {line_num}: {error}")
+
+def write_plans_csv(plans, out):
+
+    # Writes one CSV line per planned purchase, passing the plans through.
+
+    writer = csv.writer(out)
+    writer.writerow(PLAN_FIELDS)
+    for plan, error in plans:
+        if error is None:
+            unit = base_unit_name(plan["category"])
+            writer.writerow([plan["ingredient"], f"{plan['needed']:g} {unit}", f"{plan['bought']:g} {unit}",
+                             f"{plan['waste']:g} {unit}", describe_packs(plan["packs"]),
+                             f"{plan['purchase_cost']:.2f}", f"{plan['proportional_cost']:.2f}"])
+        yield plan, error
+
+# -------------------- Benchmark --------------------
+
+def benchmark(n_ingredients=5_000, seed=1):
+
+    # Plans a purchase for n_ingredients, each sold in 2 to 5 pack sizes
+    # (multiples of 250 g) with bulk discounts, and checks a sample of the
+    # plans against a plain recursive search. Then plans big needs in packs
+    # that don't share a round size (1 lb and 2 lb, 946 ml and 3785 ml),
+    # which go past MAX_STEPS, and checks every plan covers its need.
+
+    rng = np.random.default_rng(seed)
+    sizes = [250, 500, 1000, 2000, 2500, 5000, 10000, 25000]
+    offers = []
+    for ingredient in range(n_ingredients):
+        for size in sorted(rng.choice(sizes, rng.integers(2, 6), replace=False).tolist()):
+            offers.append(synthetic_offer(f"ingredient {ingredient}", size, rng))
+    optimizer = PackOptimizer(OfferIndex(offers))
+    needs = [(f"ingredient {ingredient}", float(amount), "g")
+             for ingredient, amount in enumerate(rng.uniform(100, 20_000, n_ingredients).round(1).tolist())]
+
+    start = time.perf_counter()
+    plans = list(optimizer.plan_many(needs))
+    plan_time = time.perf_counter() - start
+
+    matches = all(error is None for _, error in plans)
+    for (name, amount, _), (plan, _) in list(zip(needs, plans))[:200]:
+        group = optimizer.index.get(name)["offers"][UNIT_REGISTRY.category_ids["weight"]]
+        packs = [(offer["pack_base"], offer["cost_purchased"]) for offer in group]
+
+        # Top-down search over the unscaled grams, as a check on the table
+        @lru_cache(maxsize=None)
+        def cheapest(need):
+            return 0 if need <= 0 else min(cost + cheapest(need - size) for size, cost in packs)
+
+        matches = matches and abs(cheapest(amount) - plan["purchase_cost"]) < 1e-6
+
+    awkward = []
+    for ingredient in range(200):
+        pair = (453.592, 907.185) if ingredient % 2 else (946, 3785)
+        awkward.extend(synthetic_offer(f"awkward {ingredient}", size, rng) for size in pair)
+    awkward_optimizer = PackOptimizer(OfferIndex(awkward))
+    big_needs = [(f"awkward {ingredient}", float(amount), "g")
+                 for ingredient, amount in enumerate(rng.uniform(1_000, 500_000, 200).round(3).tolist())]
+    start = time.perf_counter()
+    awkward_plans = list(awkward_optimizer.plan_many(big_needs))
+    awkward_time = time.perf_counter() - start
+    covered = all(error is None and plan["bought"] >= plan["needed"] - 1e-9 for plan, error in awkward_plans)
+
+    waste = sum(plan["waste"] for plan, _ in plans)
+    purchase = sum(plan["purchase_cost"] for plan, _ in plans)
+    proportional = sum(plan["proportional_cost"] for plan, _ in plans)
+    print(f"Ingredients: {n_ingredients:,}  Offers: {len(offers):,}")
+    print(f"Plan purchases:    {plan_time:8.3f} s  ({plan_time / n_ingredients * 1e6:,.0f} us each)")
+    print(f"Purchase cost:     ${purchase:,.2f}  (proportional share ${proportional:,.2f}, waste {waste / 1000:,.1f} kg)")
+    print(f"Matches search:    {'yes' if matches else 'NO'}")
+    print(f"Odd pack sizes:    {awkward_time:8.3f} s  ({len(big_needs)} needs up to 500 kg, "
+          f"all covered: {'yes' if covered else 'NO'})")
+    return matches and covered
+
+def synthetic_offer(name, size, rng):
+
+    # One gram-priced offer for a pack of size g, a little cheaper per gram in bigger packs.
+
+    cost = round(size / 1000 * float(rng.uniform(2, 10)) * (size / 1000) ** -0.1, 2)
+    return {"name": name, "display_name": name, "supplier": "", "category": "weight", "pack_base": float(size),
+            "cost_per_base": cost / size, "purchased_unit": "g", "amount_purchased": float(size),
+            "cost_purchased": cost}
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plan the cheapest whole-pack purchases for a production run.")
+    parser.add_argument("needs", nargs="?", help=f"CSV of amounts needed ({', '.join(NEED_FIELDS)})")
+    parser.add_argument("--catalog", default="ingredient_catalog.db", help="ingredient catalog holding the offers")
+    parser.add_argument("--benchmark", action="store_true", help="run the optimizer benchmark instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return 0 if benchmark() else 1
+    if not args.needs:
+        parser.error("give a CSV of needs, or --benchmark")
+
+    with IngredientCatalog(args.catalog) as catalog:
+        optimizer = PackOptimizer(OfferIndex.from_catalog(catalog))
+    try:
+        plans = optimizer.plan_many(read_needs_csv(args.needs))
+        total = 0
+        errors = 0
+        for plan, error in write_plans_csv(plans, sys.stdout):
+            if error is None:
+                total += plan["purchase_cost"]
+            else:
+                errors += 1
+                print(f"❌ {plan['ingredient'] or 'Unknown ingredient'}: {error}", file=sys.stderr)
+    except ValueError as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 1
+    print(f"Purchase total ${total:.2f}, {errors} ingredients not planned.", file=sys.stderr)
+    return 1 if errors else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
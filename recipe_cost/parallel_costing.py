@@ -0,0 +1,148 @@
+import io
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, groupby, islice
+
+from .batch_costing import (cost_recipe, cost_recipe_book, read_recipe_book, recipe_key,
+                            report_errors, write_results_csv, write_results_jsonl)
+from .ingredient_catalog import DENSITIES, IngredientCatalog
+from .units import UNIT_REGISTRY
+
+# -------------------- Parallel Costing --------------------
+
+# Spreads a recipe book over several processes.
+# The book is cut into shards of whole recipes. The unit registry and the
+# catalog prices are sent to each worker once, when it starts, and only
+# the shards travel with each task.
+# Results come back in book order, so the output is identical to
+# cost_recipe_book() on one process.
+
+SHARD_SIZE = 200
+
+# Set in each worker by start_worker()
+worker_prices = None
+
+def start_worker(registry, prices, densities):
+
+    # Runs once in each worker process.
+    # The registry and densities are copied into the worker's UNIT_REGISTRY
+    # and DENSITIES so that every module already holding a reference to
+    # them sees units and densities added here.
+
+    global worker_prices
+    UNIT_REGISTRY.__dict__.update(registry.__dict__)
+    DENSITIES.densities = densities
+    worker_prices = prices
+
+def cost_shard(shard):
+
+    # Costs a list of (recipe name, entries) pairs inside a worker.
+
+    return [cost_recipe(recipe_name, entries, worker_prices) for recipe_name, entries in shard]
+
+def make_shards(entries, shard_size=SHARD_SIZE):
+
+    # Groups entries into recipes, then yields lists of shard_size recipes.
+
+    recipes = ((recipe_name, list(recipe_entries))
+               for recipe_name, recipe_entries in groupby(entries, key=recipe_key))
+    while True:
+        shard = list(islice(recipes, shard_size))
+        if not shard:
+            return
+        yield shard
+
+def cost_recipe_book_parallel(entries, workers=None, prices=None, shard_size=SHARD_SIZE):
+
+    # Parallel version of cost_recipe_book(): yields one result per recipe, in order.
+    # prices is an optional PriceTable (see IngredientCatalog.snapshot()).
+    # At most two shards per worker are in flight, so memory stays bounded.
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=start_worker,
+                             initargs=(UNIT_REGISTRY, prices, DENSITIES.densities)) as executor:
+        pending = deque()
+        for shard in make_shards(entries, shard_size):
+            pending.append(executor.submit(cost_shard, shard))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+# -------------------- Benchmark --------------------
+
+def benchmark(n_rows=500_000, max_workers=None):
+
+    # Costs the same synthetic book serially and with 1, 2, 4... workers,
+    # checking that every run writes exactly the same CSV output.
+
+    from .vector_costing import synthetic_book
+
+    max_workers = max_workers or os.cpu_count() or 1
+    entries = list(synthetic_book(n_rows))
+
+    def render(results):
+        out = io.StringIO()
+        for _ in write_results_csv(results, out):
+            pass
+        return out.getvalue()
+
+    start = time.perf_counter()
+    serial = render(cost_recipe_book(iter(entries)))
+    serial_time = time.perf_counter() - start
+    print(f"Rows: {n_rows:,}  CPUs: {os.cpu_count()}")
+    print(f"serial      {serial_time:8.3f} s")
+
+    worker_counts = sorted({1, max_workers} | {2 ** power for power in range(1, max_workers.bit_length())
+                                               if 2 ** power <= max_workers})
+    same = True
+    for workers in worker_counts:
+        start = time.perf_counter()
+        output = render(cost_recipe_book_parallel(iter(entries), workers))
+        elapsed = time.perf_counter() - start
+        same = same and output == serial
+        print(f"{workers:3} workers {elapsed:8.3f} s  {serial_time / elapsed:5.2f}x  "
+              f"{'same output' if output == serial else 'OUTPUT DIFFERS'}")
+    return same
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cost recipe books on several processes.")
+    parser.add_argument("books", nargs="*", help="CSV or JSONL recipe books")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="recipes sent to a worker at a time")
+    parser.add_argument("--catalog", help="ingredient catalog for rows without purchase details")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv", help="output format")
+    parser.add_argument("--benchmark", type=int, metavar="ROWS", help="run the scaling benchmark instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return 0 if benchmark(args.benchmark, args.workers) else 1
+    if not args.books:
+        parser.error("give at least one recipe book, or --benchmark ROWS")
+
+    prices = None
+    if args.catalog:
+        with IngredientCatalog(args.catalog) as catalog:
+            prices = catalog.snapshot()
+
+    writer = write_results_csv if args.format == "csv" else write_results_jsonl
+    entries = chain.from_iterable(read_recipe_book(path) for path in args.books)
+    results = report_errors(cost_recipe_book_parallel(entries, args.workers, prices, args.shard_size),
+                            sys.stderr)
+
+    recipes = 0
+    bad_rows = 0
+    for result in writer(results, sys.stdout):
+        recipes += 1
+        bad_rows += len(result["errors"])
+
+    print(f"Costed {recipes} recipes, {bad_rows} bad rows.", file=sys.stderr)
+    return 1 if bad_rows else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
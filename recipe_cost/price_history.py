@@ -0,0 +1,380 @@
+import csv
+import os
+import sys
+import tempfile
+import time
+import unicodedata
+from datetime import date
+from itertools import chain
+
+import numpy as np
+
+from .batch_costing import (cost_recipe_book, parse_positive, read_recipe_book, report_errors,
+                            write_results_csv)
+from .ingredient_catalog import PriceTable, normalize_name, unit_category
+from .units import RENAMED_CATEGORIES, UNIT_REGISTRY
+
+# -------------------- Price History --------------------
+
+# Every price an ingredient has had, for costing recipes "as of" a past date.
+# Stored in a folder of append-only column files:
+#     ingredients.tsv   one line per ingredient ID: name, display name, category
+#     keys.i64          ingredient ID << 32 | effective date (date.toordinal())
+#     costs.f64         cost per base unit (per g, per ml or per item)
+# plus a sorted index (index_keys.i64 / index_rows.i64) that is rebuilt
+# after new prices are added. The column and index files are memory-mapped,
+# so an as-of lookup for a whole book is one np.searchsorted() over mapped
+# memory: nothing is parsed and no objects are made per query.
+#
+# The price on a date is the latest one effective on or before it; when one
+# ingredient has two prices for the same day, the one added last wins.
+#
+# A batch of prices is checked in full before anything is written, then
+# appended to every file or (truncated back on failure) to none. If the
+# process dies between two writes, opening the history cuts keys.i64 and
+# costs.f64 back to the rows both of them hold, so they never go out of step.
+#
+#     python -m recipe_cost history --add prices.csv
+#     python -m recipe_cost history --as-of 2025-03-01 book.csv
+
+HISTORY_PATH = "price_history"
+
+PRICE_FIELDS = ["ingredient", "date", "amount_purchased", "purchased_unit", "cost_purchased"]
+
+DATE_BITS = 32
+
+def parse_date(value):
+
+    # Accepts a date or an ISO date string (2025-03-01).
+
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value).strip())
+    except ValueError:
+        raise ValueError(f"not a date (YYYY-MM-DD): {value!r}")
+
+def date_ordinal(value):
+    return parse_date(value).toordinal()
+
+class PriceHistory:
+
+    def __init__(self, path=HISTORY_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.repair()
+        self.names = {}             # normalized name -> ingredient ID
+        self.ingredients = []       # ingredient ID -> (name, display name, category)
+        with open(self.file("ingredients.tsv"), "a+", encoding="utf-8") as source:
+            source.seek(0)
+            for line in source:
+                name, display_name, category = line.rstrip("\n").split("\t")
+                category = RENAMED_CATEGORIES.get(category, category)
+                self.names[name] = len(self.ingredients)
+                self.ingredients.append((name, display_name, category))
+        self.mapped = None
+
+    def file(self, name):
+        return os.path.join(self.path, name)
+
+    def __len__(self):
+        return os.path.getsize(self.file("keys.i64")) // 8 if os.path.exists(self.file("keys.i64")) else 0
+
+    def sizes(self):
+
+        # Byte size of each append-only file (0 if it isn't there yet).
+
+        return {name: os.path.getsize(self.file(name)) if os.path.exists(self.file(name)) else 0
+                for name in ("ingredients.tsv", "keys.i64", "costs.f64")}
+
+    def truncate(self, sizes):
+        for name, size in sizes.items():
+            if os.path.exists(self.file(name)) and os.path.getsize(self.file(name)) > size:
+                with open(self.file(name), "r+b") as out:
+                    out.truncate(size)
+
+    def repair(self):
+
+        # Undoes a batch that was cut off part way: a half-written last line
+        # of ingredients.tsv, and rows that only one of the columns holds.
+
+        sizes = self.sizes()
+        if sizes["ingredients.tsv"]:
+            with open(self.file("ingredients.tsv"), "rb") as source:
+                text = source.read()
+            sizes["ingredients.tsv"] = text.rfind(b"\n") + 1
+        rows = min(sizes["keys.i64"], sizes["costs.f64"]) // 8
+        sizes["keys.i64"] = sizes["costs.f64"] = rows * 8
+        self.truncate(sizes)
+
+    # -------------------- Adding Prices --------------------
+
+    def ingredient_id(self, name, category=None):
+
+        # Returns the ID for an ingredient, adding it when a category is given.
+        # An ingredient keeps the category of its first price. New ingredients
+        # are only kept in memory here; add_many() writes them out.
+
+        key = normalize_name(name)
+        ingredient_id = self.names.get(key)
+        if ingredient_id is not None:
+            if category is not None and self.ingredients[ingredient_id][2] != category:
+                raise ValueError(f"{name} is priced by {self.ingredients[ingredient_id][2]}, not {category}")
+            return ingredient_id
+        if category is None:
+            return None
+        if not key:
+            raise ValueError("ingredient name can't be blank")
+        display_name = str(name).strip()
+        if any(unicodedata.category(char) == "Cc" for char in display_name):
+            # ingredients.tsv is split on tabs and line breaks
+            raise ValueError(f"ingredient name can't contain tabs, line breaks or control characters: {name!r}")
+        ingredient_id = len(self.ingredients)
+        self.names[key] = ingredient_id
+        self.ingredients.append((key, display_name, category))
+        return ingredient_id
+
+    def forget(self, count):
+
+        # Drops the in-memory ingredients from ID count on (a rejected batch).
+
+        for name, _, _ in self.ingredients[count:]:
+            del self.names[name]
+        del self.ingredients[count:]
+
+    def add_many(self, prices):
+
+        # Appends (name, date, amount_purchased, purchased_unit, cost_purchased)
+        # prices in one write per file. Every price is checked first, so a
+        # bad one raises ValueError with nothing written. Returns how many were added.
+
+        known = len(self.ingredients)
+        keys = []
+        costs = []
+        try:
+            for name, when, amount_purchased, purchased_unit, cost_purchased in prices:
+                unit_id = UNIT_REGISTRY.lookup(purchased_unit)
+                if unit_id is None:
+                    raise ValueError(f"Unknown unit {purchased_unit!r}")
+                if not amount_purchased > 0 or not cost_purchased > 0:
+                    raise ValueError("Amount and cost must be greater than zero")
+                ordinal = date_ordinal(when)
+                ingredient_id = self.ingredient_id(name, unit_category(unit_id))
+                keys.append(ingredient_id << DATE_BITS | ordinal)
+                costs.append(cost_purchased / UNIT_REGISTRY.to_base(amount_purchased, unit_id))
+        except ValueError:
+            self.forget(known)
+            raise
+
+        self.mapped = None
+        sizes = self.sizes()
+        try:
+            with open(self.file("ingredients.tsv"), "a", encoding="utf-8") as out:
+                out.writelines(f"{name}\t{display_name}\t{category}\n"
+                               for name, display_name, category in self.ingredients[known:])
+            with open(self.file("keys.i64"), "ab") as out:
+                np.array(keys, dtype=np.int64).tofile(out)
+            with open(self.file("costs.f64"), "ab") as out:
+                np.array(costs, dtype=np.float64).tofile(out)
+        except BaseException:
+            self.truncate(sizes)
+            self.forget(known)
+            raise
+        return len(keys)
+
+    def add(self, name, when, amount_purchased, purchased_unit, cost_purchased):
+        return self.add_many([(name, when, amount_purchased, purchased_unit, cost_purchased)])
+
+    def add_catalog(self, prices, when):
+
+        # Records every catalog (or PriceTable) entry as effective on when.
+
+        return self.add_many((entry["display_name"], when, entry["amount_purchased"], entry["purchased_unit"],
+                              entry["cost_purchased"]) for entry in prices.entries.values())
+
+    # -------------------- Index --------------------
+
+    def map_file(self, name, dtype):
+        if not os.path.getsize(self.file(name)):
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self.file(name), dtype=dtype, mode="r")
+
+    def columns(self):
+
+        # Maps (sorted keys, rows, costs), rebuilding the index first if
+        # prices were added since it was written.
+
+        if self.mapped is not None:
+            return self.mapped
+        rows = len(self)
+        for name in ("keys.i64", "costs.f64", "index_keys.i64", "index_rows.i64"):
+            open(self.file(name), "ab").close()
+        if os.path.getsize(self.file("index_rows.i64")) // 8 != rows:
+            self.rebuild_index()
+        self.mapped = (self.map_file("index_keys.i64", np.int64), self.map_file("index_rows.i64", np.int64),
+                       self.map_file("costs.f64", np.float64))
+        return self.mapped
+
+    def rebuild_index(self):
+
+        # Sorts the keys (a stable sort, so later prices for the same day
+        # stay after earlier ones) and writes the index next to the columns.
+
+        keys = np.fromfile(self.file("keys.i64"), dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        for name, column in (("index_keys.i64", keys[order]), ("index_rows.i64", order.astype(np.int64))):
+            column.tofile(self.file(name + ".tmp"))
+            os.replace(self.file(name + ".tmp"), self.file(name))
+
+    # -------------------- As-of Lookups --------------------
+
+    def costs_as_of(self, ingredient_ids, when):
+
+        # Cost per base unit of each ingredient ID on a date (one date, or one
+        # per ID), NaN where there was no price yet.
+
+        sorted_keys, rows, costs = self.columns()
+        ingredient_ids = np.asarray(ingredient_ids, dtype=np.int64)
+        ordinals = np.asarray(date_ordinal(when) if isinstance(when, (str, date)) else when, dtype=np.int64)
+        wanted = ingredient_ids << DATE_BITS | ordinals
+
+        found = np.searchsorted(sorted_keys, wanted, side="right") - 1
+        valid = found >= 0
+        valid[valid] = (sorted_keys[found[valid]] >> DATE_BITS) == ingredient_ids[valid]
+        result = np.full(wanted.shape, np.nan)
+        result[valid] = costs[rows[found[valid]]]
+        return result
+
+    def price_as_of(self, name, when):
+
+        # Cost per base unit of one ingredient on a date, or None.
+
+        ingredient_id = self.ingredient_id(name)
+        if ingredient_id is None:
+            return None
+        cost = self.costs_as_of([ingredient_id], when)[0]
+        return None if np.isnan(cost) else float(cost)
+
+    def snapshot(self, when):
+
+        # The prices on a date as a PriceTable, so the batch costing tools
+        # can cost a book as of that date like they would with the catalog.
+        # Prices are shown per smallest unit of the category (1 g, 1 tsp ...).
+
+        costs = self.costs_as_of(np.arange(len(self.ingredients)), when).tolist()
+        smallest = {}
+        for unit_id, factor in enumerate(UNIT_REGISTRY.factors):
+            category = UNIT_REGISTRY.category_names[UNIT_REGISTRY.categories[unit_id]]
+            if category not in smallest or factor < UNIT_REGISTRY.factors[smallest[category]]:
+                smallest[category] = unit_id
+
+        entries = {}
+        for (name, display_name, category), cost in zip(self.ingredients, costs):
+            if cost != cost:
+                continue
+            unit_id = smallest[category]
+            entries[name] = {
+                "name": name,
+                "display_name": display_name,
+                "category": category,
+                "cost_per_base": cost,
+                "purchased_unit": UNIT_REGISTRY.names[unit_id],
+                "amount_purchased": 1,
+                "cost_purchased": cost * UNIT_REGISTRY.factors[unit_id],
+            }
+        return PriceTable(entries)
+
+# -------------------- Files --------------------
+
+def read_prices_csv(path):
+
+    # Reads PRICE_FIELDS rows for PriceHistory.add_many().
+
+    with open(path, newline="", encoding="utf-8") as source:
+        for line_num, row in enumerate(csv.DictReader(source), 2):
+            try:
+                yield (row["ingredient"], parse_date(row["date"]),
+                       parse_positive(row["amount_purchased"], "amount_purchased"),
+                       row["purchased_unit"], parse_positive(row["cost_purchased"], "cost_purchased"))
+            except (KeyError, ValueError) as error:
+                raise ValueError(f"{path} line {line_num}: {error}")
+
+# -------------------- Benchmark --------------------
+
+def benchmark(n_ingredients=5_000, n_dates=200, seed=1):
+
+    # Fills a throwaway history with n_ingredients x n_dates prices, then
+    # times a million as-of lookups against the mapped index.
+
+    with tempfile.TemporaryDirectory() as path:
+        return run_benchmark(PriceHistory(path), n_ingredients, n_dates, seed)
+
+def run_benchmark(history, n_ingredients, n_dates, seed):
+    rng = np.random.default_rng(seed)
+    first = date(2020, 1, 1).toordinal()
+    dates = np.sort(rng.choice(np.arange(first, first + 2000), n_dates, replace=False))
+    start = time.perf_counter()
+    history.add_many(
+        (f"ingredient {ingredient}", date.fromordinal(int(day)), 1, "kg", float(cost))
+        for day in dates
+        for ingredient, cost in enumerate(rng.uniform(0.5, 20, n_ingredients))
+    )
+    history.columns()
+    build_time = time.perf_counter() - start
+
+    ids = rng.integers(0, n_ingredients, 1_000_000)
+    when = rng.integers(first, first + 2000, len(ids))
+    start = time.perf_counter()
+    costs = history.costs_as_of(ids, when)
+    lookup_time = time.perf_counter() - start
+
+    print(f"Prices: {len(history):,}  Lookups: {len(ids):,}  ({np.isnan(costs).mean():.1%} before first price)")
+    print(f"Append and index: {build_time:8.3f} s")
+    print(f"As-of lookups:    {lookup_time:8.3f} s  ({lookup_time / len(ids) * 1e9:.0f} ns each)")
+    history.mapped = None
+    return True
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Record prices over time and cost books as of a date.")
+    parser.add_argument("books", nargs="*", help="CSV or JSONL recipe books to cost with --as-of")
+    parser.add_argument("--history", default=HISTORY_PATH, help="price history folder")
+    parser.add_argument("--add", metavar="PRICES", help=f"CSV of prices to add ({', '.join(PRICE_FIELDS)})")
+    parser.add_argument("--as-of", metavar="DATE", help="cost the books with the prices on this date")
+    parser.add_argument("--benchmark", action="store_true", help="run the lookup benchmark instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return 0 if benchmark() else 1
+    if args.as_of:
+        try:
+            parse_date(args.as_of)
+        except ValueError as error:
+            parser.error(f"--as-of: {error}")
+    history = PriceHistory(args.history)
+    if args.add:
+        try:
+            added = history.add_many(read_prices_csv(args.add))
+        except ValueError as error:
+            print(f"❌ {error}", file=sys.stderr)
+            return 1
+        print(f"Added {added} prices ({len(history)} in history).", file=sys.stderr)
+    if not args.books:
+        return 0
+    if not args.as_of:
+        parser.error("give --as-of DATE to cost books")
+
+    prices = history.snapshot(args.as_of)
+    entries = chain.from_iterable(read_recipe_book(path) for path in args.books)
+    results = report_errors(cost_recipe_book(entries, prices), sys.stderr)
+    recipes = 0
+    bad_rows = 0
+    for result in write_results_csv(results, sys.stdout):
+        recipes += 1
+        bad_rows += len(result["errors"])
+    print(f"Costed {recipes} recipes as of {args.as_of}, {bad_rows} bad rows.", file=sys.stderr)
+    return 1 if bad_rows else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
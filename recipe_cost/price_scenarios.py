@@ -0,0 +1,271 @@
+import csv
+import json
+import sys
+import time
+from itertools import chain
+
+import numpy as np
+
+from .batch_costing import parse_positive, read_recipe_book
+from .ingredient_catalog import normalize_name
+from .units import UNIT_REGISTRY
+from .vector_costing import cost_book_columns, cost_ingredient_columns, load_book_columns, synthetic_book
+
+# -------------------- Price Scenarios --------------------
+
+# Costs a recipe book under many "what if" price scenarios in one pass:
+#     dairy up 8%, flour down 3%, butter at $9.50 per kg ...
+# The book is parsed and converted to base units once. Each scenario is a
+# row of a scenarios x ingredients matrix of price multipliers, plus an
+# optional matrix of override prices (cost per base unit, NaN where the
+# book's own price is kept). Every recipe total under every scenario then
+# comes out of a few array operations.
+#
+# Scenario file (JSON):
+#     {
+#       "groups": {"dairy": ["milk", "butter", "cream"]},
+#       "scenarios": [
+#         {"name": "dairy +8%, flour -3%", "multipliers": {"dairy": 1.08, "flour": 0.97}},
+#         {"name": "butter $9.50/kg", "overrides": {"butter": {"amount_purchased": 1,
+#                                                             "purchased_unit": "kg",
+#                                                             "cost_purchased": 9.50}}}
+#       ]
+#     }
+# A multiplier on a group applies to every ingredient in it. An override
+# replaces the purchase price first, then any multipliers apply on top.
+
+SCENARIO_FIELDS = ["recipe", "servings", "scenario", "total_cost", "cost_per_serving"]
+
+# Rows x scenarios costed at a time, to bound memory on big books
+CHUNK_CELLS = 4_000_000
+
+# -------------------- Scenario Matrices --------------------
+
+def override_price(override):
+
+    # Cost per base unit, and the unit category, from purchase details.
+
+    if not isinstance(override, dict):
+        raise ValueError("an override must be an object with amount_purchased, purchased_unit and cost_purchased")
+    for key in ("amount_purchased", "purchased_unit", "cost_purchased"):
+        if key not in override:
+            raise ValueError(f"override is missing {key}")
+    unit_id = UNIT_REGISTRY.lookup(override["purchased_unit"])
+    if unit_id is None:
+        raise ValueError(f"unknown purchased_unit: {override['purchased_unit']!r}")
+    amount = parse_positive(override["amount_purchased"], "amount_purchased")
+    cost = parse_positive(override["cost_purchased"], "cost_purchased")
+    return cost / UNIT_REGISTRY.to_base(amount, unit_id), UNIT_REGISTRY.categories[unit_id]
+
+def scenario_entries(scenario, key):
+
+    # The multipliers or overrides of a scenario, which must be an object.
+
+    entries = scenario.get(key, {})
+    if not isinstance(entries, dict):
+        raise ValueError(f"{key} must be an object of ingredient or group names")
+    return entries.items()
+
+def scenario_matrices(columns, scenarios, groups=None):
+
+    # Builds (names, multipliers, overrides) for the ingredients in columns.
+    # multipliers and overrides are scenarios x ingredients arrays.
+    # Names that are not in the book are allowed and change nothing.
+    # Raises ValueError for an override priced in the wrong kind of unit.
+
+    ingredient_ids = {name: index for index, name in enumerate(columns["ingredients"])}
+    group_ids = {
+        normalize_name(group): sorted({ingredient_ids[name] for name in map(normalize_name, members)
+                                       if name in ingredient_ids})
+        for group, members in (groups or {}).items()
+    }
+
+    def targets(name):
+        name = normalize_name(name)
+        if name in group_ids:
+            return group_ids[name]
+        return [ingredient_ids[name]] if name in ingredient_ids else []
+
+    shape = (len(scenarios), len(ingredient_ids))
+    multipliers = np.ones(shape)
+    overrides = np.full(shape, np.nan)
+    # An override replaces the purchase price, so it must be by the same kind of unit
+    row_categories = np.asarray(UNIT_REGISTRY.categories, dtype=np.int64)[columns["purchased_unit"]]
+    names = []
+
+    for index, scenario in enumerate(scenarios):
+        if not isinstance(scenario, dict):
+            raise ValueError(f"scenario {index + 1}: a scenario must be an object")
+        names.append(str(scenario.get("name") or f"scenario {index + 1}"))
+        try:
+            for name, factor in scenario_entries(scenario, "multipliers"):
+                multipliers[index, targets(name)] *= parse_positive(factor, f"multiplier for {name}")
+            for name, override in scenario_entries(scenario, "overrides"):
+                price, category = override_price(override)
+                for ingredient in targets(name):
+                    bought = row_categories[columns["ingredient_index"] == ingredient]
+                    if np.any(bought != category):
+                        raise ValueError(
+                            f"{name} is priced by {UNIT_REGISTRY.category_names[category]}, but the "
+                            f"book buys it by {UNIT_REGISTRY.category_names[bought[bought != category][0]]}")
+                    overrides[index, ingredient] = price
+        except ValueError as error:
+            raise ValueError(f"{names[-1]}: {error}")
+    return names, multipliers, overrides
+
+# -------------------- Costing --------------------
+
+def cost_scenarios(columns, multipliers, overrides=None, chunk_cells=CHUNK_CELLS):
+
+    # Returns (totals, cost per serving), both scenarios x recipes arrays.
+    # The ingredient costs and base amounts are worked out once, then each
+    # chunk of scenarios is one gather, one multiply and one grouped sum.
+    # Rows for one recipe are next to each other (load_book_columns() keeps
+    # them that way), so the grouped sum is np.add.reduceat.
+
+    ingredient_costs = cost_ingredient_columns(columns)
+    if overrides is not None:
+        factors = np.asarray(UNIT_REGISTRY.factors, dtype=np.float64)
+        # Amount used in the purchased category's base unit (density rows convert)
+        used_base = columns["amount_used"] * factors[columns["used_unit"]] * columns["conversion"]
+
+    n_recipes = len(columns["recipes"])
+    counts = np.bincount(columns["recipe_index"], minlength=n_recipes)
+    has_rows = counts > 0
+    starts = (np.cumsum(counts) - counts)[has_rows]
+
+    totals = np.zeros((len(multipliers), n_recipes))
+    step = max(1, chunk_cells // max(1, len(ingredient_costs)))
+    for first in range(0, len(multipliers) if len(ingredient_costs) else 0, step):
+        chunk = slice(first, first + step)
+        row_multipliers = multipliers[chunk][:, columns["ingredient_index"]]
+        if overrides is None:
+            costs = ingredient_costs * row_multipliers
+        else:
+            row_overrides = overrides[chunk][:, columns["ingredient_index"]]
+            costs = np.where(np.isnan(row_overrides), ingredient_costs, used_base * row_overrides) * row_multipliers
+        totals[chunk, has_rows] = np.add.reduceat(costs, starts, axis=1)
+
+    servings = columns["servings"]
+    per_serving = np.divide(totals, servings, out=np.zeros_like(totals), where=servings > 0)
+    return totals, per_serving
+
+def cost_book_scenarios(entries, scenarios, groups=None):
+
+    # Loads the book once and costs it under every scenario.
+    # Returns (columns, scenario names, totals, cost per serving).
+
+    columns = load_book_columns(entries)
+    names, multipliers, overrides = scenario_matrices(columns, scenarios, groups)
+    if np.isnan(overrides).all():
+        overrides = None
+    totals, per_serving = cost_scenarios(columns, multipliers, overrides)
+    return columns, names, totals, per_serving
+
+# -------------------- Files --------------------
+
+def load_scenarios(path):
+
+    # Reads a scenario file. Returns (scenarios, groups).
+    # Raises ValueError when the file is not shaped like the example above.
+
+    with open(path, encoding="utf-8") as source:
+        try:
+            data = json.load(source)
+        except ValueError as error:
+            raise ValueError(f"{path} is not valid JSON: {error}")
+    if not isinstance(data, dict):
+        raise ValueError(f"{path}: expected an object with scenarios and groups")
+    scenarios = data.get("scenarios", [])
+    groups = data.get("groups", {})
+    if not isinstance(scenarios, list):
+        raise ValueError(f"{path}: scenarios must be a list")
+    if not isinstance(groups, dict) or not all(
+            isinstance(members, list) and all(isinstance(member, str) for member in members)
+            for members in groups.values()):
+        raise ValueError(f"{path}: groups must map each group name to a list of ingredient names")
+    return scenarios, groups
+
+def write_scenarios_csv(columns, names, totals, per_serving, out):
+
+    # Writes one CSV line per recipe per scenario.
+
+    writer = csv.writer(out)
+    writer.writerow(SCENARIO_FIELDS)
+    for recipe_num, (recipe, servings) in enumerate(zip(columns["recipes"], columns["servings"].tolist())):
+        for scenario_num, name in enumerate(names):
+            writer.writerow([recipe, servings or None, name, f"{totals[scenario_num, recipe_num]:.2f}",
+                             f"{per_serving[scenario_num, recipe_num]:.2f}"])
+
+# -------------------- Benchmark --------------------
+
+def benchmark(n_rows=100_000, n_scenarios=50, seed=1):
+
+    # Times one pass per scenario (parsing the book each time, as a re-run
+    # does) against costing every scenario in one batch.
+
+    entries = list(synthetic_book(n_rows))
+    rng = np.random.default_rng(seed)
+    groups = {f"group {group}": [f"ingredient {index}" for index in range(group, 500, 10)] for group in range(10)}
+    scenarios = [
+        {"name": f"scenario {index}",
+         "multipliers": {f"group {group}": float(factor) for group, factor in enumerate(rng.uniform(0.9, 1.1, 10))}}
+        for index in range(n_scenarios)
+    ]
+
+    start = time.perf_counter()
+    rerun = []
+    for scenario in scenarios:
+        columns = load_book_columns(iter(entries))
+        _, multipliers, _ = scenario_matrices(columns, [scenario], groups)
+        costs = cost_ingredient_columns(columns) * multipliers[0, columns["ingredient_index"]]
+        rerun.append(np.bincount(columns["recipe_index"], weights=costs, minlength=len(columns["recipes"])))
+    rerun_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns, _, totals, _ = cost_book_scenarios(iter(entries), scenarios, groups)
+    batch_time = time.perf_counter() - start
+
+    _, unchanged, _ = cost_book_columns(columns)
+    same_base = np.allclose(cost_scenarios(columns, np.ones((1, len(columns["ingredients"]))))[0][0], unchanged)
+    matches = same_base and np.allclose(totals, rerun)
+
+    print(f"Rows: {n_rows:,}  Recipes: {len(columns['recipes']):,}  Scenarios: {n_scenarios}")
+    print(f"One run per scenario:  {rerun_time:8.3f} s")
+    print(f"All scenarios at once: {batch_time:8.3f} s  ({rerun_time / batch_time:,.1f}x faster)")
+    print(f"Results match:         {'yes' if matches else 'NO'}")
+    return matches
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cost recipe books under many price scenarios.")
+    parser.add_argument("books", nargs="*", help="CSV or JSONL recipe books")
+    parser.add_argument("--scenarios", metavar="PATH", help="JSON scenario file")
+    parser.add_argument("--benchmark", type=int, metavar="ROWS", help="run the benchmark instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return 0 if benchmark(args.benchmark) else 1
+    if not args.books or not args.scenarios:
+        parser.error("give at least one recipe book and --scenarios, or --benchmark ROWS")
+
+    entries = chain.from_iterable(read_recipe_book(path) for path in args.books)
+    try:
+        scenarios, groups = load_scenarios(args.scenarios)
+        columns, names, totals, per_serving = cost_book_scenarios(entries, scenarios, groups)
+    except ValueError as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 1
+
+    for error in columns["errors"]:
+        recipe = columns["recipes"][error["recipe"]]
+        print(f"❌ {recipe or 'Unknown recipe'} (line {error['line']}): {error['error']}", file=sys.stderr)
+    write_scenarios_csv(columns, names, totals, per_serving, sys.stdout)
+
+    print(f"Costed {len(columns['recipes'])} recipes under {len(names)} scenarios, "
+          f"{len(columns['errors'])} bad rows.", file=sys.stderr)
+    return 1 if columns["errors"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+import csv
+import sys
+import time
+from itertools import chain
+
+import numpy as np
+
+from .batch_costing import cost_row, parse_positive, parse_servings, read_recipe_book
+from .conversion_graph import CONVERSIONS
+from .ingredient_catalog import DENSITIES, IngredientCatalog, normalize_name
+from .sub_recipes import load_recipes, topological_order
+from .units import UNIT_REGISTRY, base_unit_names
+from .vector_costing import synthetic_book
+
+# -------------------- Production Demand --------------------
+
+# Totals what a day's production plan needs of every ingredient.
+# Recipes are read from recipe books as usual. Orders are a stream of
+# recipe,servings lines:
+#     recipe,servings
+#     Pancakes,40
+#     Risotto,12
+#     Pancakes,8
+#
+# Each recipe is compiled once into its ingredient needs in base units
+# (sub-recipes expanded into their own ingredients), with their cost. The
+# orders are then summed into servings per recipe as they stream past, so
+# memory depends on how many recipes and ingredients there are, never on
+# how many order lines. Finally the servings are spread over the compiled
+# needs into one hash-aggregated total per ingredient: the purchase list.
+#
+#     python -m recipe_cost demand --recipes book.csv orders.csv
+#     python -m recipe_cost demand --recipes book.csv --catalog shop.db --packs orders.csv
+
+ORDER_FIELDS = ["recipe", "servings"]
+
+PURCHASE_FIELDS = ["ingredient", "amount", "unit", "cost"]
+
+# -------------------- Recipes --------------------
+
+def base_needs(row, catalog=None, prices=None):
+
+    # Returns (key, base amount, cost) for one ingredient row, where key is
+    # (ingredient name, category ID) and the amount is in the category the
+    # ingredient is bought in (the purchased unit's, or the catalog's).
+
+    cost = cost_row(row, catalog, prices)
+    used_unit = UNIT_REGISTRY.lookup(row.get("used_unit"))
+    source = UNIT_REGISTRY.categories[used_unit]
+    amount_used = parse_positive(row.get("amount_used"), "amount_used")
+    base_amount = UNIT_REGISTRY.to_base(amount_used, used_unit)
+
+    name = normalize_name(row.get("ingredient"))
+    if row.get("purchased_unit"):
+        target = UNIT_REGISTRY.categories[UNIT_REGISTRY.lookup(row["purchased_unit"])]
+    else:
+        entry = catalog.pick(prices[name], amount_used, row.get("used_unit"))
+        target = UNIT_REGISTRY.category_ids[entry["category"]]
+    if target != source:
+        base_amount *= CONVERSIONS.category_factor(source, target, DENSITIES.get(name))
+    return (name, target), base_amount, cost
+
+def compile_recipes(recipes, catalog=None):
+
+    # Compiles every recipe from load_recipes() into
+    # {name: {"servings", "yield_base", "needs": {key: [display name, base amount, cost]}, "errors"}}
+    # for one batch of the recipe. Sub-recipes are compiled first, and a row
+    # using one adds its needs scaled by amount used / yield.
+
+    order, cycles = topological_order(recipes)
+    compiled = {}
+    for name in order:
+        recipe = recipes[name]
+        prices = None
+        if catalog is not None:
+            prices = catalog.get_many(row.get("ingredient") for _, row in recipe["rows"]
+                                      if not row.get("sub_recipe") and not row.get("purchased_unit"))
+        needs = {}
+        errors = list(recipe["errors"])
+        for line_num, row in recipe["rows"]:
+            try:
+                if row.get("sub_recipe"):
+                    scale, sub_needs = sub_recipe_needs(row, compiled)
+                else:
+                    key, base_amount, cost = base_needs(row, catalog, prices)
+                    scale, sub_needs = 1, {key: (str(row.get("ingredient")).strip(), base_amount, cost)}
+            except ValueError as row_error:
+                errors.append({"line": line_num, "error": str(row_error)})
+                continue
+            for key, (display_name, base_amount, cost) in sub_needs.items():
+                total = needs.setdefault(key, [display_name, 0.0, 0.0])
+                total[1] += base_amount * scale
+                total[2] += cost * scale
+
+        yield_base = None
+        if recipe["yield_amount"] is not None:
+            unit_id = UNIT_REGISTRY.lookup(recipe["yield_unit"])
+            if unit_id is None:
+                errors.append({"line": recipe["rows"][0][0] if recipe["rows"] else None,
+                               "error": f"unknown yield unit: {recipe['yield_unit']!r}"})
+            else:
+                yield_base = (unit_id, UNIT_REGISTRY.to_base(recipe["yield_amount"], unit_id))
+        compiled[name] = {"servings": recipe["servings"], "yield_base": yield_base, "needs": needs, "errors": errors}
+
+    # Recipes that were never reached are in, or depend on, a cycle
+    cycle_of = {name: cycle for cycle in cycles for name in cycle}
+    for name, recipe in recipes.items():
+        if name in compiled:
+            continue
+        if name in cycle_of:
+            message = "sub-recipe cycle: " + " -> ".join(cycle_of[name])
+        else:
+            message = "uses a recipe that is part of a sub-recipe cycle"
+        line_num = recipe["rows"][0][0] if recipe["rows"] else None
+        compiled[name] = {"servings": recipe["servings"], "yield_base": None, "needs": {},
+                          "errors": recipe["errors"] + [{"line": line_num, "error": message}]}
+    return compiled
+
+def sub_recipe_needs(row, compiled):
+
+    # Returns (scale, needs) for a row that uses part of a sub-recipe.
+
+    sub = row["sub_recipe"]
+    if sub not in compiled:
+        raise ValueError(f"unknown sub-recipe: {sub!r}")
+    if compiled[sub]["yield_base"] is None:
+        raise ValueError(f"{sub} has no yield, so it can't be used as an ingredient")
+    if compiled[sub]["errors"]:
+        # Its needs are missing the bad rows, so they would understate the purchase list
+        raise ValueError(f"sub-recipe {sub} has bad rows, so it could not be costed")
+    yield_unit, yield_base = compiled[sub]["yield_base"]
+    used_unit = UNIT_REGISTRY.lookup(row.get("used_unit"))
+    if used_unit is None:
+        raise ValueError(f"unknown used unit: {row.get('used_unit')!r}")
+    if not UNIT_REGISTRY.same_category(used_unit, yield_unit):
+        raise ValueError(f"{sub} is made in {UNIT_REGISTRY.names[yield_unit]}, not {row.get('used_unit')}")
+    amount_used = parse_positive(row.get("amount_used"), "amount_used")
+    return UNIT_REGISTRY.to_base(amount_used, used_unit) / yield_base, compiled[sub]["needs"]
+
+# -------------------- Orders --------------------
+
+def read_orders_csv(path):
+
+    # Yields (line number, recipe, servings text) for every order line,
+    # reading one line at a time.
+
+    with open(path, newline="", encoding="utf-8") as source:
+        reader = csv.reader(source)
+        header = [field.strip().lower() for field in next(reader, [])]
+        if "recipe" not in header or "servings" not in header:
+            raise ValueError(f"{path}: the header must have {', '.join(ORDER_FIELDS)}")
+        recipe_col = header.index("recipe")
+        servings_col = header.index("servings")
+        for line in reader:
+            if not line:
+                continue
+            yield (reader.line_num, line[recipe_col] if recipe_col < len(line) else "",
+                   line[servings_col] if servings_col < len(line) else "")
+
+def total_servings(orders, errors):
+
+    # Sums (line number, recipe, servings) orders into {recipe key: servings}.
+    # Bad lines are appended to errors as {"line", "error"}.
+
+    totals = {}
+    for line_num, recipe, servings in orders:
+        try:
+            servings = parse_servings(servings)
+        except ValueError as error:
+            errors.append({"line": line_num, "error": str(error)})
+            continue
+        key = normalize_name(recipe)
+        totals[key] = totals.get(key, 0) + servings
+    return totals
+
+# -------------------- Aggregation --------------------
+
+def aggregate_demand(compiled, servings_by_recipe):
+
+    # Spreads ordered servings over the compiled recipes.
+    # Returns ({key: [display name, base amount, cost]}, errors), where
+    # errors name the ordered recipes that could not be used.
+
+    recipe_keys = {normalize_name(name): name for name in compiled}
+    demand = {}
+    errors = []
+    for key, servings in servings_by_recipe.items():
+        name = recipe_keys.get(key)
+        if name is None:
+            errors.append(f"unknown recipe: {key!r}")
+            continue
+        recipe = compiled[name]
+        if recipe["errors"]:
+            errors.append(f"{name} has {len(recipe['errors'])} bad rows, so it was left out")
+            continue
+        if not recipe["servings"]:
+            errors.append(f"{name} has no servings, so it can't be ordered")
+            continue
+        scale = servings / recipe["servings"]
+        for need_key, (display_name, base_amount, cost) in recipe["needs"].items():
+            total = demand.setdefault(need_key, [display_name, 0.0, 0.0])
+            total[1] += base_amount * scale
+            total[2] += cost * scale
+    return demand, errors
+
+def purchase_list(demand):
+
+    # (display name, amount, base unit, cost) per ingredient, by name.
+
+    units = base_unit_names()
+    return [(display_name, base_amount, units.get(category, ""), cost)
+            for (_, category), (display_name, base_amount, cost) in sorted(demand.items())]
+
+def write_purchase_csv(purchases, out):
+    writer = csv.writer(out)
+    writer.writerow(PURCHASE_FIELDS)
+    for display_name, amount, unit, cost in purchases:
+        writer.writerow([display_name, f"{amount:g}", unit, f"{cost:.2f}"])
+
+# -------------------- Benchmark --------------------
+
+def benchmark(n_orders=1_000_000, n_rows=20_000, seed=1):
+
+    # Aggregates n_orders order lines over a synthetic book, and checks the
+    # totals against costing each recipe's total servings directly.
+
+    recipes, _ = load_recipes(synthetic_book(n_rows))
+    start = time.perf_counter()
+    compiled = compile_recipes(recipes)
+    compile_time = time.perf_counter() - start
+
+    names = list(recipes)
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, len(names), n_orders).tolist()
+    servings = rng.integers(1, 50, n_orders).tolist()
+    orders = ((line_num, names[pick], str(count)) for line_num, (pick, count) in enumerate(zip(picks, servings), 2))
+
+    start = time.perf_counter()
+    errors = []
+    demand, unused = aggregate_demand(compiled, total_servings(orders, errors))
+    aggregate_time = time.perf_counter() - start
+
+    ordered = np.bincount(picks, weights=servings, minlength=len(names))
+    expected = sum(
+        ordered[index] / recipes[name]["servings"] * sum(cost_row(row) for _, row in recipes[name]["rows"])
+        for index, name in enumerate(names)
+    )
+    total = sum(cost for _, _, cost in demand.values())
+    matches = not errors and not unused and abs(total - expected) <= 1e-9 * expected
+
+    print(f"Recipes: {len(names):,}  Order lines: {n_orders:,}  Ingredients: {len(demand):,}")
+    print(f"Compile recipes:   {compile_time:8.3f} s")
+    print(f"Aggregate orders:  {aggregate_time:8.3f} s  ({aggregate_time / n_orders * 1e9:,.0f} ns per line)")
+    print(f"Purchase total:    ${total:,.2f}")
+    print(f"Results match:     {'yes' if matches else 'NO'}")
+    return matches
+
+def main(argv=None):
+    import argparse
+
+    from .pack_optimizer import PackOptimizer, write_plans_csv
+    from .supplier_offers import OfferIndex
+
+    parser = argparse.ArgumentParser(description="Total the ingredients a production plan needs.")
+    parser.add_argument("orders", nargs="*", help=f"CSV order files ({', '.join(ORDER_FIELDS)})")
+    parser.add_argument("--recipes", action="append", default=[], metavar="BOOK", help="CSV or JSONL recipe book")
+    parser.add_argument("--catalog", help="ingredient catalog for rows without purchase details")
+    parser.add_argument("--packs", action="store_true", help="plan whole-pack purchases from the catalog's offers")
+    parser.add_argument("--benchmark", action="store_true", help="run the aggregation benchmark instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return 0 if benchmark() else 1
+    if not args.recipes or not args.orders:
+        parser.error("give at least one --recipes book and one order file, or --benchmark")
+    if args.packs and not args.catalog:
+        parser.error("--packs needs --catalog")
+
+    recipes, bad_rows = load_recipes(chain.from_iterable(read_recipe_book(path) for path in args.recipes))
+    offers = None
+    if args.catalog:
+        with IngredientCatalog(args.catalog) as catalog:
+            if args.packs:
+                # Rows are costed at the cheapest offer, and the same offers are planned in packs
+                offers = OfferIndex.from_catalog(catalog)
+            compiled = compile_recipes(recipes, offers if args.packs else catalog)
+    else:
+        compiled = compile_recipes(recipes)
+    for name, recipe in compiled.items():
+        bad_rows.extend(dict(error, recipe=name) for error in recipe["errors"])
+    for error in bad_rows:
+        print(f"❌ {error.get('recipe') or 'Unknown recipe'} (line {error['line']}): {error['error']}", file=sys.stderr)
+
+    order_errors = []
+    try:
+        servings = total_servings(chain.from_iterable(read_orders_csv(path) for path in args.orders), order_errors)
+    except ValueError as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 1
+    for error in order_errors:
+        print(f"❌ orders (line {error['line']}): {error['error']}", file=sys.stderr)
+    demand, unused = aggregate_demand(compiled, servings)
+    for error in unused:
+        print(f"❌ {error}", file=sys.stderr)
+
+    purchases = purchase_list(demand)
+    if args.packs:
+        optimizer = PackOptimizer(offers)
+        plans = optimizer.plan_many((name, amount, unit) for name, amount, unit, _ in purchases)
+        total = 0
+        for plan, error in write_plans_csv(plans, sys.stdout):
+            if error is None:
+                total += plan["purchase_cost"]
+            else:
+                unused.append(error)
+                print(f"❌ {plan['ingredient']}: {error}", file=sys.stderr)
+    else:
+        write_purchase_csv(purchases, sys.stdout)
+        total = sum(cost for _, _, _, cost in purchases)
+
+    print(f"{sum(servings.values())} servings of {len(servings)} recipes need {len(purchases)} ingredients, "
+          f"${total:.2f}.", file=sys.stderr)
+    return 1 if bad_rows or order_errors or unused else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
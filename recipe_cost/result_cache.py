@@ -0,0 +1,247 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from itertools import groupby
+
+from .amount_parser import parse_amount
+from .batch_costing import cost_recipe, cost_recipe_book, needs_catalog_price, parse_positive, recipe_key
+from .ingredient_catalog import DENSITIES, normalize_name
+from .units import UNIT_REGISTRY
+from .vector_costing import synthetic_book
+
+# -------------------- Result Cache --------------------
+
+# Remembers costed recipes on disk so an unchanged recipe is not costed again.
+# A result is stored under the SHA-256 of what it was worked out from:
+#     for every row the servings, the ingredient, the amount used in base
+#     units (so 1 kg and 1000 g are the same), and the price it was costed
+#     at: the purchase details, or the catalog entry and its version
+# so editing a recipe or changing one of its prices gives a new key, and the
+# old result is never looked at again. Rows are kept in book order, so a
+# hit returns the exact floats the same rows would add up to.
+#
+# Files live in recipe_cache/<first 2 hex digits>/<rest of the digest>.
+# Each file is the SHA-256 of its body on the first line, then the result
+# as JSON; a file that doesn't match its checksum is deleted and costed
+# again. The folder is kept under max_bytes by removing the least recently
+# used files (a hit touches the file's modified time).
+#
+# Only results without bad rows are cached, since error messages carry
+# line numbers that change when a book is edited.
+
+CACHE_PATH = "recipe_cache"
+
+# Bump when the key or the stored result changes shape
+CACHE_FORMAT = 2
+
+MAX_BYTES = 64 * 2**20
+
+class ResultCache:
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.damaged = 0
+
+        # key -> file size, least recently used first
+        files = []
+        os.makedirs(path, exist_ok=True)
+        for shard in os.scandir(path):
+            if shard.is_dir() and len(shard.name) == 2:
+                for entry in os.scandir(shard.path):
+                    if not entry.name.endswith(".tmp"):
+                        stat = entry.stat()
+                        files.append((stat.st_mtime_ns, shard.name + entry.name, stat.st_size))
+        self.sizes = OrderedDict((key, size) for _, key, size in sorted(files))
+        self.total = sum(self.sizes.values())
+
+    def file(self, key):
+        return os.path.join(self.path, key[:2], key[2:])
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def get(self, key):
+
+        # The stored result for key, or None. Damaged files count as misses,
+        # and so do files another process evicted since the folder was scanned.
+
+        if key not in self.sizes:
+            self.misses += 1
+            return None
+        try:
+            with open(self.file(key), "rb") as source:
+                checksum, _, body = source.read().partition(b"\n")
+            if hashlib.sha256(body).hexdigest().encode() != checksum:
+                raise ValueError("checksum does not match")
+            result = json.loads(body)
+            os.utime(self.file(key))
+        except FileNotFoundError:
+            self.misses += 1
+            self.discard(key)
+            return None
+        except (OSError, ValueError):
+            self.damaged += 1
+            self.misses += 1
+            self.discard(key)
+            return None
+        self.sizes.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key, result):
+
+        # Stores result under key, then evicts down to max_bytes.
+
+        body = json.dumps(result, sort_keys=True).encode("utf-8")
+        data = hashlib.sha256(body).hexdigest().encode() + b"\n" + body
+        os.makedirs(os.path.dirname(self.file(key)), exist_ok=True)
+        temporary = self.file(key) + ".tmp"
+        with open(temporary, "wb") as out:
+            out.write(data)
+        os.replace(temporary, self.file(key))
+        self.total += len(data) - self.sizes.pop(key, 0)
+        self.sizes[key] = len(data)
+        while self.total > self.max_bytes and self.sizes:
+            self.discard(next(iter(self.sizes)))
+            self.evicted += 1
+
+    def discard(self, key):
+        self.total -= self.sizes.pop(key, 0)
+        try:
+            os.remove(self.file(key))
+        except FileNotFoundError:
+            pass
+
+# -------------------- Keys --------------------
+
+def base_text(amount, unit_id):
+
+    # An amount as text in base units, so 1 kg, 1000 g and 1/2 + 1/2 kg all
+    # match. Fractions are parsed before converting; anything that still
+    # isn't a number keeps its unit ID so "x kg" and "x g" never collide.
+
+    try:
+        return repr(UNIT_REGISTRY.to_base(float(parse_amount(amount, exact=True)), unit_id))
+    except (TypeError, ValueError):
+        return f"{str(amount).strip()}\x1f{unit_id}"
+
+def row_token(row, catalog=None, prices=None):
+
+    # What one ingredient row's cost depends on, as one line of text.
+    # Raises ValueError for a row that can't be costed.
+
+    name = normalize_name(row.get("ingredient"))
+    used_unit = UNIT_REGISTRY.lookup(row.get("used_unit"))
+    if used_unit is None:
+        raise ValueError(f"unknown used unit: {row.get('used_unit')!r}")
+    if catalog is not None and needs_catalog_price(row):
+        entry = prices.get(name)
+        if entry is None:
+            raise ValueError(f"no catalog price for {row.get('ingredient')!r}")
+        entry = catalog.pick(entry, parse_positive(row.get("amount_used"), "amount_used"), row.get("used_unit"))
+        price = (f"{entry.get('version')}\x1f{entry['purchased_unit']}\x1f{entry['amount_purchased']!r}"
+                 f"\x1f{entry['cost_purchased']!r}")
+        purchased_unit = UNIT_REGISTRY.lookup(entry["purchased_unit"])
+    else:
+        purchased_unit = UNIT_REGISTRY.lookup(row.get("purchased_unit"))
+        if purchased_unit is None:
+            raise ValueError(f"unknown purchased unit: {row.get('purchased_unit')!r}")
+        price = f"{base_text(row.get('amount_purchased'), purchased_unit)}\x1f{str(row.get('cost_purchased')).strip()}"
+
+    # The density only matters when the row crosses from one category to another
+    categories = UNIT_REGISTRY.categories
+    if categories[used_unit] != categories[purchased_unit]:
+        price += f"\x1f{DENSITIES.get(name)!r}"
+    return (f"{str(row.get('servings')).strip()}\x1f{name}\x1f{categories[used_unit]}"
+            f"\x1f{base_text(row.get('amount_used'), used_unit)}\x1f{categories[purchased_unit]}\x1f{price}")
+
+def recipe_digest(entries, catalog=None, prices=None, fixed=False):
+
+    # Hex SHA-256 key for a recipe's (line, row, error) entries, or None
+    # when a row is bad (those recipes are always costed afresh).
+
+    digest = hashlib.sha256(f"{CACHE_FORMAT}\x1f{bool(fixed)}".encode())
+    try:
+        for _, row, error in entries:
+            if error is not None:
+                return None
+            digest.update(b"\x1e" + row_token(row, catalog, prices).encode("utf-8"))
+    except ValueError:
+        return None
+    return digest.hexdigest()
+
+# -------------------- Costing --------------------
+
+def cost_recipe_book_cached(entries, cache, catalog=None, fixed=False):
+
+    # cost_recipe_book() with results read from, and saved to, cache.
+
+    for recipe_name, recipe_entries in groupby(entries, key=recipe_key):
+        recipe_entries = list(recipe_entries)
+        key = None
+        if recipe_name:
+            prices = None
+            if catalog is not None:
+                prices = catalog.get_many(row.get("ingredient") for _, row, error in recipe_entries
+                                          if error is None and needs_catalog_price(row))
+            key = recipe_digest(recipe_entries, catalog, prices, fixed)
+
+        result = cache.get(key) if key else None
+        if result is not None:
+            yield dict(result, recipe=recipe_name, errors=[])
+            continue
+        result = cost_recipe(recipe_name, recipe_entries, catalog, fixed)
+        if key and not result["errors"]:
+            cache.put(key, {field: value for field, value in result.items() if field not in ("recipe", "errors")})
+        yield result
+
+# -------------------- Benchmark --------------------
+
+def benchmark(n_rows=200_000, changed=0.02, fixed=True):
+
+    # Costs a book into an empty cache, then again after changing the
+    # prices of a few recipes, as a nightly run would. Exact fixed-point
+    # money is the default, since that is where costing a recipe costs more
+    # than hashing it; plain float rows are about break-even.
+
+    entries = list(synthetic_book(n_rows))
+    edited = [
+        (line_num, dict(row, cost_purchased=str(float(row["cost_purchased"]) + 1))
+         if int(row["recipe"].split()[-1]) % round(1 / changed) == 0 else row, error)
+        for line_num, row, error in entries
+    ]
+    with tempfile.TemporaryDirectory() as path:
+        cache = ResultCache(path)
+        start = time.perf_counter()
+        list(cost_recipe_book_cached(iter(entries), cache, fixed=fixed))
+        cold_time = time.perf_counter() - start
+
+        cache = ResultCache(path)
+        start = time.perf_counter()
+        warm = list(cost_recipe_book_cached(iter(edited), cache, fixed=fixed))
+        warm_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fresh = list(cost_recipe_book(iter(edited), fixed=fixed))
+        fresh_time = time.perf_counter() - start
+
+        matches = all(a["total_cost"] == b["total_cost"] and a["cost_per_serving"] == b["cost_per_serving"]
+                      for a, b in zip(warm, fresh))
+
+    print(f"Rows: {n_rows:,}  Recipes: {len(warm):,}  Hits: {cache.hits:,}  Misses: {cache.misses:,}")
+    print(f"Empty cache:       {cold_time:8.3f} s")
+    print(f"Nightly re-run:    {warm_time:8.3f} s  (about {changed:.0%} of recipes changed)")
+    print(f"Without the cache: {fresh_time:8.3f} s")
+    print(f"Results match:     {'yes' if matches else 'NO'}")
+    return matches
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark() else 1)
@@ -0,0 +1,352 @@
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from itertools import chain, groupby
+
+import numpy as np
+
+from .batch_costing import read_recipe_book, recipe_key
+from .units import UNIT_REGISTRY, base_unit_names
+from .vector_costing import cost_book_columns, load_book_columns, synthetic_book
+
+# -------------------- Columnar Results --------------------
+
+# Costing results in one binary file that analytics can open without parsing:
+#     header     magic, version, row / recipe / ingredient counts, section count
+#     sections   one (name, dtype, byte offset, length) entry per array
+#     arrays     each starts on a 64-byte boundary
+# Per ingredient row:  recipe_id (int32), ingredient_id (int32),
+#                      used_unit (int16), base_amount (float64), cost (float64)
+# Per recipe:          row_start (int64, one extra at the end), servings (int64),
+#                      total_cost (float64), cost_per_serving (float64)
+# Names:               recipe / ingredient names as UTF-8 bytes plus int64 offsets
+# Rows for one recipe are next to each other, from row_start[i] to row_start[i + 1].
+#
+# ResultSet maps the file and hands out np.frombuffer() views of it, so
+# reopening a result set of any size reads only the header, and a query
+# touches only the pages it needs.
+#
+#     python -m recipe_cost export book.csv --out results.rcc
+#     python -m recipe_cost export --open results.rcc --recipe Pancakes
+
+MAGIC = b"RCCOLS\x00\x01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQ")          # magic, version, sections, rows, recipes, ingredients
+SECTION = struct.Struct("<24s8sQQ")         # name, dtype, byte offset, byte length
+ALIGN = 64
+
+ROW_COLUMNS = {"recipe_id": "<i4", "ingredient_id": "<i4", "used_unit": "<i2", "base_amount": "<f8", "cost": "<f8"}
+RECIPE_COLUMNS = {"row_start": "<i8", "servings": "<i8", "total_cost": "<f8", "cost_per_serving": "<f8"}
+NAME_COLUMNS = {"recipe_names": "|u1", "recipe_offsets": "<i8", "ingredient_names": "|u1",
+                "ingredient_offsets": "<i8"}
+COLUMN_TYPES = ROW_COLUMNS | RECIPE_COLUMNS | NAME_COLUMNS
+
+# Recipes costed and written at a time by export_book()
+CHUNK_RECIPES = 10_000
+
+# -------------------- Writing --------------------
+
+class ResultWriter:
+
+    # Writes a result file from chunks of costed columns. Each array is
+    # spooled to its own temporary file while chunks come in, then they are
+    # copied after the header on close(), so memory holds one chunk at a time.
+
+    def __init__(self, path):
+        self.path = path
+        self.spool = tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(path)))
+        self.files = {name: open(os.path.join(self.spool.name, name), "wb")
+                      for name in chain(ROW_COLUMNS, RECIPE_COLUMNS, ("recipe_names", "recipe_offsets"))}
+        self.rows = 0
+        self.recipes = 0
+        self.name_bytes = 0
+        self.ingredient_ids = {}
+        self.write("recipe_offsets", np.zeros(1, dtype=np.int64))
+
+    def write(self, name, array):
+        np.ascontiguousarray(array, dtype=np.dtype(COLUMN_TYPES[name])).tofile(self.files[name])
+
+    def add(self, columns, ingredient_costs, totals, per_serving):
+
+        # Appends one chunk: columns from load_book_columns() and its costs.
+        # Ingredient IDs are renumbered so they are the same across chunks.
+
+        global_ids = np.array([self.ingredient_ids.setdefault(name, len(self.ingredient_ids))
+                               for name in columns["ingredients"]], dtype=np.int32)
+        factors = np.asarray(UNIT_REGISTRY.factors, dtype=np.float64)
+        self.write("recipe_id", columns["recipe_index"] + self.recipes)
+        self.write("ingredient_id", global_ids[columns["ingredient_index"]])
+        self.write("used_unit", columns["used_unit"])
+        self.write("base_amount", columns["amount_used"] * factors[columns["used_unit"]])
+        self.write("cost", ingredient_costs)
+
+        counts = np.bincount(columns["recipe_index"], minlength=len(columns["recipes"]))
+        self.write("row_start", self.rows + np.cumsum(counts) - counts)
+        self.write("servings", columns["servings"])
+        self.write("total_cost", totals)
+        self.write("cost_per_serving", per_serving)
+
+        names = [str(name or "").encode("utf-8") for name in columns["recipes"]]
+        self.files["recipe_names"].write(b"".join(names))
+        self.write("recipe_offsets", self.name_bytes + np.cumsum([len(name) for name in names], dtype=np.int64))
+        self.name_bytes += sum(len(name) for name in names)
+        self.rows += len(ingredient_costs)
+        self.recipes += len(columns["recipes"])
+
+    def close(self):
+        self.write("row_start", np.array([self.rows]))
+        names = [name.encode("utf-8") for name in self.ingredient_ids]
+        arrays = {
+            "ingredient_names": np.frombuffer(b"".join(names), dtype=np.uint8),
+            "ingredient_offsets": np.concatenate(([0], np.cumsum([len(name) for name in names], dtype=np.int64))),
+        }
+        for handle in self.files.values():
+            handle.close()
+
+        order = list(COLUMN_TYPES)
+        sizes = {name: os.path.getsize(handle.name) for name, handle in self.files.items()}
+        sizes.update((name, array.nbytes) for name, array in arrays.items())
+        offset = aligned(HEADER.size + SECTION.size * len(order))
+        table = []
+        for name in order:
+            table.append((name, offset))
+            offset = aligned(offset + sizes[name])
+
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as out:
+            out.write(HEADER.pack(MAGIC, VERSION, len(order), self.rows, self.recipes, len(self.ingredient_ids)))
+            for name, start in table:
+                out.write(SECTION.pack(name.encode(), COLUMN_TYPES[name].encode(), start, sizes[name]))
+            for name, start in table:
+                out.write(b"\0" * (start - out.tell()))
+                if name in arrays:
+                    out.write(arrays[name].tobytes())
+                else:
+                    with open(self.files[name].name, "rb") as source:
+                        while block := source.read(1 << 20):
+                            out.write(block)
+        os.replace(temporary, self.path)
+        self.spool.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.close()
+        else:
+            for handle in self.files.values():
+                handle.close()
+            self.spool.cleanup()
+
+def aligned(offset):
+    return -(-offset // ALIGN) * ALIGN
+
+def recipe_chunks(entries, chunk_recipes=CHUNK_RECIPES):
+
+    # Splits a stream of entries into lists holding chunk_recipes recipes each.
+
+    chunk = []
+    count = 0
+    for _, group in groupby(entries, key=recipe_key):
+        chunk.extend(group)
+        count += 1
+        if count == chunk_recipes:
+            yield chunk
+            chunk = []
+            count = 0
+    if chunk:
+        yield chunk
+
+def export_book(entries, path, chunk_recipes=CHUNK_RECIPES):
+
+    # Costs a book with vector_costing a chunk at a time and writes the
+    # results to path. Returns the bad rows as {"recipe", "line", "error"}.
+
+    errors = []
+    with ResultWriter(path) as writer:
+        for chunk in recipe_chunks(entries, chunk_recipes):
+            columns = load_book_columns(chunk)
+            errors.extend(dict(error, recipe=columns["recipes"][error["recipe"]]) for error in columns["errors"])
+            writer.add(columns, *cost_book_columns(columns))
+    return errors
+
+# -------------------- Reading --------------------
+
+class ResultSet:
+
+    # Read-only view of a result file. Every column is an np.frombuffer()
+    # array over the memory-mapped file: nothing is copied or parsed.
+
+    def __init__(self, path):
+        with open(path, "rb") as source:
+            self.map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self.map)
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"{path} is not a result file")
+        magic, version, sections, self.rows, self.recipes, self.ingredients = HEADER.unpack_from(buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} result file")
+
+        self.columns = {}
+        self.sections = {}          # name -> (byte offset, byte length) in the map
+        for number in range(sections):
+            name, dtype, offset, length = SECTION.unpack_from(buffer, HEADER.size + number * SECTION.size)
+            name = name.rstrip(b"\0").decode()
+            dtype = np.dtype(dtype.rstrip(b"\0").decode())
+            if offset + length > len(buffer) or length % dtype.itemsize:
+                raise ValueError(f"{path} is truncated or damaged")
+            self.columns[name] = np.frombuffer(buffer, dtype, length // dtype.itemsize, offset)
+            self.sections[name] = (offset, length)
+        missing = set(COLUMN_TYPES) - set(self.columns)
+        if missing:
+            raise ValueError(f"{path} is missing {', '.join(sorted(missing))}")
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def close(self):
+
+        # Arrays handed out earlier still point into the map; if any are
+        # alive it is unmapped when the last of them goes instead.
+
+        self.columns = {}
+        try:
+            self.map.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # -------------------- Queries --------------------
+
+    def name(self, kind, index):
+
+        # Decodes one recipe or ingredient name (kind is "recipe" or "ingredient").
+
+        offsets = self.columns[f"{kind}_offsets"]
+        return self.columns[f"{kind}_names"][offsets[index]:offsets[index + 1]].tobytes().decode("utf-8")
+
+    def find_recipe(self, name):
+
+        # Index of the first recipe called name, or None. Searches the name
+        # bytes in place with mmap.find(), so nothing is copied out of the map.
+
+        wanted = name.encode("utf-8")
+        base, length = self.sections["recipe_names"]
+        offsets = self.columns["recipe_offsets"]
+        found = self.map.find(wanted, base, base + length)
+        while found != -1:
+            start = found - base
+            index = int(np.searchsorted(offsets, start, side="right")) - 1
+            if offsets[index] == start and offsets[index + 1] == start + len(wanted):
+                return index
+            found = self.map.find(wanted, found + 1, base + length)
+        return None
+
+    def recipe_rows(self, index):
+
+        # (ingredient IDs, used units, base amounts, costs) for one recipe, as views.
+
+        rows = slice(self.columns["row_start"][index], self.columns["row_start"][index + 1])
+        return tuple(self.columns[name][rows] for name in ("ingredient_id", "used_unit", "base_amount", "cost"))
+
+    def ingredient_costs(self):
+
+        # Total cost of every ingredient across all recipes, by ingredient ID.
+
+        return np.bincount(self.columns["ingredient_id"], weights=self.columns["cost"], minlength=self.ingredients)
+
+# -------------------- Benchmark --------------------
+
+def benchmark(n_rows=1_000_000):
+
+    # Exports a synthetic book, then times reopening it and a few queries.
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "results.rcc")
+        start = time.perf_counter()
+        export_book(synthetic_book(n_rows), path)
+        export_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = ResultSet(path)
+        open_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        per_ingredient = results.ingredient_costs()
+        index = results.find_recipe(f"Recipe {results.recipes - 1}")
+        _, _, _, costs = results.recipe_rows(index)
+        query_time = time.perf_counter() - start
+
+        columns = load_book_columns(synthetic_book(n_rows))
+        _, totals, _ = cost_book_columns(columns)
+        matches = (np.array_equal(results["total_cost"], totals)
+                   and np.isclose(per_ingredient.sum(), totals.sum())
+                   and np.isclose(costs.sum(), totals[index]))
+        size = os.path.getsize(path)
+        results.close()
+
+    print(f"Rows: {n_rows:,}  Recipes: {len(totals):,}  File: {size / 2**20:,.1f} MiB")
+    print(f"Cost and export:  {export_time:8.3f} s")
+    print(f"Reopen:           {open_time * 1e3:8.3f} ms")
+    print(f"Queries:          {query_time * 1e3:8.3f} ms  (ingredient totals, find a recipe, its rows)")
+    print(f"Results match:    {'yes' if matches else 'NO'}")
+    return matches
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write costing results to a columnar binary file, or read one.")
+    parser.add_argument("books", nargs="*", help="CSV or JSONL recipe books to cost and export")
+    parser.add_argument("--out", metavar="PATH", help="result file to write")
+    parser.add_argument("--open", metavar="PATH", help="result file to read")
+    parser.add_argument("--recipe", help="with --open, show one recipe's rows")
+    parser.add_argument("--benchmark", type=int, metavar="ROWS", help="run the benchmark instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return 0 if benchmark(args.benchmark) else 1
+    if args.books:
+        if not args.out:
+            parser.error("give --out PATH to export books")
+        errors = export_book(chain.from_iterable(read_recipe_book(path) for path in args.books), args.out)
+        for error in errors:
+            print(f"❌ {error['recipe'] or 'Unknown recipe'} (line {error['line']}): {error['error']}", file=sys.stderr)
+        print(f"Exported to {args.out}, {len(errors)} bad rows.", file=sys.stderr)
+        if errors:
+            return 1
+    if not args.open:
+        if not args.books:
+            parser.error("give books to export, --open PATH or --benchmark ROWS")
+        return 0
+
+    try:
+        results = ResultSet(args.open)
+    except (OSError, ValueError) as error:
+        print(f"❌ {error}", file=sys.stderr)
+        return 1
+    with results:
+        print(f"{results.rows:,} rows, {results.recipes:,} recipes, {results.ingredients:,} ingredients")
+        if args.recipe:
+            index = results.find_recipe(args.recipe)
+            if index is None:
+                print(f"❌ no recipe called {args.recipe!r}", file=sys.stderr)
+                return 1
+            print(f"{args.recipe}: ${results['total_cost'][index]:.2f} "
+                  f"(${results['cost_per_serving'][index]:.2f} per serving)")
+            base_units = base_unit_names()
+            for ingredient, unit, amount, cost in zip(*(column.tolist() for column in results.recipe_rows(index))):
+                print(f"  {results.name('ingredient', ingredient)}: {amount:g} "
+                      f"{base_units.get(UNIT_REGISTRY.categories[unit], '')}, ${cost:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
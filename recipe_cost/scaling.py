@@ -0,0 +1,140 @@
+import sys
+from itertools import chain
+
+import numpy as np
+
+from .table_renderer import render_table
+from .units import UNIT_FAMILIES, UNIT_REGISTRY
+
+# -------------------- Yield Scaling --------------------
+
+# Scales one costed recipe to many batch sizes at once.
+# The recipe's ingredient records are read, never changed: every size is a
+# row of a sizes x ingredients array of amounts and costs.
+#
+#     scaled = scale_recipe(4, ingredients, servings=[2, 10, 40, 120])
+#     scaled = scale_recipe(4, ingredients, multipliers=[0.5, 2.5, 10])
+#     display_scaling("Pancakes", scaled)
+#
+# Amounts are shown in the largest unit of their family (UNIT_FAMILIES) that
+# keeps them at 1 or more (2500 g -> 2.50 kg, 45 ml -> 45.00 ml, 6 tsp -> 2 tbsp).
+# Counted items can't be split, so they are rounded up to whole items and
+# costed at the rounded amount, which is why per-serving costs can change
+# between sizes.
+
+# Amounts this close to a whole item are not rounded up to the next one
+COUNT_TOLERANCE = 1e-9
+
+# -------------------- Display Units --------------------
+
+def display_units(registry=UNIT_REGISTRY, families=UNIT_FAMILIES):
+
+    # Returns a list of (factors, unit IDs) per family, factors sorted
+    # ascending, and {unit ID: family index}.
+
+    table = []
+    family_of = {}
+    for index, (_, names) in enumerate(families):
+        unit_ids = sorted({registry.lookup(name) for name in names}, key=registry.factors.__getitem__)
+        table.append((np.array([registry.factors[unit_id] for unit_id in unit_ids], dtype=np.float64),
+                      np.array(unit_ids, dtype=np.int64)))
+        family_of.update(dict.fromkeys(unit_ids, index))
+    return table, family_of
+
+DISPLAY_UNITS, UNIT_FAMILY = display_units()
+
+def pick_units(base_amounts, families, fallback):
+
+    # Chooses a display unit for every amount (any array shape, with one
+    # family index and one fallback unit ID per column, used for units that
+    # are in no family). Returns (amounts in those units, unit IDs).
+
+    unit_ids = np.broadcast_to(fallback, base_amounts.shape).copy()
+    amounts = base_amounts / np.asarray(UNIT_REGISTRY.factors, dtype=np.float64)[unit_ids]
+    for family, (factors, ids) in enumerate(DISPLAY_UNITS):
+        columns = families == family
+        if not columns.any():
+            continue
+        picked = np.maximum(np.searchsorted(factors, base_amounts[..., columns], side="right") - 1, 0)
+        unit_ids[..., columns] = ids[picked]
+        amounts[..., columns] = base_amounts[..., columns] / factors[picked]
+    return amounts, unit_ids
+
+# -------------------- Scaling --------------------
+
+def scale_recipe(base_servings, ingredients, servings=None, multipliers=None):
+
+    # Scales a costed recipe to target servings, or by batch multipliers.
+    # ingredients is any sequence of IngredientRecord rows (a list or an
+    # IngredientColumns). Returns a dict of arrays, one row per size:
+    #     servings, multipliers              sizes
+    #     base_amounts, amounts, unit_ids    sizes x ingredients
+    #     ingredient_costs                   sizes x ingredients
+    #     total_cost, cost_per_serving       sizes
+    # plus "names" for the ingredient columns.
+
+    if (servings is None) == (multipliers is None):
+        raise ValueError("give either servings or multipliers")
+    if not base_servings or base_servings <= 0:
+        raise ValueError("the recipe needs servings greater than zero to be scaled")
+
+    if servings is not None:
+        targets = np.asarray(servings, dtype=np.float64)
+        factors = targets / base_servings
+    else:
+        factors = np.asarray(multipliers, dtype=np.float64)
+        targets = factors * base_servings
+    if np.any(factors <= 0):
+        raise ValueError("sizes must be greater than zero")
+
+    records = list(ingredients)
+    names = [record.name for record in records]
+    base_amounts = np.array([record.base_amount for record in records], dtype=np.float64)
+    costs = np.array([record.total_cost for record in records], dtype=np.float64)
+    unit_ids = [UNIT_REGISTRY.lookup(record.unit) for record in records]
+    categories = np.array([UNIT_REGISTRY.categories[unit_id] for unit_id in unit_ids], dtype=np.int64)
+    families = np.array([UNIT_FAMILY.get(unit_id, -1) for unit_id in unit_ids], dtype=np.int64)
+
+    # sizes x ingredients, by broadcasting the size column over the recipe row
+    scaled = factors[:, None] * base_amounts
+    counted = categories == UNIT_REGISTRY.category_ids.get("count")
+    scaled[:, counted] = np.ceil(scaled[:, counted] - COUNT_TOLERANCE)
+    ingredient_costs = np.divide(scaled * costs, base_amounts, out=np.zeros_like(scaled), where=base_amounts > 0)
+
+    total_cost = ingredient_costs.sum(axis=1)
+    amounts, unit_ids = pick_units(scaled, families, np.array(unit_ids, dtype=np.int64))
+    return {
+        "names": names,
+        "servings": targets,
+        "multipliers": factors,
+        "base_amounts": scaled,
+        "amounts": amounts,
+        "unit_ids": unit_ids,
+        "ingredient_costs": ingredient_costs,
+        "total_cost": total_cost,
+        "cost_per_serving": total_cost / targets,
+    }
+
+# -------------------- Display --------------------
+
+def display_scaling(recipe_name, scaled, out=None, tablefmt="fancy_grid"):
+
+    # Shows every size side by side: one column per size, one row per
+    # ingredient, then the total and per-serving cost of each size.
+
+    out = out or sys.stdout
+    print(f"\n📏 {recipe_name} at {len(scaled['servings'])} sizes", file=out)
+
+    headers = ["Ingredient", *(f"{size:g} servings" for size in scaled["servings"])]
+    units = UNIT_REGISTRY.names
+    amounts = scaled["amounts"].T.tolist()
+    unit_ids = scaled["unit_ids"].T.tolist()
+    rows = (
+        [name, *(f"{amount:.2f} {units[unit_id]}" for amount, unit_id in zip(amounts[column], unit_ids[column]))]
+        for column, name in enumerate(scaled["names"])
+    )
+    totals = [
+        ["Total Cost", *(f"${cost:.2f}" for cost in scaled["total_cost"])],
+        ["Cost/Serving", *(f"${cost:.2f}" for cost in scaled["cost_per_serving"])],
+    ]
+    render_table(chain(rows, totals), headers=headers, out=out, tablefmt=tablefmt)
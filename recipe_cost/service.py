@@ -0,0 +1,440 @@
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+
+import numpy as np
+
+from .batch_costing import needs_catalog_price
+from .ingredient_catalog import IngredientCatalog, normalize_name
+from .vector_costing import cost_ingredient_columns, load_book_columns
+
+# -------------------- Costing Service --------------------
+
+# A small HTTP/JSON server so other tools can cost recipes without the
+# interactive prompts. Standard library asyncio only, for localhost use.
+#
+#     POST /cost    one recipe, the same shape as a JSONL book line:
+#                   {"recipe": "Pancakes", "servings": 4, "ingredients": [
+#                       {"ingredient": "flour", "used_unit": "g", "amount_used": 250,
+#                        "purchased_unit": "kg", "amount_purchased": 1, "cost_purchased": 4}]}
+#                   Ingredients without purchase details use the catalog prices.
+#     GET /stats    request count, batch sizes and latency percentiles
+#     GET /health   {"ok": true}
+#
+# Requests that arrive together are micro-batched: the batcher waits
+# BATCH_WINDOW seconds after the first one, then costs up to MAX_BATCH
+# recipes with one load_book_columns() / cost_ingredient_columns() call.
+# If that call fails, the batch is costed one request at a time, so only
+# the request that caused it gets an error (a 500 with a JSON body).
+# The unit registry and a snapshot of the catalog stay in memory.
+#
+#     python -m recipe_cost serve --port 8765 --catalog ingredient_catalog.db
+#     python -m recipe_cost serve --load-test 5000 --concurrency 50
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+MAX_BATCH = 256
+BATCH_WINDOW = 0.001
+
+# Largest request body accepted, in bytes
+MAX_BODY = 1_000_000
+
+# Latencies kept for the percentiles in /stats
+LATENCY_WINDOW = 10_000
+
+PERCENTILES = (50, 90, 99)
+
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large", 500: "Internal Server Error"}
+
+# -------------------- Costing --------------------
+
+def priced_row(row, prices):
+
+    # Fills in the purchase details of a catalog-priced row.
+    # The row is left as it is when there is no catalog price; the unit
+    # check then reports it as a bad row.
+
+    if prices is None or not needs_catalog_price(row):
+        return row
+    entry = prices.get(normalize_name(row.get("ingredient")))
+    if entry is None:
+        return row
+    return dict(row, purchased_unit=entry["purchased_unit"], amount_purchased=entry["amount_purchased"],
+                cost_purchased=entry["cost_purchased"])
+
+def cost_requests(requests, prices=None):
+
+    # Costs many recipe requests in one vectorized call.
+    # Returns one result dict per request, in order, with a cost for every
+    # good ingredient and the line (1 = first ingredient) of every bad one.
+
+    # Rows are keyed by request number (from 1, as 0 would read as a blank name)
+    entries = []
+    for number, request in enumerate(requests, 1):
+        for position, item in enumerate(request.get("ingredients") or []):
+            row = dict(item) if isinstance(item, dict) else {}
+            row.update(recipe=number, servings=request.get("servings"))
+            entries.append((position + 1, priced_row(row, prices), None))
+
+    columns = load_book_columns(entries)
+    row_costs = cost_ingredient_columns(columns).tolist()
+    totals = np.bincount(columns["recipe_index"], weights=row_costs, minlength=len(columns["recipes"])).tolist()
+    position_of = {number: position for position, number in enumerate(columns["recipes"])}
+
+    bad_lines = {}
+    for error in columns["errors"]:
+        bad_lines.setdefault(columns["recipes"][error["recipe"]], {})[error["line"]] = error["error"]
+
+    results = []
+    next_cost = 0
+    for number, request in enumerate(requests, 1):
+        items = request.get("ingredients") or []
+        errors = bad_lines.get(number, {})
+        ingredients = []
+        for line, item in enumerate(items, 1):
+            if line in errors:
+                continue
+            ingredients.append({"ingredient": item.get("ingredient"), "cost": row_costs[next_cost]})
+            next_cost += 1
+
+        total = totals[position_of[number]] if number in position_of else 0.0
+        servings = int(columns["servings"][position_of[number]]) if ingredients else None
+        if not items:
+            errors = {0: "recipe has no ingredients"}
+        results.append({
+            "recipe": request.get("recipe"),
+            "servings": servings,
+            "total_cost": total,
+            "cost_per_serving": total / servings if servings else 0.0,
+            "ingredients": ingredients,
+            "errors": [{"line": line, "error": message} for line, message in sorted(errors.items())],
+        })
+    return results
+
+# -------------------- Batching --------------------
+
+class CostBatcher:
+
+    # Collects concurrent requests and costs them together.
+
+    def __init__(self, prices=None, max_batch=MAX_BATCH, window=BATCH_WINDOW):
+        self.prices = prices
+        self.max_batch = max_batch
+        self.window = window
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.batched = 0
+        self.largest = 0
+
+    async def cost(self, request):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request, future))
+        return await future
+
+    def take(self, batch):
+
+        # Moves queued requests into batch without waiting.
+
+        while len(batch) < self.max_batch and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+
+    def cost_alone(self, request):
+
+        # The result for one request, or the exception costing it raised.
+
+        try:
+            return cost_requests([request], self.prices)[0]
+        except Exception as error:
+            return error
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            await asyncio.sleep(self.window)
+            self.take(batch)
+
+            try:
+                results = cost_requests([request for request, _ in batch], self.prices)
+            except Exception:
+                # One request the batch could not cost must not fail the
+                # others, so cost each on its own to find it
+                results = [self.cost_alone(request) for request, _ in batch]
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+            self.batches += 1
+            self.batched += len(batch)
+            self.largest = max(self.largest, len(batch))
+
+# -------------------- Latency --------------------
+
+def percentiles(samples, points=PERCENTILES):
+
+    # Nearest-rank percentiles of samples, as {"p50": ..., ...}.
+
+    if not samples:
+        return {f"p{point}": None for point in points}
+    ordered = sorted(samples)
+    return {f"p{point}": ordered[min(len(ordered) - 1, max(0, -(-point * len(ordered) // 100) - 1))]
+            for point in points}
+
+class LatencyStats:
+
+    # The last LATENCY_WINDOW request latencies, in milliseconds.
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.requests = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds * 1000)
+        self.requests += 1
+
+    def summary(self):
+        return {
+            "requests": self.requests,
+            "latency_ms": {**percentiles(self.samples), "max": max(self.samples, default=None)},
+        }
+
+# -------------------- HTTP --------------------
+
+async def read_request(reader):
+
+    # Reads one HTTP/1.1 request. Returns (method, path, headers, body),
+    # or None when the client has closed the connection.
+
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, path, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise ValueError(413)
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+def write_response(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body
+    )
+
+class CostingService:
+
+    # The HTTP side: parses requests, hands recipes to the batcher and
+    # records how long each one took.
+
+    def __init__(self, prices=None, max_batch=MAX_BATCH, window=BATCH_WINDOW):
+        self.batcher = CostBatcher(prices, max_batch, window)
+        self.latency = LatencyStats()
+
+    def stats(self):
+        batcher = self.batcher
+        return {
+            **self.latency.summary(),
+            "batches": batcher.batches,
+            "mean_batch": batcher.batched / batcher.batches if batcher.batches else 0,
+            "largest_batch": batcher.largest,
+        }
+
+    async def respond(self, method, path, body):
+
+        # Returns (status, payload) for one request.
+
+        if path == "/health":
+            return 200, {"ok": True}
+        if path == "/stats":
+            return 200, self.stats()
+        if path != "/cost":
+            return 404, {"error": f"no such path: {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST for /cost"}
+        try:
+            request = json.loads(body)
+        except ValueError:
+            return 400, {"error": "body is not valid JSON"}
+        if not isinstance(request, dict) or not isinstance(request.get("ingredients", []), list):
+            return 400, {"error": "expected an object with an ingredients list"}
+
+        start = time.perf_counter()
+        try:
+            result = await self.batcher.cost(request)
+        except Exception as error:
+            return 500, {"error": f"could not cost this recipe: {error}"}
+        self.latency.add(time.perf_counter() - start)
+        return 200, result
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ValueError as error:
+                    status = error.args[0] if error.args and error.args[0] in STATUS_TEXT else 400
+                    write_response(writer, status, {"error": STATUS_TEXT[status]}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload = await self.respond(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host=HOST, port=PORT):
+
+        # Starts listening and batching. Returns the asyncio server.
+        # port=0 picks a free port (see server.sockets[0].getsockname()).
+
+        self.batch_task = asyncio.create_task(self.batcher.run())
+        return await asyncio.start_server(self.handle, host, port)
+
+# -------------------- Load Test --------------------
+
+async def post_json(reader, writer, path, payload):
+
+    # Sends one request on an open keep-alive connection and reads the reply.
+
+    body = json.dumps(payload).encode()
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    headers = {}
+    status = int((await reader.readline()).split()[1])
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return status, json.loads(await reader.readexactly(int(headers["content-length"])))
+
+def sample_request(number):
+    return {
+        "recipe": f"Recipe {number}",
+        "servings": number % 12 + 1,
+        "ingredients": [
+            {"ingredient": "flour", "used_unit": "g", "amount_used": 250 + number % 50,
+             "purchased_unit": "kg", "amount_purchased": 1, "cost_purchased": 4},
+            {"ingredient": "milk", "used_unit": "ml", "amount_used": 300,
+             "purchased_unit": "l", "amount_purchased": 2, "cost_purchased": 3.5},
+            {"ingredient": "egg", "used_unit": "unit", "amount_used": 2,
+             "purchased_unit": "unit", "amount_purchased": 12, "cost_purchased": 6},
+            {"ingredient": "sugar", "used_unit": "tbsp", "amount_used": "1 1/2",
+             "purchased_unit": "tsp", "amount_purchased": 200, "cost_purchased": 2},
+        ],
+    }
+
+async def load_test(host, port, requests=2000, concurrency=50):
+
+    # Sends requests POST /cost calls over concurrency keep-alive
+    # connections. Returns client-side throughput and latency percentiles.
+
+    latencies = []
+    failures = 0
+    counter = iter(range(requests))
+
+    async def client():
+        nonlocal failures
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for number in counter:
+                start = time.perf_counter()
+                status, result = await post_json(reader, writer, "/cost", sample_request(number))
+                latencies.append((time.perf_counter() - start) * 1000)
+                if status != 200 or result["errors"]:
+                    failures += 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "failures": failures,
+        "seconds": elapsed,
+        "requests_per_s": requests / elapsed,
+        "latency_ms": {**percentiles(latencies), "max": max(latencies, default=None)},
+    }
+
+async def run_load_test(requests, concurrency, prices=None, max_batch=MAX_BATCH, window=BATCH_WINDOW):
+
+    # Starts a service on a free local port, load tests it and returns
+    # (client report, server stats).
+
+    service = CostingService(prices, max_batch, window)
+    server = await service.start(HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        report = await load_test(HOST, port, requests, concurrency)
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.batch_task.cancel()
+    return report, service.stats()
+
+# -------------------- Main --------------------
+
+async def serve(host, port, prices):
+    service = CostingService(prices)
+    server = await service.start(host, port)
+    print(f"Costing service on http://{host}:{port} (POST /cost, GET /stats)", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve recipe costing over HTTP/JSON on localhost.")
+    parser.add_argument("--host", default=HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on")
+    parser.add_argument("--catalog", help="ingredient catalog for rows without purchase details")
+    parser.add_argument("--load-test", type=int, metavar="REQUESTS", help="load test a local service instead")
+    parser.add_argument("--concurrency", type=int, default=50, help="load test connections")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="load test: most recipes per batch")
+    args = parser.parse_args(argv)
+
+    prices = None
+    if args.catalog:
+        with IngredientCatalog(args.catalog) as catalog:
+            prices = catalog.snapshot()
+
+    if args.load_test:
+        report, stats = asyncio.run(run_load_test(args.load_test, args.concurrency, prices, args.max_batch))
+        json.dump({"client": report, "server": stats}, sys.stdout, indent=2)
+        print()
+        return 1 if report["failures"] else 0
+
+    try:
+        asyncio.run(serve(args.host, args.port, prices))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+import sys
+from collections import deque
+
+from .batch_costing import (cost_row, parse_positive, parse_servings, read_recipe_book,
+                            report_errors, write_results_csv, write_results_jsonl)
+from .ingredient_catalog import IngredientCatalog
+from .units import UNIT_REGISTRY
+
+# -------------------- Sub-recipes --------------------
+
+# Lets an ingredient be another recipe (a stock, sauce or dough).
+# A recipe used this way needs a yield, e.g. 2 l of stock, so its cost can
+# be spread per base unit. Rows that use it name it in "sub_recipe"
+# instead of giving purchase details:
+#   recipe,servings,yield_amount,yield_unit,ingredient,sub_recipe,used_unit,amount_used,purchased_unit,amount_purchased,cost_purchased
+#   Chicken stock,,2,l,bones,,kg,1,kg,1,3.00
+#   Risotto,4,,,stock,Chicken stock,ml,800,,,
+#
+# Recipes are costed in topological order (sub-recipes first) and each
+# one's cost per base unit is kept, so a shared stock is costed once.
+# Recipes that are part of a cycle are reported instead of costed, and so
+# is every row using a sub-recipe that has bad rows of its own: its partial
+# total would underprice every recipe that uses it.
+
+class CycleError(ValueError):
+    pass
+
+# -------------------- Loading --------------------
+
+def load_recipes(entries):
+
+    # Groups (line, row, error) entries by recipe name into definitions:
+    # {name: {"servings", "yield_amount", "yield_unit", "rows": [(line, row)], "errors": [...]}}
+    # Unlike cost_recipe_book(), rows for one recipe may be spread through the book.
+
+    recipes = {}
+    orphan_errors = []
+    for line_num, row, error in entries:
+        name = row.get("recipe") if row else None
+        if error is not None or not name:
+            orphan_errors.append({"line": line_num, "error": error or "recipe name can't be blank"})
+            continue
+
+        recipe = recipes.setdefault(name, {"servings": None, "yield_amount": None, "yield_unit": None,
+                                           "rows": [], "errors": []})
+        try:
+            if row.get("servings") not in (None, ""):
+                servings = parse_servings(row["servings"])
+                if recipe["servings"] is not None and servings != recipe["servings"]:
+                    raise ValueError(f"servings {servings} does not match {recipe['servings']}")
+                recipe["servings"] = servings
+            if row.get("yield_amount") not in (None, ""):
+                recipe["yield_amount"] = parse_positive(row["yield_amount"], "yield_amount")
+                recipe["yield_unit"] = row.get("yield_unit")
+        except ValueError as row_error:
+            recipe["errors"].append({"line": line_num, "error": str(row_error)})
+            continue
+        recipe["rows"].append((line_num, row))
+    return recipes, orphan_errors
+
+# -------------------- Ordering --------------------
+
+def sub_recipe_names(recipe):
+    return {row["sub_recipe"] for _, row in recipe["rows"] if row.get("sub_recipe")}
+
+def topological_order(recipes):
+
+    # Returns (order, cycles): recipe names with every sub-recipe before the
+    # recipes that use it, and the cycles found among the rest.
+    # References to unknown recipes are ignored here and reported when costing.
+
+    uses = {name: sub_recipe_names(recipe) & recipes.keys() for name, recipe in recipes.items()}
+    used_by = {name: [] for name in recipes}
+    for name, subs in uses.items():
+        for sub in subs:
+            used_by[sub].append(name)
+
+    waiting = {name: len(subs) for name, subs in uses.items()}
+    ready = deque(name for name, count in waiting.items() if count == 0)
+    order = []
+    while ready:
+        name = ready.popleft()
+        order.append(name)
+        for parent in used_by[name]:
+            waiting[parent] -= 1
+            if waiting[parent] == 0:
+                ready.append(parent)
+
+    # Anything left over is part of a cycle, or uses a recipe that is part of one
+    cycles = []
+    in_cycle = set()
+    for start in (name for name in recipes if waiting[name]):
+        path = []
+        seen = {}
+        name = start
+        while name not in seen and name not in in_cycle:
+            seen[name] = len(path)
+            path.append(name)
+            name = next(sub for sub in uses[name] if waiting[sub])
+        if name in seen:
+            cycle = path[seen[name]:]
+            cycles.append(cycle + [name])
+            in_cycle.update(cycle)
+    return order, cycles
+
+# -------------------- Costing --------------------
+
+def cost_sub_recipe_row(row, cost_per_base, yields):
+
+    # Cost of using part of a sub-recipe: base amount used times its cost per base unit.
+
+    sub = row["sub_recipe"]
+    if sub not in yields:
+        raise ValueError(f"unknown sub-recipe: {sub!r}")
+    yield_unit = yields[sub]
+    if yield_unit is None:
+        raise ValueError(f"{sub} has no yield, so it can't be used as an ingredient")
+    if sub not in cost_per_base:
+        raise ValueError(f"sub-recipe {sub} has bad rows, so it could not be costed")
+
+    used_unit = UNIT_REGISTRY.lookup(row.get("used_unit"))
+    if used_unit is None:
+        raise ValueError(f"unknown used unit: {row.get('used_unit')!r}")
+    if not UNIT_REGISTRY.same_category(used_unit, yield_unit):
+        raise ValueError(f"{sub} is made in {UNIT_REGISTRY.names[yield_unit]}, not {row.get('used_unit')}")
+
+    amount_used = parse_positive(row.get("amount_used"), "amount_used")
+    return UNIT_REGISTRY.to_base(amount_used, used_unit) * cost_per_base[sub]
+
+def cost_recipe_graph(recipes, catalog=None):
+
+    # Costs every recipe from load_recipes(), sub-recipes first.
+    # Returns result dicts in book order with the same keys as
+    # cost_recipe_book() plus "cost_per_base" (None for recipes with no yield).
+
+    order, cycles = topological_order(recipes)
+    results = {}
+    cost_per_base = {}
+    yields = {}
+    errors_of = {}
+
+    for name, recipe in recipes.items():
+        yields[name] = None
+        errors_of[name] = list(recipe["errors"])
+        if recipe["yield_amount"] is not None:
+            unit_id = UNIT_REGISTRY.lookup(recipe["yield_unit"])
+            if unit_id is None:
+                errors_of[name].append({"line": recipe["rows"][0][0] if recipe["rows"] else None,
+                                        "error": f"unknown yield unit: {recipe['yield_unit']!r}"})
+            else:
+                yields[name] = unit_id
+
+    for name in order:
+        recipe = recipes[name]
+        prices = None
+        if catalog is not None:
+            prices = catalog.get_many(row.get("ingredient") for _, row in recipe["rows"]
+                                      if not row.get("sub_recipe") and not row.get("purchased_unit"))
+
+        total_cost = 0
+        ingredients = 0
+        errors = errors_of[name]
+        for line_num, row in recipe["rows"]:
+            try:
+                if row.get("sub_recipe"):
+                    total_cost += cost_sub_recipe_row(row, cost_per_base, yields)
+                else:
+                    total_cost += cost_row(row, catalog, prices)
+            except ValueError as row_error:
+                errors.append({"line": line_num, "error": str(row_error)})
+            else:
+                ingredients += 1
+
+        # Only a sub-recipe costed in full gets a price, so its errors carry up to its users
+        unit_id = yields[name]
+        if unit_id is not None and ingredients and not errors:
+            cost_per_base[name] = total_cost / UNIT_REGISTRY.to_base(recipe["yield_amount"], unit_id)
+
+        servings = recipe["servings"]
+        results[name] = {
+            "recipe": name,
+            "servings": servings,
+            "total_cost": total_cost,
+            "cost_per_serving": total_cost / servings if servings else 0,
+            "ingredients": ingredients,
+            "errors": errors,
+            "cost_per_base": cost_per_base.get(name),
+        }
+
+    # Recipes that were never reached are in, or depend on, a cycle
+    cycle_of = {name: cycle for cycle in cycles for name in cycle}
+    for name, recipe in recipes.items():
+        if name in results:
+            continue
+        if name in cycle_of:
+            message = "sub-recipe cycle: " + " -> ".join(cycle_of[name])
+        else:
+            message = "uses a recipe that is part of a sub-recipe cycle"
+        line_num = recipe["rows"][0][0] if recipe["rows"] else None
+        results[name] = {
+            "recipe": name,
+            "servings": recipe["servings"],
+            "total_cost": 0,
+            "cost_per_serving": 0,
+            "ingredients": 0,
+            "errors": errors_of[name] + [{"line": line_num, "error": message}],
+            "cost_per_base": None,
+        }
+
+    return [results[name] for name in recipes]
+
+def load_books(paths):
+
+    # load_recipes() over several books. A recipe already defined in an
+    # earlier book is reported, and the later definition is left out.
+    # Returns (recipes, errors) with "book" added to every error.
+
+    recipes = {}
+    sources = {}
+    errors = []
+    for path in paths:
+        book_recipes, orphan_errors = load_recipes(read_recipe_book(path))
+        errors.extend(dict(error, book=path) for error in orphan_errors)
+        for name, recipe in book_recipes.items():
+            if name in recipes:
+                line_num = recipe["rows"][0][0] if recipe["rows"] else None
+                errors.append({"book": path, "line": line_num,
+                               "error": f"recipe {name!r} is already defined in {sources[name]}"})
+                continue
+            recipes[name] = recipe
+            sources[name] = path
+    return recipes, errors
+
+def check_cycles(recipes):
+
+    # Raises CycleError listing every cycle, for callers that want to stop early.
+
+    _, cycles = topological_order(recipes)
+    if cycles:
+        raise CycleError("; ".join(" -> ".join(cycle) for cycle in cycles))
+
+def write_costed_graph(recipes, writer, catalog):
+
+    # Costs the recipes, writes the results to stdout and reports bad rows
+    # to stderr. Returns (recipes, bad rows).
+
+    recipe_count = 0
+    bad_rows = 0
+    for result in writer(report_errors(cost_recipe_graph(recipes, catalog), sys.stderr), sys.stdout):
+        recipe_count += 1
+        bad_rows += len(result["errors"])
+    return recipe_count, bad_rows
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cost recipe books that use sub-recipes.")
+    parser.add_argument("books", nargs="+", help="CSV or JSONL recipe books")
+    parser.add_argument("--catalog", help="ingredient catalog for rows without purchase details")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default="csv", help="output format")
+    args = parser.parse_args(argv)
+
+    recipes, book_errors = load_books(args.books)
+    for error in book_errors:
+        print(f"❌ {error['book']} (line {error['line']}): {error['error']}", file=sys.stderr)
+    bad_rows = len(book_errors)
+
+    writer = write_results_csv if args.format == "csv" else write_results_jsonl
+    if args.catalog:
+        with IngredientCatalog(args.catalog) as catalog:
+            recipe_count, graph_bad_rows = write_costed_graph(recipes, writer, catalog)
+    else:
+        recipe_count, graph_bad_rows = write_costed_graph(recipes, writer, None)
+    bad_rows += graph_bad_rows
+
+    print(f"Costed {recipe_count} recipes, {bad_rows} bad rows.", file=sys.stderr)
+    return 1 if bad_rows else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
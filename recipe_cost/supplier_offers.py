@@ -0,0 +1,256 @@
+import csv
+import sys
+import time
+from bisect import bisect_left
+from itertools import chain
+
+import numpy as np
+
+from .batch_costing import (cost_recipe_book, parse_positive, read_recipe_book, report_errors,
+                            write_results_csv)
+from .conversion_graph import CONVERSIONS
+from .ingredient_catalog import DENSITIES, IngredientCatalog, cost_used, normalize_name, unit_category
+from .units import UNIT_REGISTRY, convert_to_base
+
+# -------------------- Supplier Offers --------------------
+
+# Several suppliers sell the same ingredient in different pack sizes and at
+# different prices. The catalog keeps every offer (IngredientCatalog.add_offers())
+# at its cost per base unit, and an OfferIndex answers
+#     "cheapest offer for flour, by weight, in packs of at least 5 kg"
+# with one binary search: per (ingredient, category) the offers are sorted
+# by pack size, and next to each is the cheapest offer of that size or bigger.
+#
+# Costing a book with an OfferIndex in place of the catalog picks the best
+# offer for every catalog-priced row while the book streams through once:
+#     python -m recipe_cost offers --add offers.csv book.csv
+# By default the cheapest price per base unit wins. With --cover, the offer
+# must also come in a pack big enough for the amount a row uses (the
+# cheapest offer of any size is used when no pack is that big).
+
+OFFER_CSV_FIELDS = ["ingredient", "supplier", "amount_purchased", "purchased_unit", "cost_purchased"]
+
+class OfferIndex:
+
+    def __init__(self, offers, cover=False):
+        self.cover = cover
+        grouped = {}
+        for offer in offers:
+            grouped.setdefault(offer["name"], {}).setdefault(offer["category"], []).append(offer)
+
+        # name -> {"name", "display_name", "categories": {category ID: (pack sizes, cheapest from here up)},
+        #          "offers": {category ID: offers sorted by pack size}}
+        self.entries = {}
+        for name, categories in grouped.items():
+            tables = {}
+            offers_by_category = {}
+            for category, group in categories.items():
+                group.sort(key=lambda offer: (offer["pack_base"], offer["cost_per_base"]))
+                cheapest = group[:]
+                for index in range(len(group) - 2, -1, -1):
+                    if cheapest[index + 1]["cost_per_base"] < cheapest[index]["cost_per_base"]:
+                        cheapest[index] = cheapest[index + 1]
+                tables[UNIT_REGISTRY.category_ids[category]] = ([offer["pack_base"] for offer in group], cheapest)
+                offers_by_category[UNIT_REGISTRY.category_ids[category]] = group
+            display_name = next(iter(categories.values()))[0]["display_name"]
+            self.entries[name] = {"name": name, "display_name": display_name, "categories": tables,
+                                  "offers": offers_by_category}
+
+    @classmethod
+    def from_catalog(cls, catalog, cover=False):
+        return cls(catalog.offers(), cover)
+
+    def __len__(self):
+        return len(self.entries)
+
+    # -------------------- Lookups --------------------
+
+    def best(self, name, category, min_pack=0):
+
+        # Cheapest offer for an ingredient in a category (a name such as
+        # "weight") with a pack of at least min_pack base units, or None.
+
+        entry = self.entries.get(normalize_name(name))
+        category_id = UNIT_REGISTRY.category_ids.get(category)
+        if entry is None or category_id not in entry["categories"]:
+            return None
+        packs, cheapest = entry["categories"][category_id]
+        index = bisect_left(packs, min_pack)
+        return cheapest[index] if index < len(packs) else None
+
+    def get(self, name):
+        return self.entries.get(normalize_name(name))
+
+    def get_many(self, names):
+        return {key: self.entries.get(key) for key in {normalize_name(name) for name in names}}
+
+    # -------------------- Costing --------------------
+
+    def pick(self, entry, amount_used, used_unit):
+
+        # The offer to cost amount_used of used_unit with: the lowest cost per
+        # used base unit across the used category and, for an ingredient with
+        # a density, the categories linked to it. Raises ValueError if none fit.
+
+        unit_id = UNIT_REGISTRY.lookup(used_unit)
+        if unit_id is None:
+            raise ValueError(f"unknown used unit: {used_unit!r}")
+        source = UNIT_REGISTRY.categories[unit_id]
+        used_base = UNIT_REGISTRY.to_base(amount_used, unit_id)
+        density = DENSITIES.get(entry["name"])
+
+        chosen = None
+        chosen_cost = None
+        for target, (packs, cheapest) in entry["categories"].items():
+            try:
+                factor = CONVERSIONS.category_factor(source, target, density)
+            except ValueError:
+                continue
+            index = bisect_left(packs, used_base * factor) if self.cover else 0
+            offer = cheapest[index] if index < len(packs) else cheapest[0]
+            if chosen is None or offer["cost_per_base"] * factor < chosen_cost:
+                chosen = offer
+                chosen_cost = offer["cost_per_base"] * factor
+        if chosen is None:
+            categories = " or ".join(sorted(UNIT_REGISTRY.category_names[target] for target in entry["categories"]))
+            raise ValueError(f"{entry['display_name']} is priced by {categories}, not {used_unit}")
+        return chosen
+
+    def cost_used(self, entry, amount_used, used_unit):
+        return cost_used(self.pick(entry, amount_used, used_unit), amount_used, used_unit)
+
+# -------------------- Files --------------------
+
+def read_offers_csv(path):
+
+    # Reads OFFER_CSV_FIELDS rows for IngredientCatalog.add_offers().
+
+    with open(path, newline="", encoding="utf-8") as source:
+        for line_num, row in enumerate(csv.DictReader(source), 2):
+            try:
+                yield (row["ingredient"], row["supplier"], parse_positive(row["amount_purchased"], "amount_purchased"),
+                       row["purchased_unit"], parse_positive(row["cost_purchased"], "cost_purchased"))
+            except (KeyError, ValueError) as error:
+                raise ValueError(f"{path} line {line_num}: {error}")
+
+# -------------------- Benchmark --------------------
+
+def synthetic_offers(n_ingredients, offers_per_ingredient, seed=1):
+
+    # Repeatable offer dicts: every ingredient sold by weight in packs of 100 g to 25 kg.
+
+    rng = np.random.default_rng(seed)
+    packs = rng.uniform(0.1, 25, (n_ingredients, offers_per_ingredient)).round(2)
+    costs = (packs * rng.uniform(0.5, 20, packs.shape)).round(2).tolist()
+    packs = packs.tolist()
+    category = unit_category(UNIT_REGISTRY.lookup("kg"))
+    for ingredient in range(n_ingredients):
+        for supplier in range(offers_per_ingredient):
+            pack_base, _ = convert_to_base(packs[ingredient][supplier], "kg")
+            yield {
+                "name": f"ingredient {ingredient}",
+                "display_name": f"ingredient {ingredient}",
+                "supplier": f"supplier {supplier}",
+                "category": category,
+                "pack_base": pack_base,
+                "cost_per_base": costs[ingredient][supplier] / pack_base,
+                "purchased_unit": "kg",
+                "amount_purchased": packs[ingredient][supplier],
+                "cost_purchased": costs[ingredient][supplier],
+            }
+
+def benchmark(n_ingredients=5_000, offers_per_ingredient=20, n_rows=100_000, seed=1):
+
+    # Builds an index over n_ingredients x offers_per_ingredient offers, times
+    # pack-size lookups against a linear scan, then costs a book with it.
+
+    offers = list(synthetic_offers(n_ingredients, offers_per_ingredient, seed))
+    start = time.perf_counter()
+    index = OfferIndex(offers, cover=True)
+    build_time = time.perf_counter() - start
+
+    rng = np.random.default_rng(seed)
+    names = [f"ingredient {ingredient}" for ingredient in rng.integers(0, n_ingredients, 10_000).tolist()]
+    packs = rng.uniform(0, 25_000, len(names)).tolist()
+    start = time.perf_counter()
+    found = [index.best(name, "weight", pack) for name, pack in zip(names, packs)]
+    lookup_time = time.perf_counter() - start
+
+    by_name = {}
+    for offer in offers:
+        by_name.setdefault(offer["name"], []).append(offer)
+    start = time.perf_counter()
+    scanned = [min((offer for offer in by_name[name] if offer["pack_base"] >= pack),
+                   key=lambda offer: offer["cost_per_base"], default=None)
+               for name, pack in zip(names, packs)]
+    scan_time = time.perf_counter() - start
+    matches = all(a is b or (a is not None and b is not None and a["cost_per_base"] == b["cost_per_base"])
+                  for a, b in zip(found, scanned))
+
+    entries = [
+        (line_num, {"recipe": f"Recipe {row_num // 10}", "servings": "4",
+                    "ingredient": f"ingredient {row_num % n_ingredients}", "used_unit": "g",
+                    "amount_used": str(50 + row_num % 2000)}, None)
+        for row_num, line_num in enumerate(range(2, n_rows + 2))
+    ]
+    start = time.perf_counter()
+    results = list(cost_recipe_book(iter(entries), index))
+    book_time = time.perf_counter() - start
+    matches = matches and not any(result["errors"] for result in results)
+
+    print(f"Ingredients: {n_ingredients:,}  Offers: {len(offers):,}  Book rows: {n_rows:,}")
+    print(f"Build index:           {build_time:8.3f} s")
+    print(f"Indexed lookups:       {lookup_time:8.3f} s  ({lookup_time / len(names) * 1e9:,.0f} ns each)")
+    print(f"Linear scan lookups:   {scan_time:8.3f} s  ({scan_time / lookup_time:,.1f}x slower)")
+    print(f"Cost book, best offer: {book_time:8.3f} s")
+    print(f"Results match:         {'yes' if matches else 'NO'}")
+    return matches
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cost recipe books with the cheapest supplier offer per row.")
+    parser.add_argument("books", nargs="*", help="CSV or JSONL recipe books")
+    parser.add_argument("--catalog", default="ingredient_catalog.db", help="ingredient catalog holding the offers")
+    parser.add_argument("--add", metavar="OFFERS", help=f"CSV of offers to add ({', '.join(OFFER_CSV_FIELDS)})")
+    parser.add_argument("--cover", action="store_true", help="only use packs big enough for each row's amount")
+    parser.add_argument("--fixed", action="store_true", help="exact fixed-point money instead of floats")
+    parser.add_argument("--best", metavar="INGREDIENT", help="show the offers for one ingredient, best first")
+    parser.add_argument("--benchmark", action="store_true", help="run the lookup benchmark instead")
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        return 0 if benchmark() else 1
+    with IngredientCatalog(args.catalog) as catalog:
+        if args.add:
+            try:
+                added = catalog.add_offers(read_offers_csv(args.add))
+            except ValueError as error:
+                print(f"❌ {error}", file=sys.stderr)
+                return 1
+            print(f"Added {added} offers.", file=sys.stderr)
+        index = OfferIndex.from_catalog(catalog, args.cover)
+        offers = sorted(catalog.offers(args.best), key=lambda offer: offer["cost_per_base"]) if args.best else []
+
+    if args.best:
+        if not offers:
+            print(f"❌ no offers for {args.best!r}", file=sys.stderr)
+            return 1
+        for offer in offers:
+            print(f"{offer['supplier'] or '(catalog)'}: {offer['amount_purchased']:g} {offer['purchased_unit']} "
+                  f"for ${offer['cost_purchased']:.2f}")
+    if not args.books:
+        return 0
+
+    entries = chain.from_iterable(read_recipe_book(path) for path in args.books)
+    results = report_errors(cost_recipe_book(entries, index, args.fixed), sys.stderr)
+    recipes = 0
+    bad_rows = 0
+    for result in write_results_csv(results, sys.stdout):
+        recipes += 1
+        bad_rows += len(result["errors"])
+    print(f"Costed {recipes} recipes with {len(index)} ingredients on offer, {bad_rows} bad rows.", file=sys.stderr)
+    return 1 if bad_rows else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
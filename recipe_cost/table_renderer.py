@@ -0,0 +1,129 @@
+import csv
+import sys
+from itertools import chain, islice
+
+# -------------------- Streaming Table Renderer --------------------
+
+# Writes tables row by row to any file-like object.
+# Column widths are fixed up front, or measured on the first SAMPLE_ROWS
+# rows, so a table with tens of thousands of rows never has to be held in
+# memory or measured in full. Cells wider than their column are cut short
+# with "…".
+#
+# Formats:
+#   fancy_grid - box drawing grid. Tables that fit in the sample are handed
+#                to tabulate, so small tables look exactly as they always have.
+#   plain      - space separated columns
+#   csv        - comma separated values, no width handling
+#   paged      - plain columns with the header repeated every page_size rows
+
+FORMATS = ("fancy_grid", "plain", "csv", "paged")
+
+SAMPLE_ROWS = 1000
+PAGE_SIZE = 50
+
+# Box drawing pieces for fancy_grid: (left, fill, middle, right)
+TOP = ("╒", "═", "╤", "╕")
+HEADER_RULE = ("╞", "═", "╪", "╡")
+ROW_RULE = ("├", "─", "┼", "┤")
+BOTTOM = ("╘", "═", "╧", "╛")
+
+def cell_text(cell):
+    return cell if isinstance(cell, str) else str(cell)
+
+def is_number(cell):
+    return isinstance(cell, (int, float)) and not isinstance(cell, bool)
+
+def fit(text, width, right=False):
+
+    # Pads (or cuts) text to exactly width characters.
+
+    if len(text) > width:
+        return text[:width - 1] + "…"
+    return text.rjust(width) if right else text.ljust(width)
+
+def measure_widths(headers, rows):
+
+    # Column widths the way tabulate works them out:
+    # at least two wider than the header, and as wide as the widest cell.
+
+    widths = [len(header) + 2 for header in headers]
+    for row in rows:
+        for column, cell in enumerate(row):
+            widths[column] = max(widths[column], len(cell_text(cell)))
+    return widths
+
+def rule(widths, pieces):
+    left, fill, middle, right = pieces
+    return left + middle.join(fill * (width + 2) for width in widths) + right
+
+def grid_line(cells, widths, right_align):
+    return "│ " + " │ ".join(fit(cell_text(cell), width, right)
+                            for cell, width, right in zip(cells, widths, right_align)) + " │"
+
+def plain_line(cells, widths, right_align):
+    return "  ".join(fit(cell_text(cell), width, right)
+                     for cell, width, right in zip(cells, widths, right_align)).rstrip()
+
+def render_table(rows, headers, out=None, tablefmt="fancy_grid", widths=None,
+                 sample_rows=SAMPLE_ROWS, page_size=PAGE_SIZE):
+
+    # Writes rows (any iterable of cell lists) under headers to out.
+    # Returns the number of rows written.
+
+    out = out or sys.stdout
+    if tablefmt not in FORMATS:
+        raise ValueError(f"Unknown table format {tablefmt!r}, choose from {FORMATS}")
+
+    rows = iter(rows)
+    if tablefmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(headers)
+        count = 0
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+        return count
+
+    # Look at the first rows to size the columns (unless widths were given)
+    sample = list(islice(rows, sample_rows)) if widths is None else []
+    if widths is None:
+        widths = measure_widths(headers, sample)
+        complete = len(sample) < sample_rows
+        if tablefmt == "fancy_grid" and complete:
+            # tabulate is slow to import, so load it only when a table is shown
+            from tabulate import tabulate
+            print(tabulate(sample, headers=headers, tablefmt="fancy_grid"), file=out)
+            return len(sample)
+
+    right_align = [False] * len(headers)
+    if sample:
+        right_align = [is_number(cell) for cell in sample[0]]
+
+    count = 0
+    if tablefmt == "fancy_grid":
+        out.write(rule(widths, TOP) + "\n")
+        out.write(grid_line(headers, widths, right_align) + "\n")
+        out.write(rule(widths, HEADER_RULE) + "\n")
+        for row in chain(sample, rows):
+            if count:
+                out.write(rule(widths, ROW_RULE) + "\n")
+            out.write(grid_line(row, widths, right_align) + "\n")
+            count += 1
+        out.write(rule(widths, BOTTOM) + "\n")
+        return count
+
+    header = plain_line(headers, widths, right_align)
+    dashes = "  ".join("-" * width for width in widths)
+    for row in chain(sample, rows):
+        if count == 0 or (tablefmt == "paged" and count % page_size == 0):
+            if count:
+                out.write("\n")
+            out.write(header + "\n")
+            if tablefmt == "paged":
+                out.write(dashes + "\n")
+        out.write(plain_line(row, widths, right_align) + "\n")
+        count += 1
+    if count == 0:
+        out.write(header + "\n")
+    return count
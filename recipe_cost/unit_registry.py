@@ -0,0 +1,116 @@
+# -------------------- Unit Registry --------------------
+
+# Resolves unit names to integer unit IDs once, so the hot path only does
+# list reads: factors[unit_id] for conversion to base units and
+# categories[unit_id] for the same-category check.
+# Aliases of one unit (g, gram, grams) share an ID.
+#
+# Adding a unit for the shop:
+#     UNIT_REGISTRY.register('oz', 28.3495, 'weight', aliases=('ounce', 'ounces'))
+#     UNIT_REGISTRY.register('cup', 250, 'volume', aliases=('cups',))
+#     UNIT_REGISTRY.register('dozen', 12, 'count')
+
+class UnitRegistry:
+
+    def __init__(self):
+        self.ids = {}               # alias -> unit ID
+        self.names = []             # unit ID -> canonical name
+        self.factors = []           # unit ID -> amount of base unit in one unit
+        self.categories = []        # unit ID -> category ID
+        self.category_ids = {}      # category name -> category ID
+        self.category_names = []    # category ID -> category name
+        self.category_units = []    # category ID -> set of aliases in that category
+
+    def register(self, name, factor, category, aliases=()):
+
+        # Adds a unit and its aliases, returning the new unit ID.
+        # An alias that is already registered is rejected.
+
+        names = [alias.strip().lower() for alias in (name, *aliases)]
+        for alias in names:
+            if alias in self.ids:
+                raise ValueError(f"Unit {alias!r} is already registered")
+        if not factor > 0:
+            raise ValueError(f"Unit {name!r} needs a factor greater than zero")
+
+        if category not in self.category_ids:
+            self.category_ids[category] = len(self.category_names)
+            self.category_names.append(category)
+            self.category_units.append(set())
+        category_id = self.category_ids[category]
+
+        unit_id = len(self.names)
+        self.names.append(names[0])
+        self.factors.append(factor)
+        self.categories.append(category_id)
+        for alias in names:
+            self.ids[alias] = unit_id
+            self.category_units[category_id].add(alias)
+        return unit_id
+
+    def add_alias(self, alias, name):
+
+        # Makes alias another name for an existing unit.
+
+        unit_id = self.lookup(name)
+        if unit_id is None:
+            raise ValueError(f"Unknown unit {name!r}")
+        alias = alias.strip().lower()
+        if alias in self.ids:
+            raise ValueError(f"Unit {alias!r} is already registered")
+        self.ids[alias] = unit_id
+        self.category_units[self.categories[unit_id]].add(alias)
+        return unit_id
+
+    def lookup(self, unit):
+
+        # Returns the unit ID for a unit name, or None if it is not known.
+        # Exact matches skip the lower()/strip() clean-up. Anything that isn't
+        # a string (a JSON list or number, say) is not a unit name.
+
+        if not isinstance(unit, str):
+            return None
+        unit_id = self.ids.get(unit)
+        if unit_id is None:
+            unit_id = self.ids.get(unit.strip().lower())
+        return unit_id
+
+    def __contains__(self, unit):
+        return self.lookup(unit) is not None
+
+    def to_base(self, amount, unit_id):
+        return amount * self.factors[unit_id]
+
+    def same_category(self, unit_id, other_id):
+        return self.categories[unit_id] == self.categories[other_id]
+
+    def category_of(self, unit):
+
+        # Returns the set of aliases in the same category as unit, or None.
+
+        unit_id = self.lookup(unit)
+        if unit_id is None:
+            return None
+        return self.category_units[self.categories[unit_id]]
+
+    @classmethod
+    def from_tables(cls, conversions, categories):
+
+        # Builds a registry from a UNIT_CONVERSIONS style table and a list of
+        # (category name, set of units) pairs.
+        # Aliases in the same category with the same factor become one unit,
+        # named after the first alias in the table.
+
+        registry = cls()
+        category_of = {unit: name for name, units in categories for unit in units}
+        for unit, factor in conversions.items():
+            category = category_of.get(unit)
+            if category is None:
+                raise ValueError(f"Unit {unit!r} is not in any category")
+            for unit_id, (known_factor, known_category) in enumerate(zip(registry.factors, registry.categories)):
+                if known_factor == factor and registry.category_names[known_category] == category:
+                    registry.add_alias(unit, registry.names[unit_id])
+                    break
+            else:
+                registry.register(unit, factor, category)
+        return registry
@@ -0,0 +1,73 @@
+from .unit_registry import UnitRegistry
+
+# -------------------- Constants and Unit Conversions --------------------
+
+# Base unit conversions:
+# All weights to grams, all volumes to milliliters, spoons to milliliters, counted items to 1:1
+UNIT_CONVERSIONS = {
+    'g': 1, 'gram': 1, 'grams': 1,
+    'kg': 1000, 'kilogram': 1000, 'kilograms': 1000,
+    'ml': 1, 'milliliter': 1, 'milliliters': 1,
+    'l': 1000, 'liter': 1000, 'litre': 1000, 'liters': 1000, 'litres': 1000,
+    'tbsp': 15, 'tablespoon': 15, 'tablespoons': 15,
+    'tsp': 5, 'teaspoon': 5, 'teaspoons': 5,
+    'unit': 1, 'units': 1, 'count': 1, 'piece': 1, 'pieces': 1
+}
+
+# Group units into categories to ensure logical conversions
+WEIGHT_UNITS = {'g', 'gram', 'grams', 'kg', 'kilogram', 'kilograms'}
+VOLUME_UNITS = {'ml', 'milliliter', 'milliliters', 'l', 'liter', 'litre', 'liters', 'litres'}
+SPOON_UNITS = {'tbsp', 'tablespoon', 'tablespoons', 'tsp', 'teaspoon', 'teaspoons'}
+COUNT_UNITS = {'unit', 'units', 'count', 'piece', 'pieces'}
+
+# Families of units that are shown together (scaled amounts stay in spoons
+# rather than jumping to ml). Spoons are a family but not a category:
+# they are milliliters, so they convert with VOLUME_UNITS.
+UNIT_FAMILIES = [
+    ('weight', WEIGHT_UNITS),
+    ('volume', VOLUME_UNITS),
+    ('spoon', SPOON_UNITS),
+    ('count', COUNT_UNITS),
+]
+
+# Categories that were merged into another, for prices saved before the merge
+RENAMED_CATEGORIES = {'spoon': 'volume'}
+
+# Registry built from the tables above, with integer unit IDs for fast lookups.
+# New units (oz, cup, dozen...) are added with UNIT_REGISTRY.register().
+# Weight and volume are joined per ingredient by density (conversion_graph.py).
+UNIT_REGISTRY = UnitRegistry.from_tables(UNIT_CONVERSIONS, [
+    ('weight', WEIGHT_UNITS),
+    ('volume', VOLUME_UNITS | SPOON_UNITS),
+    ('count', COUNT_UNITS),
+])
+
+# -------------------- Functions --------------------
+
+def convert_to_base(amount, unit):
+
+    # Converts a given amount and unit to its base unit amount.
+    # For example, 1 kg -> 1000 g
+
+    unit_id = UNIT_REGISTRY.lookup(unit)
+    unit = unit.lower().strip()
+    if unit_id is not None:
+        return UNIT_REGISTRY.to_base(amount, unit_id), unit
+    return None, unit  # Return None if unit is not recognized
+
+def get_unit_category(unit):
+
+    # Returns the category set for a given unit.
+    # Used to restrict purchased unit to same logical group.
+
+    return UNIT_REGISTRY.category_of(unit)
+
+def base_unit_names():
+
+    # Category ID -> the unit whose factor is 1 (g, ml, unit).
+
+    names = {}
+    for unit_id, factor in enumerate(UNIT_REGISTRY.factors):
+        if factor == 1:
+            names.setdefault(UNIT_REGISTRY.categories[unit_id], UNIT_REGISTRY.names[unit_id])
+    return names
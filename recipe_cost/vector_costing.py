@@ -0,0 +1,288 @@
+import sys
+import time
+
+import numpy as np
+
+from .batch_costing import (conversion_factor, cost_recipe_book, fixed_amounts, parse_positive,
+                            parse_servings, resolve_units)
+from .costing import cost_ingredient
+from .ingredient_catalog import normalize_name
+from .units import UNIT_REGISTRY
+
+# -------------------- Vectorized Costing --------------------
+
+# Costs a whole recipe book at once with NumPy.
+# The book is loaded into columns (one array per field) and every
+# ingredient cost, recipe total and cost per serving is worked out with
+# a handful of array operations instead of one Python float at a time.
+
+# Units are stored as UNIT_REGISTRY IDs so conversion factors become an array lookup
+
+INT64_MAX = np.iinfo(np.int64).max
+
+# -------------------- Loading --------------------
+
+def load_book_columns(entries, fixed=False):
+
+    # Reads (line, row, error) entries from batch_costing readers into columns.
+    # Rows for one recipe must be next to each other, same as cost_recipe_book().
+    # Bad rows are left out and listed in columns["errors"], where "recipe"
+    # is the position of the recipe in columns["recipes"].
+    # Ingredient names are normalized and numbered in columns["ingredients"].
+    # columns["conversion"] is 1 for most rows, or the density factor for a
+    # row bought by weight and used by volume (or the other way round).
+    # With fixed=True the amounts and prices are also read from the row text
+    # straight into fixed-point integers, for cost_book_columns_fixed().
+
+    recipes = []
+    servings = []
+    recipe_index = []
+    ingredient_ids = {}
+    ingredient_index = []
+    used_unit = []
+    amount_used = []
+    purchased_unit = []
+    conversion = []
+    amount_purchased = []
+    cost_purchased = []
+    fixed_values = []
+    errors = []
+
+    current = object()
+    for line_num, row, error in entries:
+        name = row.get("recipe") if row else None
+        if name != current:
+            current = name
+            recipes.append(name)
+            servings.append(0)
+
+        if error is None:
+            try:
+                if not name:
+                    raise ValueError("recipe name can't be blank")
+                row_servings = parse_servings(row.get("servings"))
+                if servings[-1] and row_servings != servings[-1]:
+                    raise ValueError(f"servings {row_servings} does not match {servings[-1]}")
+                used, purchased = resolve_units(row)
+
+                row_amount_used = parse_positive(row.get("amount_used"), "amount_used")
+                row_amount_purchased = parse_positive(row.get("amount_purchased"), "amount_purchased")
+                row_cost = parse_positive(row.get("cost_purchased"), "cost_purchased")
+                if fixed:
+                    fixed_values.append(fixed_amounts(row, used, purchased))
+            except ValueError as row_error:
+                error = str(row_error)
+            else:
+                servings[-1] = row_servings
+                recipe_index.append(len(recipes) - 1)
+                ingredient_index.append(ingredient_ids.setdefault(normalize_name(row.get("ingredient") or ""),
+                                                                  len(ingredient_ids)))
+                used_unit.append(used)
+                amount_used.append(row_amount_used)
+                purchased_unit.append(purchased)
+                conversion.append(conversion_factor(row, used, purchased))
+                amount_purchased.append(row_amount_purchased)
+                cost_purchased.append(row_cost)
+                continue
+        errors.append({"recipe": len(recipes) - 1, "line": line_num, "error": error})
+
+    columns = {
+        "recipes": recipes,
+        "servings": np.array(servings, dtype=np.int64),
+        "recipe_index": np.array(recipe_index, dtype=np.int64),
+        "ingredients": list(ingredient_ids),
+        "ingredient_index": np.array(ingredient_index, dtype=np.int64),
+        "used_unit": np.array(used_unit, dtype=np.int32),
+        "amount_used": np.array(amount_used, dtype=np.float64),
+        "purchased_unit": np.array(purchased_unit, dtype=np.int32),
+        "conversion": np.array(conversion, dtype=np.float64),
+        "amount_purchased": np.array(amount_purchased, dtype=np.float64),
+        "cost_purchased": np.array(cost_purchased, dtype=np.float64),
+        "errors": errors,
+    }
+    if fixed:
+        used_base, purchased_base, cost_fixed = zip(*fixed_values) if fixed_values else ((), (), ())
+        columns["used_base"] = int_column(used_base)
+        columns["purchased_base"] = int_column(purchased_base)
+        columns["cost_fixed"] = int_column(cost_fixed)
+    return columns
+
+def int_column(values):
+
+    # int64 array, or an object array of Python ints if a value doesn't fit.
+
+    try:
+        return np.array(values, dtype=np.int64)
+    except OverflowError:
+        return np.array(values, dtype=object)
+
+# -------------------- Costing --------------------
+
+def cost_ingredient_columns(columns):
+
+    # Cost of the amount used for every ingredient row.
+    # Same order of operations as cost_ingredient() so results match exactly.
+
+    factors = np.asarray(UNIT_REGISTRY.factors, dtype=np.float64)
+    converted_used = columns["amount_used"] * factors[columns["used_unit"]] * columns["conversion"]
+    converted_purchased = columns["amount_purchased"] * factors[columns["purchased_unit"]]
+    return (converted_used / converted_purchased) * columns["cost_purchased"]
+
+def cost_book_columns(columns):
+
+    # Returns (ingredient costs, recipe totals, cost per serving) as arrays.
+    # Recipe totals are a grouped sum of ingredient costs by recipe index.
+
+    ingredient_costs = cost_ingredient_columns(columns)
+    totals = np.bincount(columns["recipe_index"], weights=ingredient_costs,
+                         minlength=len(columns["recipes"]))
+    servings = columns["servings"]
+    per_serving = np.divide(totals, servings, out=np.zeros_like(totals), where=servings > 0)
+    return ingredient_costs, totals, per_serving
+
+# -------------------- Fixed-point Costing --------------------
+
+def div_round_array(numerators, denominators):
+
+    # Array version of fixed_point.div_round(): integer division, half to even.
+    # // and % rather than np.divmod, which has no object (Python int) loop.
+
+    quotients = numerators // denominators
+    remainders = numerators % denominators
+    twice = 2 * remainders
+    return quotients + ((twice > denominators) | ((twice == denominators) & (quotients % 2 == 1)))
+
+def fits_int64(column, times):
+
+    # True when every value of column times `times` stays inside int64.
+
+    return not len(column) or int(column.max()) * int(times) <= INT64_MAX
+
+def cost_book_columns_fixed(columns):
+
+    # Fixed-point version of cost_book_columns(), in whole micro-dollars, for
+    # columns from load_book_columns(entries, fixed=True). The integers come
+    # from the same fixed_amounts() as batch_costing with fixed=True, so
+    # every cost, total and cost per serving is the same integer.
+    # Products that could pass int64 (very large purchases) are worked out
+    # with Python ints in object arrays instead of wrapping around.
+
+    if "used_base" not in columns:
+        raise ValueError("load the book with load_book_columns(entries, fixed=True) first")
+    used_base = columns["used_base"]
+    purchased_base = columns["purchased_base"]
+    cost_fixed = columns["cost_fixed"]
+    if not fits_int64(used_base, cost_fixed.max() if len(cost_fixed) else 0):
+        used_base, purchased_base, cost_fixed = (column.astype(object)
+                                                 for column in (used_base, purchased_base, cost_fixed))
+    ingredient_costs = div_round_array(used_base * cost_fixed, purchased_base)
+    if not fits_int64(ingredient_costs, len(ingredient_costs)):
+        ingredient_costs = ingredient_costs.astype(object)
+    totals = np.zeros(len(columns["recipes"]), dtype=ingredient_costs.dtype)
+    np.add.at(totals, columns["recipe_index"], ingredient_costs)
+    servings = columns["servings"]
+    per_serving = np.where(servings > 0, div_round_array(totals, np.maximum(servings, 1)), 0)
+    return ingredient_costs, totals, per_serving
+
+def cost_book_vectorized(entries):
+
+    # Vectorized counterpart of batch_costing.cost_recipe_book().
+    # Returns a list of result dicts with the same keys.
+
+    columns = load_book_columns(entries)
+    ingredient_costs, totals, per_serving = cost_book_columns(columns)
+    counts = np.bincount(columns["recipe_index"], minlength=len(columns["recipes"]))
+
+    results = [
+        {
+            "recipe": name,
+            "servings": int(servings) or None,
+            "total_cost": float(total),
+            "cost_per_serving": float(cost),
+            "ingredients": int(count),
+            "errors": [],
+        }
+        for name, servings, total, cost, count
+        in zip(columns["recipes"], columns["servings"], totals, per_serving, counts)
+    ]
+    for error in columns["errors"]:
+        results[error["recipe"]]["errors"].append({"line": error["line"], "error": error["error"]})
+    return results
+
+# -------------------- Benchmark --------------------
+
+def synthetic_book(n_rows, rows_per_recipe=10, seed=1, amount_texts=None):
+
+    # Generates a repeatable book of valid ingredient rows for benchmarks.
+    # With amount_texts, amounts are picked from those strings (so fractions
+    # like "1 1/2" can be included) instead of being random decimals.
+
+    rng = np.random.default_rng(seed)
+    units = sorted(UNIT_REGISTRY.ids)
+    pairs = [(used, purchased) for used in units for purchased in sorted(UNIT_REGISTRY.category_of(used))]
+    picks = rng.integers(0, len(pairs), n_rows)
+    if amount_texts is None:
+        amounts_used = rng.uniform(1, 500, n_rows).round(2)
+        amounts_purchased = rng.uniform(1, 5, n_rows).round(2)
+    else:
+        amounts_used = np.array(amount_texts)[rng.integers(0, len(amount_texts), n_rows)]
+        amounts_purchased = np.array(amount_texts)[rng.integers(0, len(amount_texts), n_rows)]
+    costs = rng.uniform(0.5, 20, n_rows).round(2)
+
+    for row_num in range(n_rows):
+        used, purchased = pairs[picks[row_num]]
+        recipe_num = row_num // rows_per_recipe
+        yield row_num + 2, {
+            "recipe": f"Recipe {recipe_num}",
+            "servings": str(recipe_num % 12 + 1),
+            "ingredient": f"ingredient {row_num % 500}",
+            "used_unit": used,
+            "amount_used": str(amounts_used[row_num]),
+            "purchased_unit": purchased,
+            "amount_purchased": str(amounts_purchased[row_num]),
+            "cost_purchased": str(costs[row_num]),
+        }, None
+
+def benchmark(n_rows=1_000_000):
+
+    # Times the scalar path against the vectorized path on the same book.
+    # Loading (parsing) is timed separately from the costing arithmetic, and
+    # the arithmetic is also timed one row at a time with cost_ingredient().
+
+    entries = list(synthetic_book(n_rows))
+
+    start = time.perf_counter()
+    scalar = list(cost_recipe_book(iter(entries)))
+    scalar_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    columns = load_book_columns(iter(entries))
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _, totals, per_serving = cost_book_columns(columns)
+    vector_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in zip(columns["amount_used"].tolist(), [UNIT_REGISTRY.names[u] for u in columns["used_unit"]],
+                   columns["amount_purchased"].tolist(), [UNIT_REGISTRY.names[u] for u in columns["purchased_unit"]],
+                   columns["cost_purchased"].tolist()):
+        cost_ingredient(*row)
+    row_time = time.perf_counter() - start
+
+    matches = (
+        np.array_equal(totals, [result["total_cost"] for result in scalar])
+        and np.array_equal(per_serving, [result["cost_per_serving"] for result in scalar])
+    )
+
+    print(f"Rows: {n_rows:,}  Recipes: {len(scalar):,}")
+    print(f"Scalar cost_recipe_book:   {scalar_time:8.3f} s")
+    print(f"Vector load_book_columns:  {load_time:8.3f} s  "
+          f"(end to end {scalar_time / (load_time + vector_time):,.1f}x faster)")
+    print(f"Scalar cost_ingredient:    {row_time:8.3f} s")
+    print(f"Vector cost_book_columns:  {vector_time:8.3f} s  ({row_time / vector_time:,.0f}x faster)")
+    print(f"Results match scalar path: {'yes' if matches else 'NO'}")
+    return matches
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000) else 1)
@@ -0,0 +1,4 @@
+# -------------------- Tests --------------------
+
+# Behaviour tests for the recipe_cost package. Run from the repository root:
+#     python -m pytest -q
@@ -0,0 +1,30 @@
+from fractions import Fraction
+
+import pytest
+
+from recipe_cost.amount_parser import parse_amount
+
+# -------------------- Amounts --------------------
+
+@pytest.mark.parametrize("text, expected", [
+    ("3", 3), (" 2.5 ", 2.5), (".5", 0.5), ("1/2", 0.5), ("1 1/2", 1.5), ("-3/4", -0.75), ("2 / 8", 0.25),
+])
+def test_amounts_parse(text, expected):
+    assert parse_amount(text) == expected
+    assert parse_amount(text, exact=True) == Fraction(expected)
+
+@pytest.mark.parametrize("value", ["1/0", "2**8", "__import__('os')", "one", "", True, None])
+def test_anything_else_is_rejected(value):
+    with pytest.raises(ValueError):
+        parse_amount(value)
+
+@pytest.mark.parametrize("value", [10**400, "1" * 400, "1" * 400 + "/3", float("inf"), float("-inf"), float("nan")])
+def test_numbers_too_big_for_a_float_are_rejected(value):
+    with pytest.raises(ValueError, match="too large"):
+        parse_amount(value)
+
+def test_exact_amounts_reject_infinity_but_keep_big_numbers():
+    assert parse_amount(10**400, exact=True) == 10**400
+    for value in (float("inf"), float("nan")):
+        with pytest.raises(ValueError):
+            parse_amount(value, exact=True)
@@ -0,0 +1,134 @@
+import io
+import json
+
+import pytest
+
+from recipe_cost import batch_costing
+from recipe_cost.batch_costing import cost_recipe_book, read_csv_book, read_jsonl_book, read_recipe_book
+from recipe_cost.ingredient_catalog import IngredientCatalog
+
+# -------------------- Batch Costing --------------------
+
+HEADER = "recipe,servings,ingredient,used_unit,amount_used,purchased_unit,amount_purchased,cost_purchased\n"
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+def test_csv_book_costs_each_recipe(tmp_path):
+    book = write(tmp_path / "book.csv", HEADER
+                 + "Pancakes,4,flour,g,250,kg,1,4.00\n"
+                 + "Pancakes,4,milk,ml,300,l,2,3.50\n"
+                 + "Tea,1,tea,unit,1,units,50,5.00\n")
+    results = list(cost_recipe_book(read_csv_book(book)))
+    assert [result["recipe"] for result in results] == ["Pancakes", "Tea"]
+    assert results[0]["total_cost"] == pytest.approx(1.525)
+    assert results[0]["cost_per_serving"] == pytest.approx(1.525 / 4)
+    assert results[1]["total_cost"] == pytest.approx(0.1)
+    assert all(result["errors"] == [] for result in results)
+
+def test_bad_rows_are_reported_and_costing_goes_on(tmp_path):
+    book = write(tmp_path / "book.csv", HEADER
+                 + "Pancakes,4,flour,g,lots,kg,1,4.00\n"
+                 + "Pancakes,4,egg,unit,2,kg,1,3.00\n"
+                 + "Pancakes,4,sugar,g,100,kg,1,5.00\n"
+                 + "Pancakes,6,salt,g,1,kg,1,1.00\n"
+                 + "Tea,1,tea,unit,1,cup,50,5.00\n")
+    pancakes, tea = cost_recipe_book(read_csv_book(book))
+    assert pancakes["ingredients"] == 1
+    assert pancakes["total_cost"] == pytest.approx(0.5)
+    assert [error["line"] for error in pancakes["errors"]] == [2, 3, 5]
+    assert "amount_used is not a number" in pancakes["errors"][0]["error"]
+    assert pancakes["errors"][1]["error"] == "cannot buy in kg and use in unit"
+    assert "servings 6 does not match 4" in pancakes["errors"][2]["error"]
+    assert tea["errors"] == [{"line": 6, "error": "unknown purchased unit: 'cup'"}]
+
+def test_jsonl_bad_lines_and_items_are_reported(tmp_path):
+    good = {"ingredient": "milk", "used_unit": "ml", "amount_used": "100", "purchased_unit": "l",
+            "amount_purchased": "1", "cost_purchased": "2"}
+    lines = [
+        json.dumps({"recipe": "A", "servings": 2, "ingredients": [5, "flour", good, dict(good, used_unit=["g"])]}),
+        "{not json",
+        json.dumps([1, 2]),
+        json.dumps({"recipe": "B", "servings": 1, "ingredients": "milk"}),
+        json.dumps(dict(good, recipe="C", servings=1)),
+    ]
+    book = write(tmp_path / "book.jsonl", "\n".join(lines) + "\n")
+
+    entries = list(read_jsonl_book(book))
+    assert [error for _, _, error in entries] == [
+        "ingredient must be a JSON object", "ingredient must be a JSON object", None, None,
+        entries[4][2], "expected a JSON object", "ingredients must be a list", None,
+    ]
+    assert entries[4][2].startswith("invalid JSON")
+
+    results = {result["recipe"]: result for result in cost_recipe_book(iter(entries))}
+    assert results["A"]["ingredients"] == 1
+    assert results["A"]["total_cost"] == pytest.approx(0.2)
+    assert [error["error"] for error in results["A"]["errors"]] == [
+        "ingredient must be a JSON object", "ingredient must be a JSON object", "unknown used unit: ['g']"]
+    assert results["C"]["total_cost"] == pytest.approx(0.2)
+
+def test_reader_is_picked_by_extension(tmp_path):
+    csv_book = write(tmp_path / "book.CSV", HEADER + "Tea,1,tea,unit,1,unit,50,5.00\n")
+    jsonl_book = write(tmp_path / "book.jsonl", json.dumps({"recipe": "Tea", "servings": 1, "ingredient": "tea",
+                                                            "used_unit": "unit", "amount_used": 1,
+                                                            "purchased_unit": "unit", "amount_purchased": 50,
+                                                            "cost_purchased": 5}) + "\n")
+    assert list(read_recipe_book(csv_book))[0][1]["ingredient"] == "tea"
+    assert list(read_recipe_book(jsonl_book))[0][1]["ingredient"] == "tea"
+
+def test_fractions_and_density_rows():
+    entries = [
+        (2, {"recipe": "Bread", "servings": "2", "ingredient": "flour", "used_unit": "ml",
+             "amount_used": "1 1/2", "purchased_unit": "kg", "amount_purchased": "1", "cost_purchased": "2"}, None),
+        (3, {"recipe": "Bread", "servings": "2", "ingredient": "sand", "used_unit": "ml",
+             "amount_used": "1", "purchased_unit": "kg", "amount_purchased": "1", "cost_purchased": "2"}, None),
+    ]
+    [bread] = cost_recipe_book(iter(entries))
+    assert bread["total_cost"] == pytest.approx(1.5 * 0.53 / 1000 * 2)
+    assert "without a density" in bread["errors"][0]["error"]
+
+def test_main_reports_bad_rows_and_exit_code(tmp_path, capsys):
+    book = write(tmp_path / "book.csv", HEADER + "Tea,1,tea,unit,1,unit,50,5.00\nTea,1,milk,ml,x,l,1,1\n")
+    assert batch_costing.main([book]) == 1
+    captured = capsys.readouterr()
+    assert captured.out.splitlines() == ["recipe,servings,total_cost,cost_per_serving,ingredients,errors",
+                                         "Tea,1,0.10,0.10,1,1"]
+    assert "❌ Tea (line 3): amount_used is not a number: 'x'" in captured.err
+
+def test_main_costs_from_the_catalog_and_closes_it(tmp_path, capsys, monkeypatch):
+    path = str(tmp_path / "catalog.db")
+    with IngredientCatalog(path) as catalog:
+        catalog.set_price("Flour", 1, "kg", 2.00)
+    closed = []
+    monkeypatch.setattr(IngredientCatalog, "close", lambda self: closed.append(self.connection.close()))
+    book = write(tmp_path / "book.csv", HEADER + "Bread,2,flour,g,500,,,\n")
+    assert batch_costing.main(["--catalog", path, book]) == 0
+    assert capsys.readouterr().out.splitlines()[1] == "Bread,2,1.00,0.50,1,0"
+    assert len(closed) == 1
+
+def test_huge_and_infinite_amounts_are_bad_rows(tmp_path, capsys):
+    row = {"recipe": "B", "servings": 2, "ingredient": "salt", "used_unit": "g", "amount_used": 1,
+           "purchased_unit": "kg", "amount_purchased": 1, "cost_purchased": 1}
+    book = write(tmp_path / "book.jsonl", "\n".join([
+        json.dumps(row),
+        json.dumps(dict(row, cost_purchased=float("inf"))),
+        json.dumps(row).replace('"amount_used": 1,', '"amount_used": 1' + "0" * 400 + ","),
+        json.dumps(dict(row, amount_purchased="1" * 400 + "/3")),
+    ]) + "\n")
+    assert batch_costing.main([book]) == 1
+    captured = capsys.readouterr()
+    assert captured.out.splitlines()[1] == "B,2,0.00,0.00,1,3"
+    assert "cost_purchased is not a number: inf" in captured.err
+    assert captured.err.count("is not a number") == 3
+
+def test_fixed_results_are_exact_micro_dollars():
+    entries = [(2, {"recipe": "A", "servings": "3", "ingredient": "x", "used_unit": "g", "amount_used": "1",
+                    "purchased_unit": "g", "amount_purchased": "3", "cost_purchased": "0.10"}, None)]
+    [result] = cost_recipe_book(iter(entries), fixed=True)
+    assert result["total_cost"] == 33_333
+    assert result["cost_per_serving"] == 11_111
+    out = io.StringIO()
+    list(batch_costing.write_results_csv([result], out))
+    assert out.getvalue().splitlines()[1] == "A,3,0.03,0.01,1,0"
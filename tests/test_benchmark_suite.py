@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from recipe_cost import benchmark_suite
+from recipe_cost.benchmark_suite import compare, run_suite
+
+# -------------------- Benchmark Suite --------------------
+
+def report(**ns_per_op):
+    return {"results": {name: {"size": "small", "ns_per_op": ns} for name, ns in ns_per_op.items()}}
+
+def test_slowdowns_past_the_threshold_are_regressions():
+    rows, regressions = compare(report(parse_amount=120, cost_row=105, cold_start=50),
+                                report(parse_amount=100, cost_row=100))
+    assert [row[0] for row in rows] == ["parse_amount", "cost_row"]
+    assert rows[0][3] == pytest.approx(0.2)
+    assert regressions == ["parse_amount"]
+
+def test_other_sizes_are_not_compared():
+    baseline = report(parse_amount=100)
+    baseline["results"]["parse_amount"]["size"] = "medium"
+    assert compare(report(parse_amount=500), baseline) == ([], [])
+
+def test_suite_report_is_json(monkeypatch):
+    monkeypatch.setattr(benchmark_suite, "MIN_SAMPLE_TIME", 0)
+    suite = run_suite("small", ["parse_amount", "cost_row"], repeat=1)
+    assert set(suite["results"]) == {"parse_amount", "cost_row"}
+    result = suite["results"]["parse_amount"]
+    assert result["operations"] > 0 and result["ns_per_op"] > 0 and result["loops"] == 1
+    assert json.loads(json.dumps(suite)) == suite
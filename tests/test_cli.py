@@ -0,0 +1,23 @@
+import subprocess
+import sys
+
+from recipe_cost.cli import main
+
+# -------------------- Command Line --------------------
+
+def test_unknown_command_lists_the_commands(capsys):
+    assert main(["bake"]) == 2
+    assert "Unknown command 'bake'" in capsys.readouterr().err
+
+def test_commands_run_their_module(tmp_path, capsys):
+    book = tmp_path / "book.csv"
+    book.write_text("recipe,servings,ingredient,used_unit,amount_used,purchased_unit,amount_purchased,"
+                    "cost_purchased\nToast,2,butter,g,10,g,250,2.50\n")
+    assert main(["cost", str(book)]) == 0
+    assert "Toast,2,0.1" in capsys.readouterr().out
+
+def test_importing_the_package_stays_cheap():
+    code = ("import sys, recipe_cost, recipe_cost.cli; "
+            "print(sorted({'numpy', 'sqlite3', 'tabulate', 'recipe_cost.batch_costing'} & set(sys.modules)))")
+    loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == "[]"
@@ -0,0 +1,27 @@
+import pytest
+
+from recipe_cost.conversion_graph import CONVERSIONS, ConversionGraph
+from recipe_cost.unit_registry import UnitRegistry
+from recipe_cost.units import UNIT_REGISTRY
+
+# -------------------- Conversions --------------------
+
+def test_conversion_factors():
+    g, kg, ml, tbsp, unit = (UNIT_REGISTRY.lookup(name) for name in ("g", "kg", "ml", "tbsp", "unit"))
+    assert CONVERSIONS.factor(g, kg) == pytest.approx(0.001)
+    assert CONVERSIONS.factor(tbsp, g, density=0.53) == pytest.approx(7.95)
+    assert CONVERSIONS.factor(g, ml, density=0.5) == pytest.approx(2)
+    assert not CONVERSIONS.linked(g, unit)
+    with pytest.raises(ValueError, match="needs a density"):
+        CONVERSIONS.factor(ml, g)
+    with pytest.raises(ValueError, match="can't be converted"):
+        CONVERSIONS.factor(unit, g, density=1)
+    assert "kg" in CONVERSIONS.linked_units("tsp")
+
+def test_graph_picks_up_new_units():
+    registry = UnitRegistry()
+    grams = registry.register("g", 1, "weight")
+    graph = ConversionGraph(registry)
+    assert graph.factor(grams, grams) == 1
+    cup = registry.register("cup", 250, "volume")
+    assert graph.factor(cup, grams, density=1.42) == pytest.approx(355)
@@ -0,0 +1,19 @@
+import pytest
+
+from recipe_cost.fixed_point import MONEY_SCALE, div_round, format_money, to_fixed, to_money
+
+# -------------------- Fixed-point Money --------------------
+
+@pytest.mark.parametrize("numerator, expected", [(5, 0), (15, 2), (25, 2), (-5, 0), (-15, -2), (14, 1), (16, 2)])
+def test_division_rounds_half_to_even(numerator, expected):
+    assert div_round(numerator, 10) == expected
+
+def test_money_is_exact_micro_dollars():
+    assert to_money("0.1") == to_money(0.1) == MONEY_SCALE // 10
+    assert to_money("1 1/3") == 1_333_333
+    assert to_fixed("0.0005", 1000) == 0
+    assert to_fixed("0.0015", 1000) == 2
+    assert format_money(1_234_567) == "1.23"
+    assert format_money(1_005_000) == "1.00"
+    assert format_money(1_015_000) == "1.02"
+    assert format_money(-2_500_000) == "-2.50"
@@ -0,0 +1,45 @@
+import pytest
+
+from recipe_cost.batch_costing import cost_recipe_book
+from recipe_cost.incremental_costing import CostIndex
+from recipe_cost.ingredient_records import IngredientRecord
+
+# -------------------- Incremental Re-costing --------------------
+
+def pancakes(flour_cost):
+    return [
+        (2, {"recipe": "Pancakes", "servings": "4", "ingredient": "flour", "used_unit": "ml", "amount_used": "100",
+             "purchased_unit": "kg", "amount_purchased": "1", "cost_purchased": flour_cost}, None),
+        (3, {"recipe": "Pancakes", "servings": "4", "ingredient": "milk", "used_unit": "ml", "amount_used": "300",
+             "purchased_unit": "l", "amount_purchased": "2", "cost_purchased": "3.50"}, None),
+    ]
+
+def test_update_prices_matches_full_recost_on_density_rows():
+    [before] = cost_recipe_book(iter(pancakes("2")))
+    rows = [IngredientRecord("flour", 100.0, "ml", 100.0, 100 * 0.53 / 1000 * 2),
+            IngredientRecord("milk", 300.0, "ml", 300.0, 300 / 2000 * 3.5)]
+    index = CostIndex()
+    index.add_recipe("Pancakes", 4, before["total_cost"], rows, purchased_units=["kg", "l"])
+
+    changed = index.update_prices({"flour": 4 / 1000})
+    [after] = cost_recipe_book(iter(pancakes("4")))
+    total, per_serving = changed["Pancakes"]
+    assert total == pytest.approx(after["total_cost"])
+    assert per_serving == pytest.approx(after["cost_per_serving"])
+    assert index.recipes["Pancakes"]["ingredients"][0].total_cost == pytest.approx(0.212)
+
+def test_update_prices_only_touches_users():
+    index = CostIndex()
+    index.add_recipe("A", 2, 1.0, [IngredientRecord("sugar", 100.0, "g", 100.0, 1.0)])
+    index.add_recipe("B", 1, 2.0, [IngredientRecord("salt", 10.0, "g", 10.0, 2.0)])
+
+    assert index.update_prices({"Sugar": 0.02}) == {"A": (2.0, 1.0)}
+    assert index.recipes["B"]["total_cost"] == 2.0
+    index.remove_recipe("A")
+    assert index.recipes_using("sugar") == set()
+
+def test_add_recipe_rejects_unknown_purchased_unit():
+    index = CostIndex()
+    with pytest.raises(ValueError):
+        index.add_recipe("A", 1, 1.0, [IngredientRecord("sugar", 1.0, "g", 1.0, 1.0)], purchased_units=["sack"])
+    assert "A" not in index.recipes
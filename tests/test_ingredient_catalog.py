@@ -0,0 +1,46 @@
+import pytest
+
+from recipe_cost.batch_costing import cost_recipe_book
+from recipe_cost.ingredient_catalog import IngredientCatalog
+
+# -------------------- Ingredient Catalog --------------------
+
+@pytest.fixture
+def catalog(tmp_path):
+    with IngredientCatalog(str(tmp_path / "catalog.db")) as catalog:
+        yield catalog
+
+def catalog_row(ingredient, amount_used, used_unit):
+    return {"recipe": "Cake", "servings": "8", "ingredient": ingredient, "amount_used": amount_used,
+            "used_unit": used_unit, "amount_purchased": "", "purchased_unit": "", "cost_purchased": ""}
+
+def test_prices_are_versioned_and_cached(catalog):
+    first = catalog.set_price(" Flour ", 1, "kg", 2.00)
+    assert first["name"] == "flour" and first["display_name"] == "Flour" and first["version"] == 1
+    second = catalog.set_price("FLOUR", 500, "g", 1.50)
+    assert second["version"] == 2
+    assert catalog.get("flour")["cost_per_base"] == pytest.approx(0.003)
+    assert catalog.get_many(["Flour", "sugar"]) == {"flour": second, "sugar": None}
+    with pytest.raises(ValueError, match="Unknown unit"):
+        catalog.set_price("salt", 1, "parsec", 1.00)
+    with pytest.raises(ValueError, match="greater than zero"):
+        catalog.set_price("salt", 0, "kg", 1.00)
+
+def test_catalog_survives_reopening(tmp_path):
+    with IngredientCatalog(str(tmp_path / "catalog.db")) as catalog:
+        catalog.set_price("Honey", 1, "kg", 8.00)
+    with IngredientCatalog(str(tmp_path / "catalog.db")) as catalog:
+        assert catalog.get("honey")["version"] == 1
+        assert catalog.snapshot().get("HONEY")["cost_purchased"] == 8.00
+        assert catalog.names() == ["Honey"]
+
+def test_costing_a_book_from_the_catalog(catalog):
+    catalog.set_price("Flour", 1, "kg", 2.00)
+    catalog.set_price("Honey", 1, "kg", 8.00)
+    book = [(2, catalog_row("flour", "500", "g"), None),
+            (3, catalog_row("honey", "100", "ml"), None),
+            (4, catalog_row("saffron", "1", "g"), None)]
+    [result] = cost_recipe_book(book, catalog)
+    assert result["total_cost"] == pytest.approx(1.00 + 100 * 1.42 * 0.008)
+    assert result["errors"] == [{"line": 4, "error": "no catalog price for 'saffron'"}]
+    assert catalog.cost_of("flour", 2, "tbsp") == pytest.approx(2 * 15 * 0.53 * 0.002)
@@ -0,0 +1,32 @@
+import pytest
+
+from recipe_cost.ingredient_records import IngredientColumns, IngredientRecord
+from recipe_cost.units import UNIT_REGISTRY
+
+# -------------------- Ingredient Records --------------------
+
+def test_records_compare_and_copy_by_value():
+    record = IngredientRecord("flour", 250.0, "g", 250.0, 0.5)
+    copy = record.copy()
+    assert copy == record and copy is not record
+    copy.total_cost = 0.6
+    assert copy != record
+    assert record.cost_per_serving(4) == 0.125
+    assert record.amount_text() == "250.00 g"
+    assert not hasattr(record, "__dict__")
+
+def test_columns_hold_the_same_rows_as_records():
+    records = [IngredientRecord("flour", 0.25, "kg", 250.0, 0.5), IngredientRecord("milk", 2.0, "tbsp", 30.0, 0.1)]
+    columns = IngredientColumns(UNIT_REGISTRY)
+    for record in records:
+        columns.append_record(record)
+    assert len(columns) == 2
+    assert list(columns) == records
+    assert columns.total() == 0.6
+    assert list(columns.costs_per_serving(2)) == [0.25, 0.05]
+
+def test_columns_refuse_unknown_units():
+    columns = IngredientColumns(UNIT_REGISTRY)
+    with pytest.raises(ValueError, match="slice"):
+        columns.append("bread", 2, "slice", 0.3)
+    assert len(columns) == 0
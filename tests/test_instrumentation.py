@@ -0,0 +1,37 @@
+import json
+
+from recipe_cost.instrumentation import NULL_STAGE, Profiler
+
+# -------------------- Profiling --------------------
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    assert profiler.stage("load") is NULL_STAGE
+    with profiler.stage("load"):
+        pass
+    assert profiler.summary()["timers"] == {}
+
+def test_stages_counters_and_sources(tmp_path):
+    profiler = Profiler()
+    profiler.enable()
+    for _ in range(3):
+        with profiler.stage("cost"):
+            profiler.count("rows", 10)
+    assert list(profiler.timed_iter("read", range(4))) == [0, 1, 2, 3]
+    profiler.add_source("cache", lambda: {"hits": 7})
+
+    summary = profiler.summary()
+    assert summary["counters"] == {"rows": 30}
+    assert summary["timers"]["cost"]["calls"] == 3
+    assert summary["timers"]["read"]["calls"] == 4
+    assert summary["sources"] == {"cache": {"hits": 7}}
+
+    profiler.export_chrome_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    # Readers keep totals only, so just the stage calls and the counter are traced
+    assert [event["ph"] for event in events] == ["X", "X", "X", "C"]
+    profiler.export_json(tmp_path / "summary.json")
+    assert json.loads((tmp_path / "summary.json").read_text())["counters"] == {"rows": 30}
+
+    profiler.reset()
+    assert profiler.summary()["timers"] == {} and profiler.summary()["counters"] == {}
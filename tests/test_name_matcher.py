@@ -0,0 +1,84 @@
+import csv
+import io
+import json
+
+
+from recipe_cost.ingredient_catalog import IngredientCatalog
+from recipe_cost.name_matcher import NameMatcher, book_fields, main, resolve_book, trigrams
+
+# -------------------- Ingredient Name Matching --------------------
+
+NAMES = ["Plain flour", "Wholemeal flour", "Caster sugar", "Brown sugar", "Whole milk", "Eggs"]
+
+def test_trigrams_are_padded_like_pg_trgm():
+    assert trigrams("Flour") == {"  f", " fl", "flo", "lou", "our", "ur "}
+    assert trigrams("flour, PLAIN") == trigrams("plain flour")
+
+def test_matches_are_ranked_best_first():
+    matcher = NameMatcher(NAMES + ["plain  FLOUR", ""])
+    assert len(matcher) == 6
+    assert matcher.match("flour (plain)")[0] == ("Plain flour", 1.0)
+    ranked = matcher.match("flour", limit=3)
+    assert [name for name, _ in ranked][:2] == ["Plain flour", "Wholemeal flour"]
+    assert all(first[1] >= second[1] for first, second in zip(ranked, ranked[1:]))
+    assert matcher.match("xyzzy") == []
+
+def test_resolve_uses_the_threshold_and_the_cache():
+    matcher = NameMatcher(NAMES, cache_size=2)
+    assert matcher.resolve("castor sugar") == "Caster sugar"
+    assert matcher.resolve("vanilla") is None
+    assert matcher.resolve("sugar") in {"Caster sugar", "Brown sugar"}
+    assert matcher.resolve("sugar", threshold=0.9) is None
+    assert matcher.resolve_many(["egg", "egg", "milk whole"]) == {"egg": "Eggs", "milk whole": "Whole milk"}
+    assert len(matcher.cache) == 2
+
+def test_resolved_rows_are_copies():
+    matcher = NameMatcher(NAMES)
+    row = {"recipe": "Cake", "ingredient": "caster sugr"}
+    [(line_num, resolved, error)] = resolve_book([(2, row, None)], matcher)
+    assert resolved["ingredient"] == "Caster sugar"
+    assert row["ingredient"] == "caster sugr"
+
+def test_rewrite_keeps_every_book_column(tmp_path, capsys):
+    with IngredientCatalog(str(tmp_path / "catalog.db")) as catalog:
+        for name in NAMES:
+            catalog.set_price(name, 1, "kg", 1.00)
+    book = tmp_path / "book.csv"
+    book.write_text("recipe,servings,yield_amount,yield_unit,ingredient,sub_recipe,used_unit,amount_used,"
+                    "purchased_unit,amount_purchased,cost_purchased\n"
+                    "Cake,8,,,plain flowr,,g,200,,,\n"
+                    "Cake,8,,,custard,Custard,ml,250,,,\n"
+                    "Custard,,500,ml,milk whole,,ml,500,l,1,1.10\n")
+    assert book_fields([book])[4:6] == ["ingredient", "sub_recipe"]
+
+    assert main(["--catalog", str(tmp_path / "catalog.db"), "--rewrite", str(book)]) == 0
+    rows = list(csv.DictReader(io.StringIO(capsys.readouterr().out)))
+    assert [row["ingredient"] for row in rows] == ["Plain flour", "custard", "Whole milk"]
+    assert [row["sub_recipe"] for row in rows] == ["", "Custard", ""]
+    assert rows[2]["yield_amount"] == "500"
+
+def test_report_lists_unmatched_names(tmp_path, capsys):
+    with IngredientCatalog(str(tmp_path / "catalog.db")) as catalog:
+        catalog.set_price("Eggs", 12, "unit", 3.00)
+    book = tmp_path / "book.csv"
+    book.write_text("recipe,servings,ingredient,used_unit,amount_used,purchased_unit,amount_purchased,"
+                    "cost_purchased\nOmelette,1,egg,unit,3,,,\nOmelette,1,chives,g,5,,,\n")
+    assert main(["--catalog", str(tmp_path / "catalog.db"), str(book)]) == 1
+    out, err = capsys.readouterr()
+    assert "egg,Eggs," in out
+    assert "2 ingredient names, 1 without a catalog match." in err
+
+def test_ingredients_that_are_not_strings_are_left_alone(tmp_path, capsys):
+    matcher = NameMatcher(NAMES)
+    rows = [{"recipe": "Cake", "ingredient": ["flour"]}, {"recipe": "Cake", "ingredient": 12}]
+    assert [row for _, row, _ in resolve_book([(2, rows[0], None), (3, rows[1], None)], matcher)] == rows
+
+    with IngredientCatalog(str(tmp_path / "catalog.db")) as catalog:
+        catalog.set_price("Eggs", 12, "unit", 3.00)
+    book = tmp_path / "book.jsonl"
+    book.write_text("".join(json.dumps(dict(recipe="Omelette", servings=1, ingredient=name, used_unit="unit",
+                                            amount_used=3)) + "\n" for name in (["egg"], "egg")))
+    assert main(["--catalog", str(tmp_path / "catalog.db"), str(book)]) == 0
+    out, err = capsys.readouterr()
+    assert "egg,Eggs," in out
+    assert "1 ingredient names, 0 without a catalog match." in err
@@ -0,0 +1,79 @@
+from itertools import product
+
+import pytest
+
+from recipe_cost.pack_optimizer import MAX_STEPS, PackOptimizer, PackSolver
+from recipe_cost.supplier_offers import OfferIndex
+
+# -------------------- Pack Optimizer --------------------
+
+def offer(name, amount, unit, category, pack_base, cost, supplier=""):
+    return {"name": name, "display_name": name.title(), "supplier": supplier, "category": category,
+            "pack_base": pack_base, "cost_per_base": cost / pack_base, "purchased_unit": unit,
+            "amount_purchased": amount, "cost_purchased": cost}
+
+def optimizer(*offers):
+    return PackOptimizer(OfferIndex(offers))
+
+def cheapest_by_search(packs, need):
+
+    # Every mix of up to 12 of each pack, as a check on the solver.
+
+    best = None
+    for counts in product(range(13), repeat=len(packs)):
+        if sum(count * size for count, (size, _) in zip(counts, packs)) >= need:
+            cost = sum(count * cost for count, (_, cost) in zip(counts, packs))
+            best = cost if best is None else min(best, cost)
+    return best
+
+@pytest.mark.parametrize("need", [1, 250, 499, 500, 501, 1200, 2600, 4999])
+def test_plans_match_a_full_search(need):
+    packs = [(500, 2.00), (1000, 3.50), (2500, 8.00)]
+    planner = optimizer(*(offer("rice", size, "g", "weight", size, cost) for size, cost in packs))
+    plan = planner.plan("rice", need, "g")
+    assert plan["purchase_cost"] == pytest.approx(cheapest_by_search(packs, need))
+    assert plan["bought"] >= plan["needed"]
+    assert plan["waste"] == pytest.approx(plan["bought"] - need)
+
+@pytest.mark.parametrize("need", [453.592, 453.6, 1000, 1360.776, 2267.96])
+def test_pound_packs_always_cover_the_need(need):
+    planner = optimizer(offer("butter", 1, "lb", "weight", 453.592, 4.00),
+                        offer("butter", 2, "lb", "weight", 907.184, 7.50))
+    plan = planner.plan("butter", need, "g")
+    assert plan["bought"] >= need - 1e-9
+    assert plan["waste"] >= -1e-9
+
+def test_exactly_one_pack_is_enough():
+    planner = optimizer(offer("butter", 1, "lb", "weight", 453.592, 4.00))
+    assert planner.plan("butter", 1, "g")["purchase_cost"] == 4.00
+    plan = planner.plan("butter", 453.592, "g")
+    assert [count for count, _ in plan["packs"]] == [1]
+
+def test_half_unit_packs_are_not_rounded_up():
+    plan = optimizer(offer("egg", 0.5, "unit", "count", 0.5, 0.40)).plan("egg", 1.5, "unit")
+    assert [count for count, _ in plan["packs"]] == [3]
+    assert plan["purchase_cost"] == pytest.approx(1.20)
+
+def test_coprime_sizes_past_the_cap_are_covered_quickly():
+    planner = optimizer(offer("milk", 946, "ml", "volume", 946, 1.10),
+                        offer("milk", 3785, "ml", "volume", 3785, 3.80))
+    plan = planner.plan("milk", 500, "l")
+    assert plan["bought"] >= 500_000
+    assert plan["waste"] < 3785
+    solver = next(iter(planner.solvers.values()))
+    assert len(solver.cheapest) <= MAX_STEPS + 1
+
+def test_solver_past_the_cap_buys_best_value_in_bulk():
+    solver = PackSolver([3, 5], [3.0, 4.0], max_steps=10)
+    counts, cost = solver.solve(100)
+    assert 3 * counts[0] + 5 * counts[1] >= 100
+    assert cost == pytest.approx(3.0 * counts[0] + 4.0 * counts[1])
+    assert counts[1] >= 18
+
+def test_density_and_unknown_ingredients():
+    planner = optimizer(offer("flour", 1, "kg", "weight", 1000, 2.00))
+    plan = planner.plan("flour", 2, "l")
+    assert plan["needed"] == pytest.approx(2000 * 0.53)
+    assert plan["purchase_cost"] == 4.00
+    [(missing, error)] = planner.plan_many([("saffron", 1, "g")])
+    assert error == "no offers for 'saffron'"
@@ -0,0 +1,33 @@
+import io
+
+from recipe_cost.batch_costing import cost_recipe_book, write_results_csv, write_results_jsonl
+from recipe_cost.parallel_costing import cost_recipe_book_parallel, make_shards
+from recipe_cost.vector_costing import synthetic_book
+
+# -------------------- Parallel Costing --------------------
+
+def book():
+    entries = list(synthetic_book(1_000, rows_per_recipe=7))
+    bad = {"recipe": "Toast", "servings": "2", "ingredient": "bread", "used_unit": "slice", "amount_used": "2",
+           "purchased_unit": "unit", "amount_purchased": "20", "cost_purchased": "3"}
+    return entries + [(entries[-1][0] + 1, bad, None)]
+
+def render(results, writer=write_results_csv):
+    out = io.StringIO()
+    for _ in writer(results, out):
+        pass
+    return out.getvalue()
+
+def test_shards_keep_recipes_whole():
+    shards = list(make_shards(iter(book()), shard_size=13))
+    assert [len(shard) for shard in shards] == [13] * 11 + [1]
+    assert shards[-1][0][0] == "Toast"
+    assert sum(len(entries) for shard in shards for _, entries in shard) == 1_001
+
+def test_parallel_output_is_byte_for_byte_serial():
+    entries = book()
+    serial = list(cost_recipe_book(iter(entries)))
+    parallel = list(cost_recipe_book_parallel(iter(entries), workers=2, shard_size=13))
+    assert render(parallel) == render(serial)
+    assert render(parallel, write_results_jsonl) == render(serial, write_results_jsonl)
+    assert parallel[-1]["errors"] == serial[-1]["errors"] != []
@@ -0,0 +1,100 @@
+from datetime import date
+
+import pytest
+
+from recipe_cost.batch_costing import cost_recipe_book
+from recipe_cost.price_history import PriceHistory, parse_date, read_prices_csv
+
+# -------------------- Price History --------------------
+
+PRICES = [
+    ("Flour", "2025-01-01", 1, "kg", 2.00),
+    ("Flour", "2025-03-01", 1, "kg", 3.00),
+    ("Milk", "2025-02-01", 1, "l", 1.20),
+    ("Flour", "2025-03-01", 1000, "g", 4.00),
+]
+
+def test_prices_as_of_a_date(tmp_path):
+    history = PriceHistory(tmp_path / "history")
+    assert history.add_many(PRICES) == 4
+    assert history.price_as_of("flour", "2024-12-31") is None
+    assert history.price_as_of("flour", "2025-01-01") == pytest.approx(0.002)
+    assert history.price_as_of("FLOUR", date(2025, 2, 28)) == pytest.approx(0.002)
+    # Two prices on one day: the one added last wins
+    assert history.price_as_of("flour", "2025-03-01") == pytest.approx(0.004)
+    assert history.price_as_of("milk", "2025-01-15") is None
+    assert history.price_as_of("saffron", "2025-03-01") is None
+
+def test_history_reopens_with_the_same_prices(tmp_path):
+    PriceHistory(tmp_path / "history").add_many(PRICES)
+    history = PriceHistory(tmp_path / "history")
+    assert len(history) == 4
+    assert history.price_as_of("milk", "2025-06-01") == pytest.approx(0.0012)
+    history.add("Milk", "2025-06-01", 2, "l", 3.00)
+    assert history.price_as_of("milk", "2025-06-01") == pytest.approx(0.0015)
+
+def test_rejected_batch_writes_nothing(tmp_path):
+    history = PriceHistory(tmp_path / "history")
+    history.add_many(PRICES[:1])
+    sizes = history.sizes()
+    with pytest.raises(ValueError, match="Unknown unit"):
+        history.add_many([("Sugar", "2025-01-01", 1, "kg", 1.50), ("Salt", "2025-01-01", 1, "parsec", 0.50)])
+    with pytest.raises(ValueError, match="not a date"):
+        history.add_many([("Sugar", "01/02/2025", 1, "kg", 1.50)])
+    with pytest.raises(ValueError, match="priced by"):
+        history.add_many([("Flour", "2025-01-01", 1, "l", 1.50)])
+
+    assert history.sizes() == sizes
+    assert history.ingredient_id("sugar") is None
+    history.add("Sugar", "2025-01-01", 1, "kg", 1.50)
+    assert PriceHistory(tmp_path / "history").ingredient_id("sugar") == 1
+
+def test_cut_off_write_is_repaired_on_open(tmp_path):
+    history = PriceHistory(tmp_path / "history")
+    history.add_many(PRICES)
+    with open(history.file("keys.i64"), "ab") as out:
+        out.write(b"\0" * 8)
+    with open(history.file("ingredients.tsv"), "a", encoding="utf-8") as out:
+        out.write("sugar\tSu")
+
+    history = PriceHistory(tmp_path / "history")
+    sizes = history.sizes()
+    assert sizes["keys.i64"] == sizes["costs.f64"] == 4 * 8
+    assert [name for name, _, _ in history.ingredients] == ["flour", "milk"]
+    assert history.price_as_of("flour", "2025-03-02") == pytest.approx(0.004)
+
+def test_snapshot_costs_a_book_as_of_a_date(tmp_path):
+    history = PriceHistory(tmp_path / "history")
+    history.add_many(PRICES)
+    book = [(2, {"recipe": "Pancakes", "servings": "2", "ingredient": "flour", "amount_used": "250",
+                 "used_unit": "g", "amount_purchased": "", "purchased_unit": "", "cost_purchased": ""}, None),
+            (3, {"recipe": "Pancakes", "servings": "2", "ingredient": "milk", "amount_used": "500",
+                 "used_unit": "ml", "amount_purchased": "", "purchased_unit": "", "cost_purchased": ""}, None)]
+    [early] = cost_recipe_book(book, history.snapshot("2025-02-15"))
+    [late] = cost_recipe_book(book, history.snapshot("2025-03-15"))
+    assert early["errors"] == [] and late["errors"] == []
+    assert early["total_cost"] == pytest.approx(0.50 + 0.60)
+    assert late["total_cost"] == pytest.approx(1.00 + 0.60)
+
+def test_reading_a_prices_file(tmp_path):
+    path = tmp_path / "prices.csv"
+    path.write_text("ingredient,date,amount_purchased,purchased_unit,cost_purchased\n"
+                    "Flour,2025-01-01,1,kg,2.00\n"
+                    "Milk,2025-13-01,1,l,1.20\n")
+    rows = read_prices_csv(path)
+    assert next(rows) == ("Flour", date(2025, 1, 1), 1.0, "kg", 2.0)
+    with pytest.raises(ValueError, match="line 3: not a date"):
+        next(rows)
+    assert parse_date(" 2025-03-01 ") == date(2025, 3, 1)
+
+@pytest.mark.parametrize("name", ["flour\tplain", "flour\nplain", "flour\rplain", "flour\x00"])
+def test_names_that_would_break_the_file_are_refused(tmp_path, name):
+    history = PriceHistory(tmp_path / "history")
+    history.add("Sugar", "2025-01-01", 1, "kg", 1.50)
+    with pytest.raises(ValueError, match="can't contain tabs, line breaks or control characters"):
+        history.add_many([("Salt", "2025-01-01", 1, "kg", 0.50), (name, "2025-01-01", 1, "kg", 2.00)])
+
+    history = PriceHistory(tmp_path / "history")
+    assert [display_name for _, display_name, _ in history.ingredients] == ["Sugar"]
+    history.add("Plain flour", "2025-01-01", 1, "kg", 2.00)
+    assert PriceHistory(tmp_path / "history").price_as_of("plain flour", "2025-01-02") == pytest.approx(0.002)
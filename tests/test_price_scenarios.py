@@ -0,0 +1,106 @@
+import io
+import json
+
+import numpy as np
+import pytest
+
+from recipe_cost.batch_costing import cost_recipe_book
+from recipe_cost.price_scenarios import (cost_book_scenarios, cost_scenarios, main, scenario_matrices,
+                                        write_scenarios_csv)
+from recipe_cost.vector_costing import load_book_columns, synthetic_book
+
+# -------------------- Price Scenarios --------------------
+
+def row(recipe, ingredient, amount_used, used_unit, amount_purchased, purchased_unit, cost):
+    return {"recipe": recipe, "servings": "4", "ingredient": ingredient, "amount_used": amount_used,
+            "used_unit": used_unit, "amount_purchased": amount_purchased, "purchased_unit": purchased_unit,
+            "cost_purchased": cost}
+
+BOOK = [
+    (2, row("Pancakes", "flour", "250", "g", "1", "kg", "2.00"), None),
+    (3, row("Pancakes", "milk", "500", "ml", "1", "l", "1.20"), None),
+    (4, row("Pancakes", "butter", "20", "g", "250", "g", "2.50"), None),
+    (5, row("Custard", "milk", "1", "l", "1", "l", "1.20"), None),
+    (6, row("Custard", "sugar", "100", "g", "1", "kg", "1.00"), None),
+]
+
+def test_unchanged_scenario_matches_the_plain_costing():
+    entries = list(synthetic_book(500, rows_per_recipe=5))
+    columns = load_book_columns(entries)
+    totals, per_serving = cost_scenarios(columns, np.ones((3, len(columns["ingredients"]))), chunk_cells=700)
+    expected = [result["total_cost"] for result in cost_recipe_book(entries)]
+    for scenario_totals in totals:
+        assert scenario_totals.tolist() == pytest.approx(expected)
+
+def test_multipliers_groups_and_overrides():
+    scenarios = [
+        {"name": "base"},
+        {"name": "dairy +10%", "multipliers": {"dairy": 1.1}},
+        {"multipliers": {"Flour": 0.5, "saffron": 9}},
+        {"name": "butter $8/kg, dairy +10%", "multipliers": {"dairy": 1.1},
+         "overrides": {"butter": {"amount_purchased": 1, "purchased_unit": "kg", "cost_purchased": 8}}},
+    ]
+    columns, names, totals, per_serving = cost_book_scenarios(iter(BOOK), scenarios,
+                                                              {"dairy": ["milk", "Butter", "cream"]})
+    assert names == ["base", "dairy +10%", "scenario 3", "butter $8/kg, dairy +10%"]
+    assert columns["recipes"] == ["Pancakes", "Custard"]
+    assert totals[0].tolist() == pytest.approx([0.50 + 0.60 + 0.20, 1.20 + 0.10])
+    assert totals[1].tolist() == pytest.approx([0.50 + 1.1 * 0.80, 1.1 * 1.20 + 0.10])
+    assert totals[2].tolist() == pytest.approx([0.25 + 0.80, 1.30])
+    assert totals[3].tolist() == pytest.approx([0.50 + 1.1 * (0.60 + 0.16), 1.1 * 1.20 + 0.10])
+    assert per_serving[0].tolist() == pytest.approx((totals[0] / 4).tolist())
+
+    out = io.StringIO()
+    write_scenarios_csv(columns, names, totals, per_serving, out)
+    assert out.getvalue().splitlines()[:3] == ["recipe,servings,scenario,total_cost,cost_per_serving",
+                                               "Pancakes,4,base,1.30,0.33", "Pancakes,4,dairy +10%,1.38,0.35"]
+
+def test_override_in_the_wrong_kind_of_unit_is_refused():
+    columns = load_book_columns(iter(BOOK))
+    override = {"milk": {"amount_purchased": 1, "purchased_unit": "kg", "cost_purchased": 1}}
+    with pytest.raises(ValueError, match="milk is priced by weight, but the book buys it by volume"):
+        scenario_matrices(columns, [{"name": "milk by weight", "overrides": override}])
+    with pytest.raises(ValueError, match="unknown purchased_unit"):
+        scenario_matrices(columns, [{"overrides": {"milk": {"amount_purchased": 1, "purchased_unit": "pint",
+                                                            "cost_purchased": 1}}}])
+
+@pytest.mark.parametrize("scenarios, message", [
+    ("{not json", "is not valid JSON"),
+    ([1, 2], "expected an object with scenarios and groups"),
+    ({"scenarios": {"name": "x"}}, "scenarios must be a list"),
+    ({"groups": {"dairy": "milk"}}, "groups must map each group name"),
+    ({"scenarios": ["dairy +8%"]}, "scenario 1: a scenario must be an object"),
+    ({"scenarios": [{"name": "up", "multipliers": [1.1]}]}, "up: multipliers must be an object"),
+    ({"scenarios": [{"multipliers": {"milk": "lots"}}]}, "scenario 1: multiplier for milk is not a number"),
+    ({"scenarios": [{"multipliers": {"milk": None}}]}, "multiplier for milk is not a number"),
+    ({"scenarios": [{"overrides": {"milk": 1.5}}]}, "an override must be an object"),
+    ({"scenarios": [{"overrides": {"milk": {"amount_purchased": 1, "purchased_unit": "l"}}}]},
+     "override is missing cost_purchased"),
+    ({"scenarios": [{"overrides": {"milk": {"amount_purchased": 1, "purchased_unit": ["l"],
+                                            "cost_purchased": 1}}}]}, "unknown purchased_unit"),
+    ({"scenarios": [{"overrides": {"milk": {"amount_purchased": 1, "purchased_unit": "l",
+                                            "cost_purchased": "free"}}}]}, "cost_purchased is not a number"),
+])
+def test_malformed_scenario_files_are_reported(tmp_path, capsys, scenarios, message):
+    book = tmp_path / "book.csv"
+    book.write_text("recipe,servings,ingredient,used_unit,amount_used,purchased_unit,amount_purchased,"
+                    "cost_purchased\nCustard,4,milk,l,1,l,1,1.20\n")
+    path = tmp_path / "scenarios.json"
+    path.write_text(scenarios if isinstance(scenarios, str) else json.dumps(scenarios))
+    assert main([str(book), "--scenarios", str(path)]) == 1
+    assert message in capsys.readouterr().err
+
+def test_overrides_follow_the_purchased_unit_across_densities():
+    # Flour used by the tablespoon and bought by the kg (0.53 g/ml)
+    book = [(2, row("Scones", "flour", "3", "tbsp", "1", "kg", "2.00"), None),
+            (3, row("Scones", "milk", "100", "g", "1", "l", "1.20"), None)]
+    per_kg = {"amount_purchased": 1, "purchased_unit": "kg", "cost_purchased": 5}
+    per_litre = {"amount_purchased": 1, "purchased_unit": "l", "cost_purchased": 2.06}
+    _, _, totals, _ = cost_book_scenarios(iter(book), [{}, {"overrides": {"flour": per_kg, "milk": per_litre}}])
+    flour_grams = 3 * 15 * 0.53
+    milk_ml = 100 / 1.03
+    assert totals[0].tolist() == pytest.approx([flour_grams * 0.002 + milk_ml * 0.0012])
+    assert totals[1].tolist() == pytest.approx([flour_grams * 0.005 + milk_ml * 0.00206])
+
+    with pytest.raises(ValueError, match="flour is priced by volume, but the book buys it by weight"):
+        cost_book_scenarios(iter(book), [{"overrides": {"flour": per_litre}}])
@@ -0,0 +1,50 @@
+import pytest
+
+from recipe_cost.production_demand import (aggregate_demand, compile_recipes, purchase_list, read_orders_csv,
+                                           total_servings)
+from recipe_cost.sub_recipes import load_recipes
+
+# -------------------- Production Demand --------------------
+
+FIELDS = ("recipe", "servings", "yield_amount", "yield_unit", "ingredient", "sub_recipe", "used_unit",
+          "amount_used", "purchased_unit", "amount_purchased", "cost_purchased")
+
+def compiled(*lines):
+    entries = [(line_num, dict(zip(FIELDS, line.split(","))), None) for line_num, line in enumerate(lines, 2)]
+    recipes, _ = load_recipes(iter(entries))
+    return compile_recipes(recipes)
+
+RISOTTO = (
+    "Risotto,4,,,stock,Stock,ml,500,,,",
+    "Risotto,4,,,rice,,g,300,kg,1,2.00",
+    "Stock,,2,l,bones,,kg,1,kg,1,3.00",
+    "Stock,,2,l,Rice,,g,20,kg,1,2.00",
+)
+
+def test_orders_are_spread_over_sub_recipe_ingredients():
+    demand, errors = aggregate_demand(compiled(*RISOTTO), {"risotto": 8})
+    assert errors == []
+    purchases = {name.lower(): (amount, unit, cost) for name, amount, unit, cost in purchase_list(demand)}
+    # Two batches, each using a quarter of a 2 l batch of stock
+    assert purchases["bones"] == pytest.approx((500, "g", 1.50))
+    assert purchases["rice"] == pytest.approx((2 * (300 + 20 / 4), "g", 2 * (0.60 + 0.01)))
+    assert set(purchases) == {"bones", "rice"}
+
+def test_orders_of_a_recipe_with_a_bad_sub_recipe_are_left_out():
+    recipes = compiled(*RISOTTO[:3], "Stock,,2,l,salt,,g,5,parsec,1,1.00")
+    assert recipes["Stock"]["errors"]
+    assert recipes["Risotto"]["errors"] == [
+        {"line": 2, "error": "sub-recipe Stock has bad rows, so it could not be costed"}]
+    demand, errors = aggregate_demand(recipes, {"risotto": 4, "soup": 1})
+    assert demand == {}
+    assert errors == ["Risotto has 1 bad rows, so it was left out", "unknown recipe: 'soup'"]
+
+def test_order_lines_are_summed_per_recipe(tmp_path):
+    path = tmp_path / "orders.csv"
+    path.write_text("Servings,Recipe\n4,Risotto\n\n2, risotto \nlots,Risotto\n")
+    errors = []
+    assert total_servings(read_orders_csv(path), errors) == {"risotto": 6}
+    assert [error["line"] for error in errors] == [5]
+    path.write_text("dish,count\n")
+    with pytest.raises(ValueError, match="header must have recipe, servings"):
+        list(read_orders_csv(path))
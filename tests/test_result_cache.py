@@ -0,0 +1,88 @@
+import os
+
+from recipe_cost.batch_costing import cost_recipe_book
+from recipe_cost.result_cache import ResultCache, cost_recipe_book_cached, recipe_digest
+from recipe_cost.vector_costing import synthetic_book
+
+# -------------------- Result Cache --------------------
+
+def row(recipe, ingredient, amount_used, used_unit, amount_purchased, purchased_unit, cost):
+    return {"recipe": recipe, "servings": "4", "ingredient": ingredient, "amount_used": amount_used,
+            "used_unit": used_unit, "amount_purchased": amount_purchased, "purchased_unit": purchased_unit,
+            "cost_purchased": cost}
+
+def test_second_run_is_all_hits_and_matches_a_plain_run(tmp_path):
+    entries = list(synthetic_book(300, rows_per_recipe=6))
+    plain = list(cost_recipe_book(entries))
+    cache = ResultCache(tmp_path / "cache")
+    assert list(cost_recipe_book_cached(entries, cache)) == plain
+    assert cache.hits == 0 and cache.misses == 50
+
+    cache = ResultCache(tmp_path / "cache")
+    assert len(cache) == 50
+    assert list(cost_recipe_book_cached(entries, cache)) == plain
+    assert cache.hits == 50 and cache.misses == 0
+
+def test_same_amount_in_other_units_gives_the_same_key():
+    grams = [(2, row("Bread", "flour", "1000", "g", "1", "kg", "2.50"), None)]
+    kilos = [(2, row("Bread", "flour", "1", "kg", "1000", "g", "2.50"), None)]
+    assert recipe_digest(grams) == recipe_digest(kilos)
+    assert recipe_digest(grams) != recipe_digest(grams, fixed=True)
+    dearer = [(2, row("Bread", "flour", "1000", "g", "1", "kg", "2.60"), None)]
+    assert recipe_digest(grams) != recipe_digest(dearer)
+
+def test_fractions_in_different_units_get_different_keys(tmp_path):
+    kilos = [(2, row("Bread", "flour", "1/2", "kg", "1", "kg", "2.00"), None)]
+    grams = [(2, row("Bread", "flour", "1/2", "g", "1", "kg", "2.00"), None)]
+    assert recipe_digest(kilos) != recipe_digest(grams)
+    assert recipe_digest(kilos) == recipe_digest([(2, row("Bread", "flour", "500", "g", "1", "kg", "2.00"), None)])
+    bought = [(2, row("Bread", "flour", "1", "kg", "1/2", "g", "2.00"), None)]
+    assert recipe_digest(bought) != recipe_digest([(2, row("Bread", "flour", "1", "kg", "1/2", "kg", "2.00"), None)])
+
+    cache = ResultCache(tmp_path / "cache")
+    for entries in (kilos, grams, kilos, grams):
+        assert list(cost_recipe_book_cached(entries, cache)) == list(cost_recipe_book(entries))
+    assert cache.hits == 2 and cache.misses == 2
+
+def test_bad_rows_are_never_cached(tmp_path):
+    entries = [(2, row("Bread", "flour", "1", "parsec", "1", "kg", "2.50"), None)]
+    assert recipe_digest(entries) is None
+    cache = ResultCache(tmp_path / "cache")
+    [result] = cost_recipe_book_cached(entries, cache)
+    assert result["errors"] and len(cache) == 0
+
+def test_damaged_file_is_costed_again(tmp_path):
+    entries = [(2, row("Bread", "flour", "500", "g", "1", "kg", "2.50"), None)]
+    cache = ResultCache(tmp_path / "cache")
+    [first] = cost_recipe_book_cached(entries, cache)
+    key = recipe_digest(entries)
+    with open(cache.file(key), "r+b") as out:
+        out.seek(-3, os.SEEK_END)
+        out.write(b"999")
+
+    cache = ResultCache(tmp_path / "cache")
+    [again] = cost_recipe_book_cached(entries, cache)
+    assert again == first
+    assert cache.damaged == 1 and cache.hits == 0
+
+def test_file_removed_after_the_scan_is_a_miss(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    cache.put("ab" * 32, {"total_cost": 1.0})
+    os.remove(cache.file("ab" * 32))
+    assert cache.get("ab" * 32) is None
+    assert cache.misses == 1 and cache.damaged == 0 and len(cache) == 0 and cache.total == 0
+
+def test_least_recently_used_files_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=10**6)
+    keys = [f"{n:02x}" * 32 for n in range(4)]
+    for key in keys:
+        cache.put(key, {"total_cost": 1.0, "padding": "x" * 100})
+    size = cache.sizes[keys[0]]
+    cache.max_bytes = 3 * size
+    assert cache.get(keys[0]) is not None
+    cache.put("ff" * 32, {"total_cost": 1.0, "padding": "y" * 100})
+
+    assert cache.evicted == 2
+    assert keys[0] in cache.sizes and keys[1] not in cache.sizes and keys[2] not in cache.sizes
+    assert not os.path.exists(cache.file(keys[1]))
+    assert cache.total <= cache.max_bytes
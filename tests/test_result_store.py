@@ -0,0 +1,77 @@
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+from recipe_cost.batch_costing import cost_recipe_book
+from recipe_cost.result_store import ResultSet, export_book
+from recipe_cost.vector_costing import synthetic_book
+
+# -------------------- Columnar Results --------------------
+
+def exported_book(tmp_path):
+    entries = list(synthetic_book(600, rows_per_recipe=5))
+    entries.append((602, {"recipe": "Crème brûlée", "servings": "4", "ingredient": "cream", "used_unit": "ml",
+                          "amount_used": "500", "purchased_unit": "l", "amount_purchased": "1",
+                          "cost_purchased": "4.00"}, None))
+    entries.append((603, {"recipe": "Crème brûlée", "servings": "4", "ingredient": "sugar", "used_unit": "g",
+                          "amount_used": "lots", "purchased_unit": "kg", "amount_purchased": "1",
+                          "cost_purchased": "1.00"}, None))
+    path = str(tmp_path / "results.rcc")
+    errors = export_book(entries, path, chunk_recipes=7)
+    return entries, path, errors
+
+def test_reopened_results_match_the_scalar_costing(tmp_path):
+    entries, path, errors = exported_book(tmp_path)
+    assert [(error["recipe"], error["line"]) for error in errors] == [("Crème brûlée", 603)]
+    expected = list(cost_recipe_book(entries))
+
+    with ResultSet(path) as results:
+        assert results.recipes == len(expected) == 121
+        assert results.rows == 601
+        assert [results.name("recipe", index) for index in range(results.recipes)] == [
+            result["recipe"] for result in expected]
+        assert results["total_cost"].tolist() == pytest.approx([result["total_cost"] for result in expected])
+        assert results["servings"].tolist() == [result["servings"] for result in expected]
+        assert results.ingredient_costs().sum() == pytest.approx(results["total_cost"].sum())
+
+def test_finding_a_recipe_by_name(tmp_path):
+    _, path, _ = exported_book(tmp_path)
+    with ResultSet(path) as results:
+        # "Recipe 1" is also the start of "Recipe 10" ... "Recipe 119"
+        assert results.find_recipe("Recipe 1") == 1
+        assert results.find_recipe("Recipe 11") == 11
+        assert results.find_recipe("Recipe 119") == 119
+        assert results.find_recipe("ecipe 1") is None
+        assert results.find_recipe("Recipe 120") is None
+        index = results.find_recipe("Crème brûlée")
+        assert index == 120
+        ingredient_ids, used_units, base_amounts, costs = results.recipe_rows(index)
+        assert [results.name("ingredient", ingredient) for ingredient in ingredient_ids] == ["cream"]
+        assert base_amounts.tolist() == [500] and costs.tolist() == [2.0]
+
+def test_damaged_files_are_refused(tmp_path):
+    _, path, _ = exported_book(tmp_path)
+    data = (tmp_path / "results.rcc").read_bytes()
+    (tmp_path / "short.rcc").write_bytes(data[:len(data) // 2])
+    with pytest.raises(ValueError, match="truncated or damaged"):
+        ResultSet(tmp_path / "short.rcc")
+    (tmp_path / "other.rcc").write_bytes(b"PK" + data[2:])
+    with pytest.raises(ValueError, match="not a version 1 result file"):
+        ResultSet(tmp_path / "other.rcc")
+    (tmp_path / "empty.rcc").write_bytes(b"\0")
+    with pytest.raises(ValueError, match="not a result file"):
+        ResultSet(tmp_path / "empty.rcc")
+
+def test_columns_are_views_of_the_file(tmp_path):
+    _, path, _ = exported_book(tmp_path)
+    with ResultSet(path) as results:
+        column = results["cost"]
+        assert not column.flags.owndata and not column.flags.writeable
+        assert column.dtype == np.dtype("<f8")
+
+def test_store_does_not_load_the_demand_tools():
+    code = "import sys, recipe_cost.result_store; print('recipe_cost.production_demand' in sys.modules)"
+    loaded = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert loaded.stdout.strip() == "False"
@@ -0,0 +1,56 @@
+import io
+
+import pytest
+
+from recipe_cost.ingredient_records import IngredientColumns, IngredientRecord
+from recipe_cost.scaling import display_scaling, scale_recipe
+from recipe_cost.units import UNIT_REGISTRY
+
+# -------------------- Yield Scaling --------------------
+
+def pancakes():
+    columns = IngredientColumns(UNIT_REGISTRY)
+    columns.append("flour", 250, "g", 0.50)
+    columns.append("milk", 3, "tbsp", 0.10)
+    columns.append("egg", 1.5, "unit", 0.45)
+    return columns
+
+def test_sizes_scale_amounts_and_costs():
+    scaled = scale_recipe(4, pancakes(), servings=[2, 4, 40])
+    assert scaled["multipliers"].tolist() == [0.5, 1, 10]
+    assert scaled["base_amounts"][:, 0].tolist() == [125, 250, 2500]
+    # 1.5 eggs are bought as 2
+    assert scaled["total_cost"][1] == pytest.approx(0.50 + 0.10 + 0.60)
+    assert scaled["cost_per_serving"][1] == pytest.approx(1.20 / 4)
+
+def test_amounts_are_shown_in_the_largest_fitting_unit():
+    scaled = scale_recipe(4, pancakes(), multipliers=[0.5, 10])
+    names = [[UNIT_REGISTRY.names[unit_id] for unit_id in size] for size in scaled["unit_ids"].tolist()]
+    assert names == [["g", "tbsp", "unit"], ["kg", "tbsp", "unit"]]
+    assert scaled["amounts"][1].tolist() == pytest.approx([2.5, 30, 15])
+    # 3 tbsp halved is 22.5 ml: still tbsp, as spoons stay spoons
+    assert scaled["amounts"][0][1] == pytest.approx(1.5)
+
+def test_counted_items_round_up_to_whole_ones():
+    scaled = scale_recipe(4, pancakes(), multipliers=[0.5, 1])
+    assert scaled["base_amounts"][:, 2].tolist() == [1, 2]
+    assert scaled["ingredient_costs"][:, 2].tolist() == pytest.approx([0.30, 0.60])
+
+def test_bad_sizes_are_refused():
+    with pytest.raises(ValueError, match="either servings or multipliers"):
+        scale_recipe(4, pancakes())
+    with pytest.raises(ValueError, match="greater than zero to be scaled"):
+        scale_recipe(0, pancakes(), servings=[2])
+    with pytest.raises(ValueError, match="sizes must be greater than zero"):
+        scale_recipe(4, pancakes(), multipliers=[1, 0])
+
+def test_records_and_columns_scale_the_same():
+    records = [IngredientRecord(record.name, record.amount_used, record.unit, record.base_amount,
+                                record.total_cost) for record in pancakes()]
+    assert records == list(pancakes())
+    from_records = scale_recipe(4, records, servings=[6])
+    from_columns = scale_recipe(4, pancakes(), servings=[6])
+    assert from_records["total_cost"].tolist() == from_columns["total_cost"].tolist()
+    out = io.StringIO()
+    display_scaling("Pancakes", from_columns, out=out, tablefmt="plain")
+    assert "Pancakes" in out.getvalue()
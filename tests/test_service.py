@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from recipe_cost.ingredient_catalog import PriceTable
+from recipe_cost.service import CostingService, cost_requests, percentiles, post_json
+
+# -------------------- Costing Service --------------------
+
+PRICES = PriceTable({"flour": {"name": "flour", "display_name": "Flour", "category": "weight",
+                               "cost_per_base": 0.002, "purchased_unit": "kg", "amount_purchased": 1,
+                               "cost_purchased": 2.00}})
+
+PANCAKES = {"recipe": "Pancakes", "servings": 4, "ingredients": [
+    {"ingredient": "flour", "used_unit": "g", "amount_used": 250},
+    {"ingredient": "milk", "used_unit": "ml", "amount_used": 500, "purchased_unit": "l",
+     "amount_purchased": 1, "cost_purchased": 1.20},
+]}
+
+def test_requests_are_costed_together_in_order():
+    bad = {"recipe": "Toast", "servings": 2, "ingredients": [
+        {"ingredient": "bread", "used_unit": "slice", "amount_used": 2},
+        "butter",
+        {"ingredient": "butter", "used_unit": "g", "amount_used": 10, "purchased_unit": "g",
+         "amount_purchased": 250, "cost_purchased": 2.50},
+    ]}
+    pancakes, toast, empty = cost_requests([PANCAKES, bad, {"recipe": "Air"}], PRICES)
+    assert pancakes["total_cost"] == pytest.approx(1.10)
+    assert pancakes["cost_per_serving"] == pytest.approx(1.10 / 4)
+    assert [item["cost"] for item in pancakes["ingredients"]] == pytest.approx([0.50, 0.60])
+    assert toast["total_cost"] == pytest.approx(0.10)
+    assert [item["ingredient"] for item in toast["ingredients"]] == ["butter"]
+    assert [error["line"] for error in toast["errors"]] == [1, 2]
+    assert empty["errors"] == [{"line": 0, "error": "recipe has no ingredients"}]
+
+def test_percentiles_use_the_nearest_rank():
+    assert percentiles(list(range(1, 101))) == {"p50": 50, "p90": 90, "p99": 99}
+    assert percentiles([]) == {"p50": None, "p90": None, "p99": None}
+
+def test_service_answers_over_http():
+
+    async def post_alone(port, payload):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            return await post_json(reader, writer, "/cost", payload)
+        finally:
+            writer.close()
+
+    async def session():
+        service = CostingService(PRICES)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            replies = await asyncio.gather(*(post_alone(port, PANCAKES) for _ in range(5)))
+            missing = await post_json(reader, writer, "/nowhere", {})
+            not_a_recipe = await post_json(reader, writer, "/cost", [1, 2])
+            stats = await post_json(reader, writer, "/stats", {})
+        finally:
+            writer.close()
+            server.close()
+            service.batch_task.cancel()
+        return replies, missing, not_a_recipe, stats, service
+
+    replies, missing, not_a_recipe, (status, stats), service = asyncio.run(session())
+    assert all(status == 200 and result["total_cost"] == pytest.approx(1.10) for status, result in replies)
+    assert missing[0] == 404 and not_a_recipe[0] == 400
+    assert status == 200 and stats["requests"] == 5
+    assert service.batcher.batched == 5 and stats["largest_batch"] >= 1
+
+def test_a_request_that_fails_only_fails_itself():
+
+    async def post_alone(port, payload):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            return await post_json(reader, writer, "/cost", payload)
+        finally:
+            writer.close()
+
+    async def session():
+        # A long window so all five requests land in one batch
+        service = CostingService(PRICES, window=0.05)
+        server = await service.start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            # Servings past int64 can't go into the servings column
+            huge = dict(PANCAKES, servings=10**30)
+            return await asyncio.gather(*(post_alone(port, request)
+                                          for request in (PANCAKES, PANCAKES, huge, PANCAKES, PANCAKES))), service
+        finally:
+            server.close()
+            service.batch_task.cancel()
+
+    replies, service = asyncio.run(session())
+    assert [status for status, _ in replies] == [200, 200, 500, 200, 200]
+    assert replies[2][1]["error"].startswith("could not cost this recipe")
+    assert all(result["total_cost"] == pytest.approx(1.10) for status, result in replies if status == 200)
+    assert service.batcher.batches == 1
@@ -0,0 +1,97 @@
+import pytest
+
+from recipe_cost.ingredient_catalog import IngredientCatalog
+from recipe_cost.sub_recipes import CycleError, check_cycles, cost_recipe_graph, load_books, load_recipes, main
+
+# -------------------- Sub-recipes --------------------
+
+FIELDS = ("recipe", "servings", "yield_amount", "yield_unit", "ingredient", "sub_recipe", "used_unit",
+          "amount_used", "purchased_unit", "amount_purchased", "cost_purchased")
+
+def book(*lines):
+    return [(line_num, dict(zip(FIELDS, line.split(","))), None) for line_num, line in enumerate(lines, 2)]
+
+def results_by_name(entries):
+    recipes, orphan_errors = load_recipes(iter(entries))
+    assert orphan_errors == []
+    return {result["recipe"]: result for result in cost_recipe_graph(recipes)}
+
+def test_sub_recipe_is_costed_per_base_unit():
+    results = results_by_name(book(
+        "Risotto,4,,,stock,Chicken stock,ml,500,,,",
+        "Chicken stock,,2,l,bones,,kg,1,kg,1,3.00",
+        "Chicken stock,,2,l,carrot,,g,500,kg,1,1.00",
+        "Risotto,4,,,rice,,g,300,kg,1,2.00",
+    ))
+    assert results["Chicken stock"]["cost_per_base"] == pytest.approx(3.5 / 2000)
+    assert results["Risotto"]["total_cost"] == pytest.approx(500 * 3.5 / 2000 + 0.6)
+    assert results["Risotto"]["errors"] == []
+    assert list(results) == ["Risotto", "Chicken stock"]
+
+def test_cycles_are_reported_and_their_users_fail():
+    entries = book(
+        "A,,1,l,b,B,ml,10,,,",
+        "B,,1,l,a,A,ml,10,,,",
+        "C,1,,,a,A,ml,10,,,",
+        "D,1,,,salt,,g,1,kg,1,1.00",
+    )
+    results = results_by_name(entries)
+    assert results["A"]["errors"][-1]["error"] == "sub-recipe cycle: A -> B -> A"
+    assert results["B"]["errors"][-1]["error"] == "sub-recipe cycle: A -> B -> A"
+    assert results["C"]["errors"][-1]["error"] == "uses a recipe that is part of a sub-recipe cycle"
+    assert results["D"]["errors"] == []
+    recipes, _ = load_recipes(iter(entries))
+    with pytest.raises(CycleError):
+        check_cycles(recipes)
+
+def test_bad_rows_in_a_sub_recipe_reach_every_user():
+    results = results_by_name(book(
+        "Stock,,2,l,bones,,kg,1,kg,1,3.00",
+        "Stock,,2,l,carrot,,kg,lots,kg,1,3.00",
+        "Sauce,,1,l,stock,Stock,ml,500,,,",
+        "Sauce,,1,l,cream,,ml,100,l,1,4.00",
+        "Plate,1,,,sauce,Sauce,ml,100,,,",
+        "Plate,1,,,rice,,g,100,kg,1,2.00",
+    ))
+    assert results["Stock"]["cost_per_base"] is None
+    assert results["Sauce"]["errors"] == [
+        {"line": 4, "error": "sub-recipe Stock has bad rows, so it could not be costed"}]
+    assert results["Sauce"]["cost_per_base"] is None
+    assert results["Plate"]["errors"] == [
+        {"line": 6, "error": "sub-recipe Sauce has bad rows, so it could not be costed"}]
+    assert results["Plate"]["total_cost"] == pytest.approx(0.2)
+
+def test_unknown_and_yieldless_sub_recipes():
+    results = results_by_name(book(
+        "Plate,1,,,gravy,Gravy,ml,10,,,",
+        "Plate,1,,,side,Side,g,10,,,",
+        "Side,2,,,rice,,g,100,kg,1,2.00",
+    ))
+    assert [error["error"] for error in results["Plate"]["errors"]] == [
+        "unknown sub-recipe: 'Gravy'", "Side has no yield, so it can't be used as an ingredient"]
+
+def test_duplicate_recipes_across_books_are_reported(tmp_path):
+    header = ",".join(FIELDS) + "\n"
+    first = tmp_path / "first.csv"
+    second = tmp_path / "second.csv"
+    first.write_text(header + "Stock,,2,l,bones,,kg,1,kg,1,3.00\n", encoding="utf-8")
+    second.write_text(header + "Soup,1,,,stock,Stock,ml,100,,,\nStock,,1,l,bones,,kg,1,kg,1,9.00\n",
+                      encoding="utf-8")
+
+    recipes, errors = load_books([str(first), str(second)])
+    assert list(recipes) == ["Stock", "Soup"]
+    assert recipes["Stock"]["rows"][0][1]["cost_purchased"] == "3.00"
+    assert errors == [{"book": str(second), "line": 3,
+                       "error": f"recipe 'Stock' is already defined in {first}"}]
+
+def test_main_costs_from_the_catalog_and_closes_it(tmp_path, capsys, monkeypatch):
+    path = str(tmp_path / "catalog.db")
+    with IngredientCatalog(path) as catalog:
+        catalog.set_price("Rice", 1, "kg", 2.00)
+    closed = []
+    monkeypatch.setattr(IngredientCatalog, "close", lambda self: closed.append(self.connection.close()))
+    book = tmp_path / "book.csv"
+    book.write_text(",".join(FIELDS) + "\n" + "Risotto,4,,,rice,,g,300,,,\n")
+    assert main(["--catalog", path, str(book)]) == 0
+    assert capsys.readouterr().out.splitlines()[1].startswith("Risotto,4,0.60,0.15")
+    assert len(closed) == 1
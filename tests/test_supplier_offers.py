@@ -0,0 +1,40 @@
+import pytest
+
+from recipe_cost.ingredient_catalog import IngredientCatalog
+from recipe_cost.supplier_offers import OfferIndex
+
+# -------------------- Supplier Offers --------------------
+
+@pytest.fixture
+def catalog(tmp_path):
+    with IngredientCatalog(str(tmp_path / "catalog.db")) as catalog:
+        yield catalog
+
+def test_offers_include_saved_prices(catalog):
+    catalog.set_price("Flour", 1, "kg", 2.00)
+    assert catalog.add_offers([("Flour", "Mill", 25, "kg", 30.00), ("flour", "Corner", 500, "g", 0.90)]) == 2
+    offers = catalog.offers("flour")
+    assert sorted(offer["supplier"] for offer in offers) == ["", "Corner", "Mill"]
+    assert len(catalog.offers()) == 3
+
+def test_best_offer_by_pack_size(catalog):
+    catalog.add_offers([("Flour", "Mill", 25, "kg", 30.00), ("Flour", "Corner", 500, "g", 0.90),
+                        ("Flour", "Shop", 1, "kg", 2.00)])
+    index = OfferIndex.from_catalog(catalog)
+    assert index.best("flour", "weight")["supplier"] == "Mill"
+    assert index.best("flour", "weight", min_pack=30_000) is None
+    assert index.best("flour", "volume") is None
+    assert index.best("rye", "weight") is None
+
+def test_cover_picks_a_pack_big_enough(catalog):
+    catalog.add_offers([("Flour", "Corner", 500, "g", 0.50), ("Flour", "Shop", 2, "kg", 3.00)])
+    cheapest = OfferIndex.from_catalog(catalog)
+    cover = OfferIndex.from_catalog(catalog, cover=True)
+    entry = cheapest.get("flour")
+    assert cheapest.pick(entry, 1, "kg")["supplier"] == "Corner"
+    assert cover.pick(cover.get("flour"), 1, "kg")["supplier"] == "Shop"
+    assert cover.pick(cover.get("flour"), 5, "kg")["supplier"] == "Corner"
+    # Flour has a density, so a volume amount can use a weight offer
+    assert cheapest.cost_used(entry, 100, "ml") == pytest.approx(100 * 0.53 * 0.001)
+    with pytest.raises(ValueError, match="priced by weight, not unit"):
+        cheapest.pick(entry, 1, "unit")
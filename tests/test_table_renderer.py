@@ -0,0 +1,48 @@
+import io
+
+import pytest
+from tabulate import tabulate
+
+from recipe_cost.table_renderer import render_table
+
+# -------------------- Streaming Table Renderer --------------------
+
+HEADERS = ["Ingredient", "Cost"]
+
+def rendered(rows, **options):
+    out = io.StringIO()
+    count = render_table(rows, HEADERS, out=out, **options)
+    return count, out.getvalue().splitlines()
+
+def test_small_tables_look_like_tabulate():
+    rows = [["flour", 0.5], ["milk", 0.6]]
+    count, lines = rendered(rows)
+    assert count == 2
+    assert lines == tabulate(rows, headers=HEADERS, tablefmt="fancy_grid").splitlines()
+
+def test_streamed_grid_matches_tabulate_when_widths_fit():
+    rows = [["flour", 0.5], ["milk", 0.6], ["butter", 0.2]]
+    count, lines = rendered(iter(rows), sample_rows=2)
+    assert count == 3
+    expected = tabulate(rows, headers=HEADERS, tablefmt="fancy_grid").splitlines()
+    assert [line.replace(" ", "") for line in lines] == [line.replace(" ", "") for line in expected]
+
+def test_cells_wider_than_the_sample_are_cut():
+    count, lines = rendered(iter([["egg", 1], ["egg", 2], ["clarified butter", 3]]), tablefmt="plain",
+                            sample_rows=2)
+    assert count == 3
+    # The column is "Ingredient" plus two wide
+    assert lines[-1] == "clarified b…       3"
+
+def test_paged_repeats_the_header():
+    count, lines = rendered(([f"item {n}", n] for n in range(5)), tablefmt="paged", page_size=2)
+    assert count == 5
+    assert sum(line.startswith("Ingredient") for line in lines) == 3
+
+def test_csv_and_empty_tables():
+    count, lines = rendered([["flour, plain", 0.5]], tablefmt="csv")
+    assert lines == ["Ingredient,Cost", '"flour, plain",0.5']
+    count, lines = rendered([], tablefmt="plain")
+    assert count == 0 and lines[0].startswith("Ingredient")
+    with pytest.raises(ValueError, match="Unknown table format"):
+        rendered([], tablefmt="html")
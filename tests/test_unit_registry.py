@@ -0,0 +1,34 @@
+import pytest
+
+from recipe_cost.unit_registry import UnitRegistry
+from recipe_cost.units import UNIT_REGISTRY, base_unit_names
+
+# -------------------- Unit Registry --------------------
+
+def test_aliases_share_one_unit():
+    assert UNIT_REGISTRY.lookup("g") == UNIT_REGISTRY.lookup(" Grams ") == UNIT_REGISTRY.lookup("gram")
+    assert UNIT_REGISTRY.lookup("tsp") != UNIT_REGISTRY.lookup("ml")
+    assert UNIT_REGISTRY.same_category(UNIT_REGISTRY.lookup("tsp"), UNIT_REGISTRY.lookup("l"))
+    assert UNIT_REGISTRY.to_base(1.5, UNIT_REGISTRY.lookup("kg")) == 1500
+
+@pytest.mark.parametrize("unit", [None, 5, ["g"], {"unit": "g"}, "parsec"])
+def test_anything_but_a_unit_name_is_unknown(unit):
+    assert UNIT_REGISTRY.lookup(unit) is None
+    assert unit not in UNIT_REGISTRY
+
+def test_registering_units_and_aliases():
+    registry = UnitRegistry()
+    ounce = registry.register("oz", 28.3495, "weight", aliases=("Ounce",))
+    assert registry.lookup("ounce") == ounce
+    assert registry.add_alias("ozs", "oz") == ounce
+    with pytest.raises(ValueError, match="already registered"):
+        registry.register("OZ", 28, "weight")
+    with pytest.raises(ValueError, match="greater than zero"):
+        registry.register("nothing", 0, "weight")
+    with pytest.raises(ValueError, match="Unknown unit"):
+        registry.add_alias("x", "parsec")
+
+def test_base_units_are_named_per_category():
+    names = base_unit_names()
+    assert {UNIT_REGISTRY.category_names[category]: name for category, name in names.items()} == {
+        "weight": "g", "volume": "ml", "count": "unit"}
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from recipe_cost.batch_costing import cost_recipe_book
+from recipe_cost.fixed_point import MONEY_SCALE
+from recipe_cost.vector_costing import (cost_book_columns, cost_book_columns_fixed, cost_book_vectorized,
+                                        load_book_columns, synthetic_book)
+
+# -------------------- Vector Parity --------------------
+
+def parity_book():
+
+    # A synthetic book plus a recipe with density conversions and bad rows.
+
+    entries = list(synthetic_book(2_000, rows_per_recipe=7))
+    extra = [
+        {"recipe": "Bread", "servings": "2", "ingredient": "flour", "used_unit": "tbsp", "amount_used": "3",
+         "purchased_unit": "kg", "amount_purchased": "1.5", "cost_purchased": "2.40"},
+        {"recipe": "Bread", "servings": "2", "ingredient": "honey", "used_unit": "g", "amount_used": "20",
+         "purchased_unit": "l", "amount_purchased": "0.5", "cost_purchased": "6.99"},
+        {"recipe": "Bread", "servings": "2", "ingredient": "sand", "used_unit": "g", "amount_used": "20",
+         "purchased_unit": "l", "amount_purchased": "1", "cost_purchased": "1"},
+        {"recipe": "Bread", "servings": "2", "ingredient": "salt", "used_unit": "g", "amount_used": "-1",
+         "purchased_unit": "kg", "amount_purchased": "1", "cost_purchased": "1"},
+    ]
+    last = entries[-1][0]
+    return entries + [(last + offset, row, None) for offset, row in enumerate(extra, 1)]
+
+def test_vector_path_matches_scalar_exactly():
+    entries = parity_book()
+    scalar = list(cost_recipe_book(iter(entries)))
+    _, totals, per_serving = cost_book_columns(load_book_columns(iter(entries)))
+    assert np.array_equal(totals, [result["total_cost"] for result in scalar])
+    assert np.array_equal(per_serving, [result["cost_per_serving"] for result in scalar])
+    assert cost_book_vectorized(iter(entries)) == scalar
+
+def test_bad_rows_are_the_same_on_both_paths():
+    entries = parity_book()
+    scalar = [result["errors"] for result in cost_recipe_book(iter(entries))]
+    vector = [result["errors"] for result in cost_book_vectorized(iter(entries))]
+    assert scalar == vector
+    assert [error["line"] for error in scalar[-1]] == [entries[-2][0], entries[-1][0]]
+
+# -------------------- Fixed-point Parity --------------------
+
+# Amounts and prices that sit exactly on half a micro-dollar or half a
+# thousandth of a gram, where rounding a float product can go either way.
+HALVES = ["0.0000005", "0.0000015", "0.0000025", "1.0000005", "2.675", "0.1115", "0.0005", "0.0015"]
+
+def book(rows):
+    return [(line_num, row, None) for line_num, row in enumerate(rows, 2)]
+
+def half_boundary_book():
+    return book({"recipe": f"Recipe {i}", "servings": "3", "ingredient": "salt", "used_unit": "g",
+                 "amount_used": used, "purchased_unit": "kg", "amount_purchased": "0.0015", "cost_purchased": cost}
+                for i, cost in enumerate(HALVES) for used in HALVES)
+
+def assert_fixed_paths_match(entries):
+    scalar = list(cost_recipe_book(iter(entries), fixed=True))
+    _, totals, per_serving = cost_book_columns_fixed(load_book_columns(iter(entries), fixed=True))
+    assert [result["total_cost"] for result in scalar] == [int(total) for total in totals]
+    assert [result["cost_per_serving"] for result in scalar] == [int(cost) for cost in per_serving]
+
+def test_fixed_paths_match_on_half_boundaries():
+    assert_fixed_paths_match(half_boundary_book())
+
+def test_fixed_columns_are_read_from_text():
+    columns = load_book_columns(iter(half_boundary_book()), fixed=True)
+
+    # Half a micro-dollar rounds to even: 0.0000005 -> 0, 0.0000015 -> 2, 0.0000025 -> 2
+    assert columns["cost_fixed"][::len(HALVES)][:3].tolist() == [0, 2, 2]
+
+def test_fixed_paths_match_past_int64():
+    entries = book([{"recipe": "Bulk", "servings": "1", "ingredient": "flour", "used_unit": "kg",
+                     "amount_used": "9000000", "purchased_unit": "g", "amount_purchased": "1",
+                     "cost_purchased": "900000.5"}])
+    _, totals, _ = cost_book_columns_fixed(load_book_columns(iter(entries), fixed=True))
+    assert totals.dtype == object
+    assert int(totals[0]) == 9_000_000 * 1000 * 900_000_500_000
+    assert_fixed_paths_match(entries)
+
+def test_fixed_costing_needs_fixed_columns():
+    with pytest.raises(ValueError):
+        cost_book_columns_fixed(load_book_columns(iter(half_boundary_book())))
+
+def test_fixed_paths_match_each_other_and_floats():
+    entries = parity_book()
+    fixed = list(cost_recipe_book(iter(entries), fixed=True))
+    _, totals, per_serving = cost_book_columns_fixed(load_book_columns(iter(entries), fixed=True))
+    assert [result["total_cost"] for result in fixed] == totals.tolist()
+    assert [result["cost_per_serving"] for result in fixed] == per_serving.tolist()
+
+    floats = list(cost_recipe_book(iter(entries)))
+    for exact, approximate in zip(fixed, floats):
+        assert exact["errors"] == approximate["errors"]
+        assert exact["total_cost"] / MONEY_SCALE == pytest.approx(approximate["total_cost"], abs=1e-5)